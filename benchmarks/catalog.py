@@ -0,0 +1,176 @@
+"""Benchmark catalog builds at several sizes.
+
+Generates synthetic catalogs, then times each phase of building and
+using the site: scanning for stories files, importing them, linking the
+tree, looking up paths, rendering and parsing the stories.
+
+The footprint of the site's nodes and stories, in bytes, is reported
+alongside the timings, and compared the same way.
+
+Compare against a stored baseline with ``--compare baseline.json``, and
+store a new one with ``--save baseline.json``. Baselines are specific to
+a machine, so record one before comparing; comparing with a baseline
+that doesn't exist is an error, not a silent pass.
+"""
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import time
+from importlib.resources import files
+from pathlib import Path
+from typing import cast
+
+from storytime import link_site
+from storytime import TreeNode
+from storytime.build import iter_stories
+from storytime.memory import footprint
+from storytime.synthetic import CatalogShape
+from storytime.synthetic import write_catalog
+
+SIZES = {
+    "small": CatalogShape(sections=5, subjects=10, stories=3, template_size=5),
+    "medium": CatalogShape(sections=20, subjects=25, stories=4, template_size=20),
+    "large": CatalogShape(sections=50, subjects=40, stories=5, template_size=50),
+}
+LOOKUP_ROUNDS = 100
+
+
+def time_phases(package: str) -> dict[str, float]:
+    """Time each phase of building and using one catalog.
+
+    Args:
+        package: The dotted name of an importable catalog package.
+
+    Returns:
+        Seconds spent in each phase.
+    """
+    timings = {}
+    start = time.perf_counter()
+    root_path = cast(Path, files(package))
+    stories_paths = sorted(root_path.glob("**/stories.py"))
+    timings["scan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tree_nodes = [TreeNode(package, stories_path) for stories_path in stories_paths]
+    timings["import"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    site = link_site(tree_nodes)
+    timings["link"] = time.perf_counter() - start
+
+    paths = list(site.index)
+    start = time.perf_counter()
+    for _round in range(LOOKUP_ROUNDS):
+        for path in paths:
+            site.find_path(path)
+    timings["lookup"] = time.perf_counter() - start
+
+    stories = [story for _subject, _index, story in iter_stories(site)]
+    start = time.perf_counter()
+    for story in stories:
+        story.rendered
+    timings["render"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for story in stories:
+        story.html
+    timings["parse"] = time.perf_counter() - start
+
+    del tree_nodes
+    gc.collect()
+    timings["node_bytes"] = footprint(site.index.values())
+    timings["story_bytes"] = footprint(stories)
+    return timings
+
+
+def run(sizes: list[str]) -> dict[str, dict[str, float]]:
+    """Generate and time a catalog of each size.
+
+    Args:
+        sizes: Names from ``SIZES``.
+
+    Returns:
+        The timings of each size.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        sys.path.insert(0, tmp)
+        for size in sizes:
+            package = f"synthetic_{size}"
+            write_catalog(Path(tmp), package, SIZES[size])
+            results[size] = time_phases(package)
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[str]:
+    """Find the phases that got slower than the baseline allows.
+
+    Args:
+        results: The new timings.
+        baseline: The stored timings.
+        tolerance: Allowed slowdown, e.g. ``0.25`` for 25%.
+
+    Returns:
+        A description of each regression.
+    """
+    regressions = []
+    for size, timings in results.items():
+        for phase, seconds in timings.items():
+            before = baseline.get(size, {}).get(phase)
+            if before and seconds > before * (1 + tolerance):
+                regressions.append(
+                    f"{size} {phase}: {seconds:.4f}s vs {before:.4f}s baseline"
+                )
+    return regressions
+
+
+def main() -> int:
+    """Run the benchmarks from the command line.
+
+    Returns:
+        The exit code, 1 if there were regressions and 2 if there was
+        no baseline to compare with.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", action="append", choices=sorted(SIZES))
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare.")
+    parser.add_argument("--save", type=Path, help="Write the results as JSON.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run(args.size or list(SIZES))
+    for size, timings in results.items():
+        phases = ", ".join(
+            (
+                f"{phase} {value:.0f}"
+                if phase.endswith("_bytes")
+                else f"{phase} {value:.4f}s"
+            )
+            for phase, value in timings.items()
+        )
+        print(f"{size}: {phases}")
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+    if args.compare:
+        if not args.compare.exists():
+            print(
+                f"No baseline at {args.compare}, record one with --save",
+                file=sys.stderr,
+            )
+            return 2
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Slower: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
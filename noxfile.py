@@ -159,6 +159,18 @@ def xdoctest(session: Session) -> None:
     session.run("python", "-m", "xdoctest", package, *args)
 
 
+@session(python=python_versions)
+def benchmarks(session: Session) -> None:
+    """Benchmark catalog builds against the stored baseline.
+
+    The baseline is specific to a machine and isn't committed, so the
+    session fails until one is recorded with ``-- --save``.
+    """
+    args = session.posargs or ["--compare", "benchmarks/baseline.json"]
+    session.install(".")
+    session.run("python", "benchmarks/catalog.py", *args)
+
+
 @session(name="docs-build", python="3.9")
 def docs_build(session: Session) -> None:
     """Build the documentation."""
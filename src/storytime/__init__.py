@@ -6,8 +6,15 @@ You can then browse them in a web page, as well as use these stories in testing.
 """
 from __future__ import annotations
 
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
 from dataclasses import dataclass
 from dataclasses import field
+from dataclasses import replace
+from importlib import import_module
+from importlib import reload as reload_module
 from importlib.resources import files
 from importlib.util import module_from_spec
 from importlib.util import spec_from_file_location
@@ -15,24 +22,89 @@ from inspect import getmembers
 from inspect import isfunction
 from pathlib import Path
 from types import ModuleType
+from typing import Callable
 from typing import cast
 from typing import get_type_hints
+from typing import Iterator
 from typing import Optional
+from typing import TYPE_CHECKING
 from typing import Union
 
 from hopscotch import Registry
 
+from storytime.cache import CacheEntry
+from storytime.cache import ScanCache
+from storytime.instrument import span
+from storytime.memory import slotted
 
-def import_stories(stories_path: Path) -> ModuleType:
-    """Given a full path to a stories file, import and return the module."""
-    spec = spec_from_file_location(stories_path.name, stories_path)
-    if spec is None:
-        # No module at that path
-        msg = f"No stories file at {stories_path}"
-        raise ModuleNotFoundError(msg)
-    module = module_from_spec(spec)
-    spec.loader.exec_module(module)  # type: ignore
-    return module
+if TYPE_CHECKING:
+    from storytime import story  # pragma: no cover
+
+
+CATALOG_SEPARATOR = ","
+CATALOG_TITLE = "Storytime"
+
+# The mtime and size of each stories module when it was last executed
+_stamps: dict[str, tuple[int, int]] = {}
+
+
+def import_stories(
+    stories_path: Path, module_name: Optional[str] = None, reload: bool = False
+) -> ModuleType:
+    """Given a full path to a stories file, import and return the module.
+
+    With a module name, the module is imported under that name and kept
+    in ``sys.modules``. A module already imported, here or by a normal
+    import, is reused as long as its file is unchanged. A changed file,
+    or ``reload=True``, executes the module again in place.
+
+    Without a module name, the file is executed as a new, unregistered
+    module every time.
+
+    Args:
+        stories_path: The full path to a ``stories.py``.
+        module_name: The module's fully qualified dotted name.
+        reload: Execute the module again, even if it looks unchanged.
+
+    Returns:
+        The module.
+
+    Raises:
+        ModuleNotFoundError: If there's no stories file at the path.
+    """
+    if module_name is None:
+        spec = spec_from_file_location(stories_path.name, stories_path)
+        if spec is None:
+            # No module at that path
+            msg = f"No stories file at {stories_path}"
+            raise ModuleNotFoundError(msg)
+        module = module_from_spec(spec)
+        spec.loader.exec_module(module)  # type: ignore
+        return module
+
+    stat = stories_path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    existing = sys.modules.get(module_name)
+    if existing is None:
+        existing = import_module(module_name)
+    elif reload or _stamps.get(module_name, stamp) != stamp:
+        existing = reload_module(existing)
+    _stamps[module_name] = stamp
+    return existing
+
+
+def stories_module_name(root_path: str, package_path: str) -> str:
+    """The fully qualified name of a stories module.
+
+    Args:
+        root_path: The dotted name of the root package.
+        package_path: The dotted path of the node, relative to the root.
+
+    Returns:
+        A name such as ``examples.minimal.components.stories``.
+    """
+    parts = [part for part in package_path.split(".") if part]
+    return ".".join((root_path, *parts, "stories"))
 
 
 def get_certain_callable(module: ModuleType) -> Optional[Union[Site, Section, Subject]]:
@@ -68,6 +140,34 @@ def get_certain_callable(module: ModuleType) -> Optional[Union[Site, Section, Su
     return None
 
 
+def get_tree_paths(
+    root_path: str, stories_path: Path
+) -> tuple[str, str, Optional[str]]:
+    """Convert a stories file location into its place in the tree.
+
+    Args:
+        root_path: The dotted name of the root package.
+        stories_path: The full path to a ``stories.py`` in that package.
+
+    Returns:
+        The node's name, its dotted package path and its parent's. These
+        are interned, since each path is also another node's parent path
+        and the key of several lookups.
+    """
+    # We want dotted-package-strings for current and parent.
+    pure_root_path = cast(Path, files(root_path))
+    this_package = stories_path.parent
+    package_path = this_package.relative_to(pure_root_path)
+    parent_path = package_path.parent
+    if parent_path == package_path:
+        # We are at the root stories.py getting a Site
+        return "", ".", None
+    name = package_path.name
+    dotted_path = "." + ".".join(package_path.parts)
+    dotted_parent = "." + ".".join(parent_path.parts)
+    return sys.intern(name), sys.intern(dotted_path), sys.intern(dotted_parent)
+
+
 @dataclass()
 class TreeNode:
     """Adapt a story path into all info needed to seat in tree.
@@ -79,81 +179,408 @@ class TreeNode:
 
     root_path: str
     stories_path: Path
+    reload: bool = False
     name: str = field(init=False)
     called_instance: object = field(init=False)
     package_path: str = field(init=False)
     parent_path: Optional[str] = field(init=False)
+    from_cache: bool = field(default=False, init=False)
 
     def __post_init__(self) -> None:
         """Assign calculated fields."""
-        story_module = import_stories(self.stories_path)
-        self.called_instance = get_certain_callable(story_module)
-
-        # We want dotted-package-strings for current and parent.
-        pure_root_path = cast(Path, files(self.root_path))
-        this_package = self.stories_path.parent
-        package_path = this_package.relative_to(pure_root_path)
-        parent_path = package_path.parent
-        if parent_path == package_path:
-            # We are at the root stories.py getting a Site
-            self.name = ""
-            self.parent_path = None
-            self.package_path = "."
-        else:
-            self.name = package_path.name
-            self.package_path = f".{package_path}".replace("/", ".")
-            self.parent_path = "." if str(parent_path) == "." else f".{parent_path}"
-
-
-def make_site(target_path: str) -> Site:
+        paths = get_tree_paths(self.root_path, self.stories_path)
+        self.name, self.package_path, self.parent_path = paths
+
+        stories = str(self.stories_path)
+        with span("import", stories=stories):
+            story_module = import_stories(
+                self.stories_path, self.module_name, reload=self.reload
+            )
+        with span("factory", stories=stories):
+            self.called_instance = get_certain_callable(story_module)
+
+    @property
+    def module_name(self) -> str:
+        """The fully qualified name of the stories module."""
+        return stories_module_name(self.root_path, self.package_path)
+
+
+def iter_tree_nodes(
+    target_path: str,
+    workers: int = 1,
+    cache: Optional[ScanCache] = None,
+    tree_node_class: type[TreeNode] = TreeNode,
+    cached_node_class: Optional[Callable[..., TreeNode]] = None,
+) -> Iterator[TreeNode]:
+    """Find and import every ``stories.py`` below a package, one at a time.
+
+    The stories files are visited in sorted path order, so the tree
+    nodes come in the same order no matter how many workers are used.
+    With more than one worker, the imports and factory calls run
+    concurrently in a thread pool. Each tree node is yielded as soon
+    as it, and those before it, are ready.
+
+    When given a scan cache, unchanged stories files which are known
+    to have no Site/Section/Subject factory aren't imported at all, and
+    the others are made into tree nodes by ``cached_node_class`` from
+    their entries, if given.
+
+    Args:
+        target_path: String using dotted package path notation.
+        workers: How many threads to use for building the tree nodes.
+        cache: A loaded scan cache from a previous run.
+        tree_node_class: The kind of tree node to make for each file.
+        cached_node_class: Makes a tree node from a fresh cache entry,
+            passed as ``entry``.
+
+    Yields:
+        The tree nodes, in sorted ``stories.py`` path order.
+    """
+    # Turn the package dotted name of self.target into ``Path``
+    root_path = cast(Path, files(target_path))
+
+    # Get all the stories.py under here
+    with span("glob"):
+        stories_paths = sorted(root_path.glob("**/stories.py"))
+    entries: dict[Path, CacheEntry] = {}
+    if cache is not None:
+        for stories_path in stories_paths:
+            entry = cache.lookup(stories_path)
+            if entry is not None:
+                entries[stories_path] = entry
+        stories_paths = [p for p in stories_paths if not _is_inert(entries.get(p))]
+
+    def make_tree_node(stories_path: Path) -> TreeNode:
+        entry = entries.get(stories_path)
+        if entry is not None and cached_node_class is not None:
+            return cached_node_class(target_path, stories_path, entry=entry)
+        return tree_node_class(root_path=target_path, stories_path=stories_path)
+
+    if workers < 2:
+        yield from map(make_tree_node, stories_paths)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # ``map`` yields in input order, keeping the linking deterministic
+        yield from executor.map(make_tree_node, stories_paths)
+
+
+def scan_tree_nodes(
+    target_path: str,
+    workers: int = 1,
+    cache: Optional[ScanCache] = None,
+    tree_node_class: type[TreeNode] = TreeNode,
+    cached_node_class: Optional[Callable[..., TreeNode]] = None,
+) -> list[TreeNode]:
+    """Find and import every ``stories.py`` below a package.
+
+    Args:
+        target_path: String using dotted package path notation.
+        workers: How many threads to use for building the tree nodes.
+        cache: A loaded scan cache from a previous run.
+        tree_node_class: The kind of tree node to make for each file.
+        cached_node_class: Makes a tree node from a fresh cache entry.
+
+    Returns:
+        The tree nodes, in sorted ``stories.py`` path order.
+    """
+    tree_nodes = iter_tree_nodes(
+        target_path, workers, cache, tree_node_class, cached_node_class
+    )
+    return list(tree_nodes)
+
+
+def _cached_node_class() -> Callable[..., TreeNode]:
+    """The tree node which seats a fresh cache entry as a lazy proxy."""
+    # The lazy module builds on this one, so can't be imported before it
+    from storytime.lazy import CachedTreeNode
+
+    return CachedTreeNode
+
+
+def _is_inert(entry: Optional[CacheEntry]) -> bool:
+    """A cached stories file that had nothing to put in the tree."""
+    return entry is not None and entry.kind is None
+
+
+def make_site(
+    target_path: str,
+    workers: int = 1,
+    cache_dir: Optional[Path] = None,
+    share_registry: bool = False,
+) -> Site:
     """Create a site with a populated tree.
 
     This is called from the CLI with a package-name path such
     as ``examples.minimal`` which is the root of a Storytime tree.
+    Several packages, separated by commas, make one catalog, see
+    ``make_catalog``.
 
     Args:
         target_path: String using dotted package path notation.
+        workers: How many threads to use when discovering stories.
+        cache_dir: Directory for the persistent scan cache, if any. On
+            a warm start, unchanged sections and subjects are seated
+            from it, and their stories files only imported on first use.
+        share_registry: For a catalog, give every package the combined
+            site's registry, see ``make_catalog``.
 
     Returns:
         A populated site.
     """
-    # Turn the package dotted name of self.target into ``Path``
-    root_path = cast(Path, files(target_path))
+    if is_catalog(target_path):
+        mounts = parse_mounts(target_path)
+        return make_catalog(mounts, workers, cache_dir, share_registry=share_registry)
+    cache = None
+    if cache_dir is not None:
+        cache = ScanCache(cache_dir=cache_dir, target_path=target_path).load()
+    tree_nodes = scan_tree_nodes(
+        target_path, workers, cache, cached_node_class=_cached_node_class()
+    )
+    site = link_site(tree_nodes)
+    if cache is not None:
+        cache.update(tree_nodes)
 
-    # Get all the stories.py under here
-    tree_nodes: list[TreeNode] = [
-        TreeNode(root_path=target_path, stories_path=stories_path)
-        for stories_path in root_path.glob("**/stories.py")
-    ]
-    # First get the Site
+    return site
+
+
+def is_catalog(target_path: str) -> bool:
+    """Whether a target names several packages, or mounts one.
+
+    Args:
+        target_path: The target given on the command line, for example.
+
+    Returns:
+        True for a target such as ``acme.buttons,forms=acme.forms``.
+    """
+    return CATALOG_SEPARATOR in target_path or "=" in target_path
+
+
+def parse_mounts(target_path: str) -> list[tuple[str, str]]:
+    """Read the mount name and package of each part of a catalog target.
+
+    Each part is either ``name=package`` or just a package, which is
+    then mounted under its dotted name, with underscores for the dots.
+
+    Args:
+        target_path: Comma-separated packages, such as
+            ``acme.buttons,forms=acme.forms``.
+
+    Returns:
+        Each mount name and package, in the order given.
+
+    Raises:
+        ValueError: If a mount name isn't one path segment, or two
+            packages would be mounted at the same name.
+    """
+    mounts: list[tuple[str, str]] = []
+    for part in target_path.split(CATALOG_SEPARATOR):
+        mount, _, package = part.strip().rpartition("=")
+        mount = mount.strip() or package.replace(".", "_")
+        if not mount or "." in mount or "/" in mount:
+            raise ValueError(f"Can't mount a package at {mount!r}")
+        if mount in (m for m, _package in mounts):
+            raise ValueError(f"Two packages are mounted at {mount!r}")
+        mounts.append((mount, package.strip()))
+    return mounts
+
+
+def make_catalog(
+    mounts: list[tuple[str, str]],
+    workers: int = 1,
+    cache_dir: Optional[Path] = None,
+    title: str = CATALOG_TITLE,
+    share_registry: bool = False,
+    tree_node_class: type[TreeNode] = TreeNode,
+) -> Site:
+    """Create one site from several packages, each under its own path.
+
+    Every package is scanned at the same time, in its own thread, each
+    with its own pool of ``workers`` and its own scan cache. Their
+    trees are then linked, in the given order, into one site with one
+    path index. A package's own ``Site`` becomes a section at its mount
+    name, keeping its title, parser and, unless the registry is shared,
+    its registry.
+
+    Args:
+        mounts: The mount name and dotted package of each root.
+        workers: How many threads each package uses to read its stories.
+        cache_dir: Directory for the persistent scan caches, if any.
+        title: The title of the combined site.
+        share_registry: Give every package the combined site's registry,
+            instead of the one from its own ``Site``.
+        tree_node_class: The kind of tree node to make for each file.
+
+    Returns:
+        The populated, combined site.
+    """
+
+    def scan(package: str) -> tuple[list[TreeNode], Optional[ScanCache]]:
+        cache = None
+        if cache_dir is not None:
+            cache = ScanCache(cache_dir=cache_dir, target_path=package).load()
+        tree_nodes = scan_tree_nodes(
+            package, workers, cache, tree_node_class, _cached_node_class()
+        )
+        return tree_nodes, cache
+
+    packages = [package for _mount, package in mounts]
+    with ThreadPoolExecutor(max_workers=max(len(packages), 1)) as executor:
+        scanned = list(executor.map(scan, packages))
+    site = Site(title=title)
+    site.package_path = "."
+    site.register(site)
+    for position, (mount, package) in enumerate(mounts):
+        tree_nodes, cache = scanned[position]
+        mount_package(site, tree_nodes, mount, package, share_registry)
+        if cache is not None:
+            cache.update(tree_nodes)
+    return site
+
+
+def mount_package(
+    site: Site,
+    tree_nodes: list[TreeNode],
+    mount: str,
+    package: str,
+    share_registry: bool = False,
+) -> Optional[Section]:
+    """Link one package's tree into a combined site, below a mount name.
+
+    Args:
+        site: The combined site.
+        tree_nodes: The tree nodes from scanning the package.
+        mount: The name of the package's section in the combined site.
+        package: The package's dotted name, its title if it has none.
+        share_registry: Use the combined site's registry, instead of the
+            one from the package's own ``Site``.
+
+    Returns:
+        The package's section, or ``None`` if it has no ``Site``.
+    """
+    section = None
+    with span("link", package=package):
+        for tree_node in sorted(tree_nodes, key=tree_depth):
+            mounted = mount_tree_node(tree_node, mount, package, share_registry)
+            node = mounted.called_instance
+            if isinstance(tree_node.called_instance, Site):
+                section = cast(Section, node)
+            parent = site.find_path(mounted.parent_path or ".")
+            seat_node(node, parent, mounted)
+    return section
+
+
+def mount_tree_node(
+    tree_node: TreeNode, mount: str, package: str, share_registry: bool = False
+) -> TreeNode:
+    """Copy a package's tree node to its place below a mount name.
+
+    The package's own ``Site`` is replaced by a ``Section``.
+
+    Args:
+        tree_node: A tree node from scanning the package.
+        mount: The name of the package's section in the combined site.
+        package: The package's dotted name, its title if it has none.
+        share_registry: Leave the section's registry unset, so it uses
+            the combined site's registry.
+
+    Returns:
+        A copy of the tree node, with mounted paths.
+    """
+    mounted = copy(tree_node)
+    if tree_node.parent_path is None:
+        mounted.name, mounted.package_path = mount, f".{mount}"
+        mounted.parent_path = "."
+    else:
+        mounted.package_path = f".{mount}{tree_node.package_path}"
+        parent_path = tree_node.parent_path.rstrip(".")
+        mounted.parent_path = f".{mount}{parent_path}"
+    node = tree_node.called_instance
+    if isinstance(node, Site):
+        mounted.called_instance = Section(
+            registry=None if share_registry else node.registry,
+            title=node.title or package,
+            parser=node.parser,
+        )
+    return mounted
+
+
+def link_site(tree_nodes: list[TreeNode]) -> Site:
+    """Seat the scanned Site, Sections and Subjects into one tree.
+
+    The tree nodes are ordered by depth, so every parent is linked
+    before its children, and then each is linked in one pass, finding
+    its parent through the site's path index. Sections can be nested
+    to any depth. A node whose parent isn't in the tree, or can't hold
+    it, is left out, along with everything below it.
+
+    Args:
+        tree_nodes: The tree nodes from scanning the stories files.
+
+    Returns:
+        The linked site.
+    """
     site: Optional[Site] = None
-    for tree_node in tree_nodes:
-        if isinstance(tree_node.called_instance, Site):
-            site = tree_node.called_instance
-            site.post_update(tree_node=tree_node)
-    site = cast(Site, site)
-
-    # Now the sections
-    for tree_node in tree_nodes:
-        section = tree_node.called_instance
-        if isinstance(section, Section):
-            section.post_update(parent=site, tree_node=tree_node)
-            site.items[section.name] = section
-
-    # Now the subjects
-    for tree_node in tree_nodes:
-        subject = tree_node.called_instance
-        if isinstance(subject, Subject):
-            # Getting the parent is a little harder here
-            if tree_node.parent_path:
+    with span("link"):
+        for tree_node in sorted(tree_nodes, key=tree_depth):
+            node = tree_node.called_instance
+            if isinstance(node, Site):
+                site = node.post_update(tree_node=tree_node)
+            elif site is not None and tree_node.parent_path is not None:
                 parent = site.find_path(tree_node.parent_path)
-                if isinstance(parent, Section):
-                    subject.post_update(parent=parent, tree_node=tree_node)
-                    parent.items[subject.name] = subject
+                seat_node(node, parent, tree_node)
+    return cast(Site, site)
 
-    return site
+
+def tree_depth(tree_node: TreeNode) -> int:
+    """How far below the root a tree node sits.
+
+    Args:
+        tree_node: A scanned tree node.
+
+    Returns:
+        Zero for the root, one for its children, and so on.
+    """
+    package_path = tree_node.package_path
+    return 0 if package_path == "." else package_path.count(".")
+
+
+def seat_node(node: object, parent: object, tree_node: TreeNode) -> bool:
+    """Link a Section or Subject under its parent, if it can go there.
+
+    Sections go in the Site or in another Section, Subjects only go in
+    a Section.
+
+    Args:
+        node: The scanned instance, usually a Section or Subject.
+        parent: The already linked node at the parent path, if any.
+        tree_node: The raw data from the scanning process.
+
+    Returns:
+        True if the node was linked.
+    """
+    if isinstance(node, Section) and isinstance(parent, Site):
+        parent.items[tree_node.name] = node.post_update(parent, tree_node)
+    elif isinstance(node, (Section, Subject)) and isinstance(parent, Section):
+        parent.items[tree_node.name] = node.post_update(parent, tree_node)
+    else:
+        return False
+    return True
+
+
+def node_kind(node: Union[Site, Section, Subject]) -> type:
+    """The base kind of a tree node, even for subclasses.
+
+    Args:
+        node: A Site, Section or Subject.
+
+    Returns:
+        One of ``Site``, ``Section`` or ``Subject``.
+    """
+    return next(k for k in (Site, Section, Subject) if isinstance(node, k))
 
 
+@slotted
 @dataclass()
 class Site:
     """The top of a Storytime catalog.
@@ -170,7 +597,23 @@ class Site:
     package_path: str = field(init=False)
     registry: Registry = field(default_factory=Registry)
     title: Optional[str] = None
+    parser: Optional[str] = None
     items: dict[str, Section] = field(default_factory=dict)
+    index: dict[str, Union[Site, Section, Subject]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    # Keyed by title or kind, then by path, in the order nodes were linked
+    titles: dict[str, dict[str, Union[Site, Section, Subject]]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    kinds: dict[type, dict[str, Union[Site, Section, Subject]]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    # The title each path is in ``titles`` under, which may since have changed
+    indexed_titles: dict[str, str] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    revision: int = field(default=0, init=False, repr=False, compare=False)
 
     def post_update(self, tree_node: TreeNode) -> Site:
         """The parent calls this after construction.
@@ -187,38 +630,176 @@ class Site:
         self.package_path = tree_node.package_path
         if self.title is None:
             self.title = tree_node.package_path
+        self.register(self)
 
         return self
 
+    def register(self, node: Union[Site, Section, Subject]) -> None:
+        """Add a linked node to the path, title and kind lookups.
+
+        A node already registered at the same path is replaced. Either
+        way the tree has changed, so the revision goes up.
+
+        Args:
+            node: A node whose ``post_update`` has run.
+        """
+        previous = self.index.get(node.package_path)
+        if previous is not None:
+            self._forget(node.package_path, previous)
+        self.index[node.package_path] = node
+        if node.title is not None:
+            self.titles.setdefault(node.title, {})[node.package_path] = node
+            self.indexed_titles[node.package_path] = node.title
+        self.kinds.setdefault(node_kind(node), {})[node.package_path] = node
+        self.revision += 1
+
+    def unregister(self, package_path: str) -> None:
+        """Drop a node, and everything below it, from the lookups.
+
+        Args:
+            package_path: The dotted path of the node leaving the tree.
+        """
+        prefix = package_path + "."
+        stale = [p for p in self.index if p == package_path or p.startswith(prefix)]
+        for path in stale:
+            self._forget(path, self.index.pop(path))
+        self.revision += 1
+
+    def _forget(self, package_path: str, node: Union[Site, Section, Subject]) -> None:
+        """Remove one node from the title and kind lookups."""
+        title = self.indexed_titles.pop(package_path, None)
+        if title is not None and title in self.titles:
+            titled = self.titles[title]
+            titled.pop(package_path, None)
+            if not titled:
+                del self.titles[title]
+        self.kinds.get(node_kind(node), {}).pop(package_path, None)
+
+    def iter_nodes(self) -> Iterator[Union[Site, Section, Subject]]:
+        """Walk the linked tree, depth first, starting with the site.
+
+        Yields:
+            The site, then each section followed by its subjects, in the
+            order they were linked.
+        """
+        stack: list[Union[Site, Section, Subject]] = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            if not isinstance(node, Subject):
+                stack.extend(reversed(node.items.values()))
+
     def find_path(self, path: str) -> Optional[Union[Site, Section, Subject, Story]]:
-        """Given a dotted path, traverse to the object."""
-        current = self
-        segments = path.split(".")[1:]
-        for segment in segments:
-            if current is not None:
-                current = current.items.get(segment)  # type: ignore
-        return current
+        """Given a dotted path, look up the object."""
+        return self.index.get(path)
+
+    def find_title(self, title: str) -> list[Union[Site, Section, Subject]]:
+        """All the nodes with the given title.
+
+        Args:
+            title: The exact title to look for.
+
+        Returns:
+            The matching nodes, in the order they were linked.
+        """
+        return list(self.titles.get(title, {}).values())
+
+    def find_kind(
+        self, kind: type[Union[Site, Section, Subject]]
+    ) -> list[Union[Site, Section, Subject]]:
+        """All the nodes of one kind, such as every ``Subject``.
+
+        Subclasses, such as lazy subjects, count as their base kind.
+
+        Args:
+            kind: The node class to look for.
 
+        Returns:
+            The matching nodes, in the order they were linked.
+        """
+        return list(self.kinds.get(kind, {}).values())
+
+    async def arender_all(
+        self, concurrency: int = 10, keys: Optional[list[tuple[str, int]]] = None
+    ) -> dict[tuple[str, int], str]:
+        """Render many stories concurrently, on the running event loop.
+
+        Stories with async templates wait for their data at the same
+        time, up to ``concurrency`` at once. Each story keeps its
+        markup, so later uses of ``rendered`` don't render again.
+
+        Args:
+            concurrency: How many stories may render at once.
+            keys: The subject path and index of each story to render,
+                by default every story in the site.
 
+        Returns:
+            The rendered markup by subject path and story index.
+        """
+        if keys is None:
+            keys = [
+                (node.package_path, index)
+                for node in self.iter_nodes()
+                if isinstance(node, Subject)
+                for index in range(len(node.stories))
+            ]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def render_one(key: tuple[str, int]) -> str:
+            this_story = self.find_story(*key)
+            if this_story is None:
+                return ""
+            async with semaphore:
+                return await this_story.arender()
+
+        rendered = await asyncio.gather(*(render_one(key) for key in keys))
+        return {key: rendered[position] for position, key in enumerate(keys)}
+
+    def find_story(self, path: str, index: int) -> Optional[story.Story]:
+        """Get a story by its subject's path and its position in the subject.
+
+        Args:
+            path: The dotted path of the subject.
+            index: The story's position in the subject's stories.
+
+        Returns:
+            The story, or ``None`` if there's no such story.
+        """
+        subject = self.index.get(path)
+        if not isinstance(subject, Subject) or not 0 <= index < len(subject.stories):
+            return None
+        return subject.stories[index]
+
+
+@slotted
 @dataclass()
 class Section:
-    """A grouping of stories, such as ``Views``."""
+    """A grouping of stories, such as ``Views``.
 
-    parent: Site = field(init=False)
+    Sections can hold Subjects and other Sections, nested to any depth.
+    """
+
+    parent: Union[Site, Section] = field(init=False)
     name: str = field(init=False)
     package_path: str = field(init=False)
     registry: Optional[Registry] = None
     title: Optional[str] = None
-    items: dict[str, Subject] = field(default_factory=dict)
+    parser: Optional[str] = None
+    items: dict[str, Union[Section, Subject]] = field(default_factory=dict)
 
-    def post_update(self, parent: Site, tree_node: TreeNode) -> Section:
+    @property
+    def site(self) -> Site:
+        """The Site at the top of the tree."""
+        return self.parent if isinstance(self.parent, Site) else self.parent.site
+
+    def post_update(self, parent: Union[Site, Section], tree_node: TreeNode) -> Section:
         """The parent calls this after construction.
 
         We do this as a convenience, so authors don't have to put a bunch
         of attributes in their stories.
 
         Args:
-            parent: The Site that is the parent in the tree.
+            parent: The Site or Section that is the parent in the tree.
             tree_node: The raw data from the scanning process.
 
         Returns:
@@ -229,11 +810,15 @@ class Section:
         self.package_path = tree_node.package_path
         if self.registry is None:
             self.registry = parent.registry
+        if self.parser is None:
+            self.parser = parent.parser
         if self.title is None:
             self.title = self.package_path
+        self.site.register(self)
         return self
 
 
+@slotted
 @dataclass()
 class Subject:
     """The component that a group of stories or variants is about."""
@@ -243,7 +828,14 @@ class Subject:
     package_path: str = field(init=False)
     registry: Optional[Registry] = None
     title: Optional[str] = None
-    stories: list[Story] = field(default_factory=list)
+    parser: Optional[str] = None
+    subject_path: Optional[Path] = None
+    stories: list[story.Story] = field(default_factory=list)
+
+    @property
+    def site(self) -> Site:
+        """The Site at the top of the tree."""
+        return self.parent.site
 
     def post_update(self, parent: Section, tree_node: TreeNode) -> Subject:
         """The parent calls this after construction.
@@ -263,11 +855,24 @@ class Subject:
         self.package_path = tree_node.package_path
         if self.registry is None:
             self.registry = parent.registry
+        if self.parser is None:
+            self.parser = parent.parser
+        if self.parser is not None:
+            self.stories = [
+                (
+                    replace(this_story, parser=self.parser)
+                    if this_story.parser is None
+                    else this_story
+                )
+                for this_story in self.stories
+            ]
         if self.title is None:
             self.title = self.package_path
+        self.site.register(self)
         return self
 
 
+@slotted
 @dataclass()
 class Story:
     """One way to look at a component."""
@@ -1,12 +1,389 @@
 """Command-line interface."""
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from typing import Optional
+
 import click
 
+from storytime import make_site
+from storytime import Section
+from storytime import Site
+from storytime import Subject
+from storytime.assets import ASSET_MANIFEST_NAME
+from storytime.assets import AssetManifest
+from storytime.build import build_site
+from storytime.build import render_chrome
+from storytime.build import rewrite_pages
+from storytime.budget import RenderBudget
+from storytime.budget import RenderLedger
+from storytime.cache import CACHE_DIRNAME
+from storytime.instrument import recording
+from storytime.lazy import LazyLoader
+from storytime.lazy import make_lazy_site
+from storytime.manifest import iter_manifest
+from storytime.pool import WorkerPool
+from storytime.search import search_document
+from storytime.search import write_search_index
+from storytime.server import make_server
+from storytime.server import RenderCache
+from storytime.server import StoryApp
+from storytime.server import watch_in_background
+from storytime.shard import build_shard
+from storytime.shard import load_costs
+from storytime.shard import merge_shards
+from storytime.shard import parse_shard
+from storytime.snapshot import check_snapshots
+from storytime.snapshot import SNAPSHOT_DIRNAME
+from storytime.snapshot import SnapshotStore
+from storytime.sniff import make_skeleton
+from storytime.watch import make_watcher
+
+profile_option = click.option(
+    "--profile",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write phase timings to this file and print a report.",
+)
+profile_format_option = click.option(
+    "--profile-format",
+    type=click.Choice(["chrome", "json"]),
+    default="chrome",
+    show_default=True,
+    help="Chrome trace events, or a JSON summary with every span.",
+)
+share_registry_option = click.option(
+    "--share-registry",
+    is_flag=True,
+    help="Give every package of a catalog the combined site's registry.",
+)
+
+
+@contextmanager
+def profiling(profile: Optional[Path], profile_format: str) -> Iterator[None]:
+    """Record the phases of a command, when asked to."""
+    if profile is None:
+        yield
+        return
+    with recording() as recorder:
+        yield
+    if profile_format == "chrome":
+        data = recorder.to_chrome_trace()
+    else:
+        data = recorder.to_json()
+    profile.write_text(json.dumps(data))
+    click.echo(recorder.report())
 
-@click.command()
+
+@click.group(invoke_without_command=True)
 @click.version_option()
 def main() -> None:
     """Storytime."""
 
 
+@main.command()
+@click.argument("package")
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=CACHE_DIRNAME,
+    show_default=True,
+    help="Where to keep the scan cache.",
+)
+@click.option("--no-cache", is_flag=True, help="Scan everything from scratch.")
+@click.option("--workers", default=1, show_default=True, help="Scanning threads.")
+@click.option("--static", is_flag=True, help="Read stories files without importing.")
+@profile_option
+@profile_format_option
+def scan(
+    package: str,
+    cache_dir: Path,
+    no_cache: bool,
+    workers: int,
+    static: bool,
+    profile: Optional[Path],
+    profile_format: str,
+) -> None:
+    """Scan PACKAGE for stories and summarize the catalog."""
+    with profiling(profile, profile_format):
+        if static:
+            site = make_skeleton(package, workers=workers)
+        else:
+            cache = None if no_cache else cache_dir
+            site = make_site(package, workers=workers, cache_dir=cache)
+    sections = site.find_kind(Section)
+    subjects = [s for s in site.find_kind(Subject) if isinstance(s, Subject)]
+    stories = sum(len(subject.stories) for subject in subjects)
+    click.echo(
+        f"{site.title}: {len(sections)} sections, "
+        f"{len(subjects)} subjects, {stories} stories"
+    )
+
+
+@main.command()
+@click.argument("package")
+@click.argument("outdir", type=click.Path(file_okay=False, path_type=Path))
+@click.option("--no-cache", is_flag=True, help="Scan everything from scratch.")
+@click.option("--workers", default=1, show_default=True, help="Render processes.")
+@click.option(
+    "--concurrency",
+    default=1,
+    show_default=True,
+    help="Stories each process renders at once, for async templates.",
+)
+@click.option("--search-index", is_flag=True, help="Also write a search index.")
+@click.option("--compress", is_flag=True, help="Also write .gz and .br files.")
+@click.option("--shard", help="Only build shard I of N of the pages, e.g. 1/4.")
+@click.option(
+    "--costs",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Render seconds from an earlier merge, to balance the shards.",
+)
+@click.option("--timeout", type=float, help="Give up on a story after N seconds.")
+@click.option("--max-memory", type=int, help="Cap each render process at N MiB.")
+@click.option(
+    "--report",
+    default=0,
+    show_default=True,
+    help="List the N slowest and heaviest stories.",
+)
+@profile_option
+@profile_format_option
+def build(
+    package: str,
+    outdir: Path,
+    no_cache: bool,
+    workers: int,
+    concurrency: int,
+    search_index: bool,
+    compress: bool,
+    shard: Optional[str],
+    costs: Optional[Path],
+    timeout: Optional[float],
+    max_memory: Optional[int],
+    report: int,
+    profile: Optional[Path],
+    profile_format: str,
+) -> None:
+    """Write the HTML for every story in PACKAGE to OUTDIR.
+
+    With more than one worker, rendering happens in other processes and
+    isn't part of the profile. With a shard, OUTDIR gets that shard's
+    pages and a partial manifest, for ``storytime merge``.
+
+    A story which fails to render, or runs past ``--timeout``, gets no
+    page. The others are still written, then the failures are listed
+    and the command exits with status 1.
+    """
+    cache_dir = None if no_cache else outdir.parent / CACHE_DIRNAME
+    budget = RenderBudget(
+        timeout=timeout,
+        max_memory=None if max_memory is None else max_memory * 1024 * 1024,
+        trace_memory=report > 0,
+    )
+    ledger = RenderLedger()
+
+    def write_index(site: Site, outdir: Path) -> None:
+        write_search_index(site, outdir, ledger.failed, ledger.documents)
+
+    with profiling(profile, profile_format):
+        if shard is None:
+            result = build_site(
+                package,
+                outdir,
+                workers=workers,
+                cache_dir=cache_dir,
+                stages=[write_index] if search_index else [],
+                concurrency=concurrency,
+                ledger=ledger,
+                compress=compress,
+                budget=budget,
+                documenter=search_document if search_index else None,
+            )
+        else:
+            try:
+                number, shards = parse_shard(shard)
+            except ValueError as exc:
+                raise click.BadParameter(str(exc), param_hint="--shard") from exc
+            result = build_shard(
+                package,
+                outdir,
+                number,
+                shards,
+                costs=None if costs is None else load_costs(costs),
+                workers=workers,
+                cache_dir=cache_dir,
+                concurrency=concurrency,
+                search_index=search_index,
+                compress=compress,
+                budget=budget,
+            )
+    failed = f", {result.failed} failed" if result.failed else ""
+    click.echo(
+        f"{result.pages} pages ({result.written} written, "
+        f"{result.unchanged} unchanged{failed}) in {result.seconds:.2f}s, "
+        f"{result.pages_per_second:.1f} pages/s"
+    )
+    summary = result.ledger.report(report)
+    if summary:
+        click.echo(summary)
+    if result.failed:
+        raise SystemExit(1)
+
+
+@main.command()
+@click.argument("outdir", type=click.Path(file_okay=False, path_type=Path))
+@click.argument(
+    "shard_dirs",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+def merge(outdir: Path, shard_dirs: tuple[Path, ...]) -> None:
+    """Combine the output of every shard, in SHARD_DIRS, into OUTDIR."""
+    try:
+        report = merge_shards(list(shard_dirs), outdir)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(
+        f"{report.pages} pages from {report.shards} shards, {report.files} files "
+        f"({report.written} written) in {report.seconds:.2f}s"
+    )
+
+
+@main.command()
+@click.argument("package")
+@click.option("--interval", default=0.5, show_default=True, help="Seconds per poll.")
+@click.option(
+    "--outdir",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Re-render the affected pages into this directory.",
+)
+@share_registry_option
+def watch(
+    package: str, interval: float, outdir: Optional[Path], share_registry: bool
+) -> None:
+    """Build PACKAGE, then patch the catalog as its files change."""
+    site = make_site(package, share_registry=share_registry)
+    watcher = make_watcher(package, site, share_registry)
+    click.echo(f"Watching {package}")
+    assets: list[str] = []
+    chrome: list[Optional[bytes]] = [None]
+    if outdir is not None:
+        assets = AssetManifest.load(outdir / ASSET_MANIFEST_NAME).links
+        chrome[0] = render_chrome(site, assets)
+
+    def report(updated: list[str]) -> None:
+        click.echo(f"Updated: {', '.join(updated)}")
+        if outdir is not None:
+            written, chrome[0] = rewrite_pages(site, outdir, updated, assets, chrome[0])
+            click.echo(f"Wrote {written} pages")
+
+    watcher.watch(report, interval=interval)
+
+
+@main.command()
+@click.argument("package")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8000, show_default=True)
+@click.option("--cache-size", default=1024, show_default=True, help="Cached pages.")
+@click.option("--interval", default=0.5, show_default=True, help="Seconds per poll.")
+@click.option("--lazy", is_flag=True, help="Import each subject on first use.")
+@click.option("--max-loaded", type=int, help="Subjects kept loaded in lazy mode.")
+@click.option(
+    "--max-memory",
+    type=int,
+    help="Release the loaded subjects when the server passes N MiB.",
+)
+@click.option("--pool", default=0, show_default=True, help="Warm render processes.")
+@click.option("--max-renders", type=int, help="Recycle a render process after N.")
+@click.option("--max-rss", type=int, help="Recycle a render process above N MiB.")
+@share_registry_option
+def serve(
+    package: str,
+    host: str,
+    port: int,
+    cache_size: int,
+    interval: float,
+    lazy: bool,
+    max_loaded: Optional[int],
+    max_memory: Optional[int],
+    pool: int,
+    max_renders: Optional[int],
+    max_rss: Optional[int],
+    share_registry: bool,
+) -> None:
+    """Serve the story pages of PACKAGE, re-rendering what changes."""
+    loader = None
+    if lazy:
+        memory = None if max_memory is None else max_memory * 1024 * 1024
+        loader = LazyLoader(max_loaded=max_loaded, max_memory=memory)
+        site = make_lazy_site(package, loader=loader, share_registry=share_registry)
+    else:
+        site = make_site(package, share_registry=share_registry)
+    watcher = make_watcher(package, site, share_registry)
+    app = StoryApp(watcher=watcher, cache=RenderCache(maxsize=cache_size))
+    app.loader = loader
+    if pool:
+        app.pool = WorkerPool(
+            package,
+            workers=pool,
+            max_renders=max_renders,
+            max_rss=None if max_rss is None else max_rss * 1024 * 1024,
+            share_registry=share_registry,
+        ).start()
+    server = make_server(app, host=host, port=port)
+    watch_in_background(app, interval=interval)
+    click.echo(f"Serving {package} on http://{host}:{server.server_port}")
+    server.serve_forever()
+
+
+@main.command()
+@click.argument("package")
+@click.option("--workers", default=1, show_default=True, help="Scanning threads.")
+@click.option(
+    "--metadata-only",
+    is_flag=True,
+    help="Read stories files without importing or rendering.",
+)
+def manifest(package: str, workers: int, metadata_only: bool) -> None:
+    """Stream the structure of PACKAGE as JSON Lines, one record per node."""
+    records = iter_manifest(package, workers=workers, metadata_only=metadata_only)
+    for record in records:
+        click.echo(json.dumps(record))
+
+
+@main.command()
+@click.argument("package")
+@click.option(
+    "--snapshot-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=SNAPSHOT_DIRNAME,
+    show_default=True,
+    help="Directory of snapshot shards.",
+)
+@click.option("--update-snapshots", is_flag=True, help="Store the new renderings.")
+@click.option("--workers", default=1, show_default=True, help="Render processes.")
+def snapshot(
+    package: str, snapshot_dir: Path, update_snapshots: bool, workers: int
+) -> None:
+    """Compare the rendered stories of PACKAGE with their snapshots."""
+    store = SnapshotStore(snapshot_dir)
+    report = check_snapshots(package, store, workers=workers, update=update_snapshots)
+    for key, diff in report.changed.items():
+        click.echo(f"Changed: {key}\n{diff}")
+    for key in report.missing:
+        click.echo(f"Missing: {key}")
+    for key in report.stale:
+        click.echo(f"Stale: {key}")
+    click.echo(
+        f"{report.matched} matched, {report.updated} updated, "
+        f"{len(report.changed)} changed, {len(report.missing)} missing, "
+        f"{len(report.stale)} stale in {report.seconds:.2f}s"
+    )
+    if not report.ok:
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     main(prog_name="storytime")  # pragma: no cover
@@ -0,0 +1,320 @@
+"""Copy a catalog's static files into the output, fingerprinted.
+
+Files in the ``static`` directory of the catalog package are copied to
+``static/`` in the output directory, or ``static/<mount>/`` for each
+package of a multi-package catalog, under names carrying a hash of
+their content, e.g. ``static/style.3f2a1b4c5d6e.css``. Such a name can
+be cached forever, since new content gets a new name. Files are
+hardlinked where possible, and only copied when their content changed.
+
+``asset-manifest.json`` maps each file's plain path to its fingerprinted
+one. It depends only on the files' content, so shards built on several
+machines publish the same manifest. The size and mtime each file had
+when it was hashed are kept in the cache directory instead, so
+unchanged files aren't hashed again on the next build.
+
+``precompress`` writes ``.gz`` siblings, and ``.br`` ones when the
+``brotli`` package is installed, for servers such as nginx to send
+as they are, with ``gzip_static`` and ``brotli_static``.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from dataclasses import field
+from hashlib import sha256
+from importlib import import_module
+from importlib.resources import files
+from importlib.util import find_spec
+from pathlib import Path
+from types import ModuleType
+from typing import Callable
+from typing import cast
+from typing import Mapping
+from typing import Optional
+
+from storytime import is_catalog
+from storytime import parse_mounts
+
+STATIC_DIRNAME = "static"
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+ASSET_MANIFEST_VERSION = 2
+ASSET_STAMPS_NAME = "asset-stamps.json"
+COMPRESSIBLE = frozenset(
+    (".css", ".html", ".js", ".json", ".map", ".svg", ".txt", ".xml")
+)
+COMPRESS_MIN_SIZE = 256
+LINKED = frozenset((".css", ".js"))
+
+
+def static_dirs(target_path: str) -> dict[str, Path]:
+    """The directories of static files for a catalog.
+
+    Args:
+        target_path: String using dotted package path notation, or
+            several packages separated by commas.
+
+    Returns:
+        Each existing ``static`` directory, by the directory below
+        ``static/`` its files go to: none for a single package, or the
+        mount name of each package in a catalog.
+    """
+    if is_catalog(target_path):
+        packages = parse_mounts(target_path)
+    else:
+        packages = [("", target_path)]
+    found = {}
+    for mount, package in packages:
+        source_dir = cast(Path, files(package)) / STATIC_DIRNAME
+        if source_dir.is_dir():
+            found[mount] = source_dir
+    return found
+
+
+def fingerprinted(relative: Path, sha: str) -> Path:
+    """Put a content hash in a file name, before its suffix.
+
+    Args:
+        relative: The file's path in the output directory.
+        sha: The hex digest of the file's content.
+
+    Returns:
+        A path such as ``static/style.3f2a1b4c5d6e.css``.
+    """
+    return relative.with_name(f"{relative.stem}.{sha[:12]}{relative.suffix}")
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """Hardlink a file into place, or copy it across file systems.
+
+    Args:
+        source: The existing file.
+        target: Where it should also be.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_name(f".{target.name}.{os.getpid()}")
+    temporary.unlink(missing_ok=True)
+    try:
+        os.link(source, temporary)
+    except OSError:
+        shutil.copyfile(source, temporary)
+    os.replace(temporary, target)
+
+
+def _brotli() -> Optional[ModuleType]:
+    """The ``brotli`` module, if it is installed."""
+    return import_module("brotli") if find_spec("brotli") is not None else None
+
+
+def _gzip(content: bytes) -> bytes:
+    """Compress as hard as gzip can, without a timestamp."""
+    return gzip.compress(content, 9, mtime=0)
+
+
+def write_atomic(target: Path, content: bytes) -> None:
+    """Replace a file in one step, through a temporary file beside it.
+
+    The file gets the usual permissions for new files under the umask,
+    so a web server running as another user can read it.
+
+    Args:
+        target: The file to write.
+        content: The new bytes.
+    """
+    name = f".{target.name}.{os.getpid()}.{threading.get_ident()}"
+    temporary = target.with_name(name)
+    fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    with os.fdopen(fd, "wb") as tmp:
+        tmp.write(content)
+    os.replace(temporary, target)
+
+
+def precompress(path: Path) -> int:
+    """Write compressed siblings of a file, unless they're up to date.
+
+    Only text formats worth compressing are, and a sibling is only kept
+    when it is smaller than the file.
+
+    Args:
+        path: The file, such as a page or a stylesheet.
+
+    Returns:
+        How many siblings were written.
+    """
+    if path.suffix not in COMPRESSIBLE:
+        return 0
+    stat = path.stat()
+    if stat.st_size < COMPRESS_MIN_SIZE:
+        return 0
+    brotli = _brotli()
+    encoders: list[tuple[str, Callable[[bytes], bytes]]] = [(".gz", _gzip)]
+    if brotli is not None:
+        encoders.append((".br", brotli.compress))
+    content: Optional[bytes] = None
+    written = 0
+    for suffix, compress in encoders:
+        sibling = path.with_name(path.name + suffix)
+        try:
+            if sibling.stat().st_mtime_ns >= stat.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        if content is None:
+            content = path.read_bytes()
+        compressed = compress(content)
+        if len(compressed) < len(content):
+            write_atomic(sibling, compressed)
+            written += 1
+    return written
+
+
+@dataclass(frozen=True)
+class AssetEntry:
+    """Where a static file went, and the hash of its content."""
+
+    path: str
+    sha: str
+
+
+# The size and mtime a file had when hashed, and its hash
+Stamp = tuple[int, int, str]
+
+
+@dataclass()
+class AssetManifest:
+    """The fingerprinted path of every static file, by its plain path."""
+
+    assets: dict[str, AssetEntry] = field(default_factory=dict)
+    stamps: dict[str, Stamp] = field(default_factory=dict, compare=False)
+    copied: int = field(default=0, compare=False)
+
+    @property
+    def links(self) -> list[str]:
+        """The URLs of the stylesheets and scripts for every page."""
+        return [
+            "/" + entry.path
+            for name, entry in sorted(self.assets.items())
+            if Path(name).suffix in LINKED
+        ]
+
+    def save(self, target: Path) -> None:
+        """Write the manifest as JSON.
+
+        Args:
+            target: The file to write.
+        """
+        assets = {
+            name: dict(path=entry.path, sha=entry.sha)
+            for name, entry in sorted(self.assets.items())
+        }
+        data = dict(version=ASSET_MANIFEST_VERSION, assets=assets)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(target, json.dumps(data, indent=0).encode("utf-8"))
+
+    @classmethod
+    def load(cls, target: Path) -> AssetManifest:
+        """Read a manifest written by ``save``.
+
+        A missing, unreadable or outdated file gives an empty manifest.
+
+        Args:
+            target: The file to read.
+
+        Returns:
+            The manifest.
+        """
+        try:
+            data = json.loads(target.read_text())
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != ASSET_MANIFEST_VERSION:
+            return cls()
+        return cls(
+            {name: AssetEntry(**entry) for name, entry in data["assets"].items()}
+        )
+
+    def save_stamps(self, target: Path) -> None:
+        """Write the stamps of the files, for the next build.
+
+        Args:
+            target: The file to write, in the cache directory.
+        """
+        target.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(dict(sorted(self.stamps.items())), indent=0)
+        write_atomic(target, content.encode("utf-8"))
+
+    def load_stamps(self, target: Path) -> None:
+        """Read the stamps written by ``save_stamps``, if there are any.
+
+        Args:
+            target: The file to read.
+        """
+        try:
+            data = json.loads(target.read_text())
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict):
+            self.stamps = {
+                name: (int(size), int(mtime_ns), str(sha))
+                for name, (size, mtime_ns, sha) in data.items()
+            }
+
+
+def copy_assets(
+    source_dirs: Mapping[str, Path],
+    outdir: Path,
+    compress: bool = False,
+    cache_dir: Optional[Path] = None,
+) -> AssetManifest:
+    """Bring the fingerprinted static files in the output up to date.
+
+    Args:
+        source_dirs: Each static directory of the catalog, by the
+            directory below ``static/`` its files go to.
+        outdir: The root of the output directory.
+        compress: Also write compressed siblings of each file.
+        cache_dir: Where to keep the files' stamps. Without it, every
+            file is hashed on every build.
+
+    Returns:
+        The manifest, also written to the output directory, with how
+        many files were copied this time.
+    """
+    previous = AssetManifest.load(outdir / ASSET_MANIFEST_NAME)
+    stamps_file = None if cache_dir is None else cache_dir / ASSET_STAMPS_NAME
+    if stamps_file is not None:
+        previous.load_stamps(stamps_file)
+    manifest = AssetManifest()
+    sources = sorted(
+        (Path(STATIC_DIRNAME, mount, p.relative_to(source_dir)), p)
+        for mount, source_dir in source_dirs.items()
+        for p in source_dir.rglob("*")
+        if p.is_file()
+    )
+    for relative, source in sources:
+        if relative.name.startswith("."):
+            continue
+        name = relative.as_posix()
+        stat = source.stat()
+        entry = previous.assets.get(name)
+        stamp = previous.stamps.get(name)
+        if entry is None or stamp != (stat.st_size, stat.st_mtime_ns, entry.sha):
+            sha = sha256(source.read_bytes()).hexdigest()
+            entry = AssetEntry(fingerprinted(relative, sha).as_posix(), sha)
+        target = outdir / entry.path
+        if not target.exists():
+            link_or_copy(source, target)
+            manifest.copied += 1
+        if compress:
+            precompress(target)
+        manifest.assets[name] = entry
+        manifest.stamps[name] = (stat.st_size, stat.st_mtime_ns, entry.sha)
+    if manifest.assets or previous.assets:
+        manifest.save(outdir / ASSET_MANIFEST_NAME)
+    if stamps_file is not None and (manifest.stamps or previous.stamps):
+        manifest.save_stamps(stamps_file)
+    return manifest
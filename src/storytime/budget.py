@@ -0,0 +1,183 @@
+"""Keep one story from stalling or exhausting a whole build.
+
+A ``RenderBudget`` limits how long each story may take to render and,
+in worker processes, how much memory the process may use. A story past
+its budget, or whose template raises, is recorded in the
+``RenderLedger`` as a failure, with its package path and title, and
+the build carries on without its page.
+
+The ledger also keeps the seconds each story took and, when asked to
+trace memory, the peak memory its render allocated, to report the
+slowest and heaviest stories. When the build is asked for them, it
+also carries what the search index needs from each rendered story.
+
+The time limit uses ``SIGALRM``, so it only applies on Unix, in a main
+thread, and only interrupts Python code. An async template is instead
+given up on after the timeout by ``asyncio.wait_for``.
+"""
+from __future__ import annotations
+
+import signal
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from dataclasses import field
+from types import FrameType
+from typing import Iterator
+from typing import Optional
+
+
+class RenderTimeoutError(Exception):
+    """A story took longer to render than its budget allows."""
+
+
+@dataclass(frozen=True)
+class RenderBudget:
+    """Limits on rendering each story."""
+
+    timeout: Optional[float] = None
+    max_memory: Optional[int] = None
+    trace_memory: bool = False
+
+
+@dataclass(frozen=True)
+class RenderFailure:
+    """A story whose page couldn't be rendered."""
+
+    key: str
+    package_path: str
+    index: int
+    title: str
+    error: str
+
+
+@dataclass()
+class RenderLedger:
+    """What rendering each story cost, and which stories failed."""
+
+    seconds: dict[str, float] = field(default_factory=dict)
+    peaks: dict[str, int] = field(default_factory=dict)
+    titles: dict[str, str] = field(default_factory=dict)
+    failures: list[RenderFailure] = field(default_factory=list)
+    # Each story's search fingerprint and visible text, by story ID
+    documents: dict[str, tuple[str, str]] = field(default_factory=dict)
+
+    def merge(self, other: RenderLedger) -> None:
+        """Add the records of another ledger, such as a worker's.
+
+        Args:
+            other: The ledger to take records from.
+        """
+        self.seconds.update(other.seconds)
+        self.peaks.update(other.peaks)
+        self.titles.update(other.titles)
+        self.failures.extend(other.failures)
+        self.documents.update(other.documents)
+
+    @property
+    def failed(self) -> set[str]:
+        """The IDs of the stories which failed, for later stages to skip."""
+        return {failure.key for failure in self.failures}
+
+    def slowest(self, limit: int = 10) -> list[tuple[str, float]]:
+        """The stories that took longest to render.
+
+        Args:
+            limit: How many stories to return.
+
+        Returns:
+            Story IDs and their seconds, slowest first.
+        """
+        ranked = sorted(self.seconds.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def heaviest(self, limit: int = 10) -> list[tuple[str, int]]:
+        """The stories whose render allocated the most memory at its peak.
+
+        Args:
+            limit: How many stories to return.
+
+        Returns:
+            Story IDs and their peak bytes, heaviest first.
+        """
+        ranked = sorted(self.peaks.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def report(self, limit: int = 10) -> str:
+        """A plain text report of the failures and the outliers.
+
+        Args:
+            limit: How many of the slowest and heaviest stories to list.
+
+        Returns:
+            The report.
+        """
+        lines = []
+        if self.failures:
+            lines.append(f"Failed {len(self.failures)} stories:")
+            for failure in self.failures:
+                lines.append(
+                    f"  {failure.package_path} {failure.index}"
+                    f" ({failure.title}): {failure.error}"
+                )
+        if limit and self.seconds:
+            lines.append(f"Slowest {limit} stories:")
+            for key, seconds in self.slowest(limit):
+                lines.append(f"  {seconds:>10.4f}s  {key} ({self.titles.get(key)})")
+        if limit and self.peaks:
+            lines.append(f"Heaviest {limit} stories:")
+            for key, peak in self.heaviest(limit):
+                kib = peak / 1024
+                lines.append(f"  {kib:>10.1f}KiB  {key} ({self.titles.get(key)})")
+        return "\n".join(lines)
+
+
+@contextmanager
+def time_limit(seconds: Optional[float]) -> Iterator[None]:
+    """Raise ``RenderTimeoutError`` in the block once it runs too long.
+
+    Without ``SIGALRM``, or outside the main thread, there is no limit.
+
+    Args:
+        seconds: The limit, or ``None`` for no limit.
+
+    Yields:
+        Nothing, the block runs under the limit.
+    """
+    main = threading.current_thread() is threading.main_thread()
+    if seconds is None or not main or not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def expire(signum: int, frame: Optional[FrameType]) -> None:
+        raise RenderTimeoutError(f"took over {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def limit_memory(max_memory: Optional[int]) -> None:
+    """Cap this process's address space, so a runaway render fails.
+
+    Allocations past the cap raise ``MemoryError`` in the render. Only
+    call this in worker processes, and where the ``resource`` module
+    exists.
+
+    Args:
+        max_memory: The cap in bytes, or ``None`` for no cap.
+    """
+    if max_memory is None:
+        return
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return
+    _soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        max_memory = min(max_memory, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (max_memory, hard))
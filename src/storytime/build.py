@@ -0,0 +1,608 @@
+"""Write the HTML for every story in a catalog to an output directory.
+
+Each ``Story`` becomes one page, at a path derived from its subject's
+package path and its position in the subject, e.g.
+``components/heading/story-0.html``.
+
+Every page shares the same chrome: the site's title, a navigation tree
+of its sections and subjects, and links to static assets. That chrome
+is rendered once per revision of the tree, kept in a ``FragmentCache``,
+and spliced into each page as bytes, around the story's own markup.
+
+Pages are written atomically, through a temporary file in the same
+directory, and only when their bytes differ from what's already on
+disk. Unchanged pages keep their mtime, which keeps rsync and CDN
+invalidation quiet. The catalog's static files are copied first, see
+``storytime.assets``, so pages can link to their fingerprinted names.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from functools import partial
+from hashlib import sha256
+from html import escape
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import cast
+from typing import Hashable
+from typing import Iterator
+from typing import Optional
+from typing import Sequence
+from typing import TypeVar
+from typing import Union
+
+from storytime import make_site
+from storytime import Section
+from storytime import Site
+from storytime import Subject
+from storytime.assets import copy_assets
+from storytime.assets import precompress
+from storytime.assets import static_dirs
+from storytime.assets import write_atomic
+from storytime.budget import limit_memory
+from storytime.budget import RenderBudget
+from storytime.budget import RenderFailure
+from storytime.budget import RenderLedger
+from storytime.budget import RenderTimeoutError
+from storytime.budget import time_limit
+from storytime.instrument import span
+
+StoryKey = tuple[str, int]
+T = TypeVar("T")
+BuildStage = Callable[[Site, Path], None]
+KeySelector = Callable[[Site, list[StoryKey]], list[StoryKey]]
+# Takes what a later stage needs from a rendered story, in the process
+# that rendered it, e.g. ``storytime.search.search_document``
+Documenter = Callable[[Subject, Any], tuple[str, str]]
+
+PAGE_START = b"""\
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>"""
+PLAIN_CHROME = b"""\
+</title>
+</head>
+<body>
+"""
+PAGE_END = b"""
+</body>
+</html>
+"""
+
+
+@dataclass()
+class BuildReport:
+    """What happened during a build."""
+
+    pages: int = 0
+    written: int = 0
+    seconds: float = 0.0
+    ledger: RenderLedger = field(default_factory=RenderLedger, repr=False)
+
+    @property
+    def failed(self) -> int:
+        """Pages whose story failed to render, or ran past its budget."""
+        return len(self.ledger.failures)
+
+    @property
+    def unchanged(self) -> int:
+        """Pages whose bytes matched the file already on disk."""
+        return self.pages - self.written - self.failed
+
+    @property
+    def pages_per_second(self) -> float:
+        """Overall throughput of the build."""
+        return self.pages / self.seconds if self.seconds else 0.0
+
+
+def iter_stories(site: Site) -> Iterator[tuple[Subject, int, Any]]:
+    """Walk every story in the site, in tree order.
+
+    Args:
+        site: A populated site.
+
+    Yields:
+        The subject, the story's index in the subject, and the story.
+    """
+    for node in site.iter_nodes():
+        if isinstance(node, Subject):
+            for index, story in enumerate(node.stories):
+                yield node, index, story
+
+
+def subject_keys(site: Site, package_paths: list[str]) -> list[StoryKey]:
+    """The page keys for every story of the given subjects.
+
+    Paths which aren't subjects, or are no longer in the tree, are skipped.
+
+    Args:
+        site: A populated site.
+        package_paths: Dotted paths, e.g. the ones a watcher reports.
+
+    Returns:
+        The subject package path and story index of each page.
+    """
+    keys: list[StoryKey] = []
+    for package_path in package_paths:
+        subject = site.find_path(package_path)
+        if isinstance(subject, Subject):
+            keys.extend((package_path, i) for i in range(len(subject.stories)))
+    return keys
+
+
+def page_path(package_path: str, index: int) -> Path:
+    """The output-relative path for a story's page.
+
+    Args:
+        package_path: The dotted path of the story's subject.
+        index: The story's position in the subject.
+
+    Returns:
+        A relative path such as ``components/heading/story-0.html``.
+    """
+    return Path(*package_path.split(".")[1:], f"story-{index}.html")
+
+
+def story_id(package_path: str, index: int) -> str:
+    """A stable ID for a story, for tests and snapshots.
+
+    Args:
+        package_path: The dotted path of the story's subject.
+        index: The story's position in the subject.
+
+    Returns:
+        An ID such as ``components.heading-0``.
+    """
+    return f"{package_path.lstrip('.')}-{index}"
+
+
+def parse_page_path(path: str) -> Optional[StoryKey]:
+    """Turn a page's URL path back into its story key.
+
+    Args:
+        path: A URL path such as ``/components/heading/story-0.html``.
+
+    Returns:
+        The subject package path and story index, or ``None``.
+    """
+    *segments, filename = path.strip("/").split("/")
+    stem, _, index = filename.removesuffix(".html").rpartition("-")
+    if stem != "story" or not index.isdigit() or not filename.endswith(".html"):
+        return None
+    return "." + ".".join(segments), int(index)
+
+
+@dataclass()
+class FragmentCache:
+    """Rendered pieces of page chrome, kept until the tree changes.
+
+    Each fragment is kept with the site it shows and a key, such as the
+    site's revision, and is rendered again when either differs.
+    """
+
+    entries: dict[str, tuple[Site, Hashable, bytes]] = field(default_factory=dict)
+    renders: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def get(
+        self, name: str, site: Site, key: Hashable, render: Callable[[], bytes]
+    ) -> bytes:
+        """Get a fragment, rendering it if it's missing or out of date.
+
+        Args:
+            name: Which fragment, such as ``chrome``.
+            site: The site the fragment is rendered from.
+            key: What else the fragment depends on.
+            render: Makes the fragment's bytes.
+
+        Returns:
+            The rendered fragment.
+        """
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is not None and entry[0] is site and entry[1] == key:
+                return entry[2]
+        content = render()
+        with self.lock:
+            self.entries[name] = (site, key, content)
+            self.renders += 1
+        return content
+
+
+# The chrome shared by every page, for callers without their own cache
+_fragments = FragmentCache()
+
+
+def _attribute(value: str) -> str:
+    """Quote a value for an HTML attribute."""
+    return '"' + escape(value, quote=True) + '"'
+
+
+def _nav_items(node: Union[Site, Section]) -> Iterator[str]:
+    """The nested list items for a node's sections and subjects."""
+    yield "<ul>"
+    for child in node.items.values():
+        title = escape(child.title or child.name)
+        if isinstance(child, Subject):
+            href = "/" + page_path(child.package_path, 0).as_posix()
+            yield f"<li><a href={_attribute(href)}>{title}</a></li>"
+        else:
+            yield f"<li>{title}"
+            yield from _nav_items(child)
+            yield "</li>"
+    yield "</ul>"
+
+
+def render_chrome(site: Site, assets: Sequence[str] = ()) -> bytes:
+    """Render the markup every page shares, around the story's title.
+
+    Args:
+        site: A populated site.
+        assets: URLs of stylesheets and scripts to link to.
+
+    Returns:
+        The markup from the end of the title to the start of the body.
+    """
+    lines = ["</title>"]
+    for asset in assets:
+        if asset.endswith(".js"):
+            lines.append(f"<script src={_attribute(asset)} defer></script>")
+        else:
+            lines.append(f'<link rel="stylesheet" href={_attribute(asset)}>')
+    lines.extend(["</head>", "<body>"])
+    lines.append(f'<header><a href="/">{escape(site.title or "")}</a></header>')
+    lines.append("<nav>" + "".join(_nav_items(site)) + "</nav>")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def render_page(
+    story: Any,
+    site: Optional[Site] = None,
+    assets: Sequence[str] = (),
+    fragments: Optional[FragmentCache] = None,
+) -> bytes:
+    """Render a story into a complete HTML page.
+
+    Args:
+        story: The story to render.
+        site: The site, to put its title and navigation on the page.
+        assets: URLs of stylesheets and scripts to link to.
+        fragments: Where the chrome is kept between pages.
+
+    Returns:
+        The encoded page.
+    """
+    title = escape(story.title or "").encode("utf-8")
+    body = getattr(story, "rendered", "").encode("utf-8")
+    if site is None:
+        chrome = PLAIN_CHROME
+    else:
+        cache = _fragments if fragments is None else fragments
+        key = (site.revision, tuple(assets))
+        chrome = cache.get("chrome", site, key, partial(render_chrome, site, assets))
+    return b"".join((PAGE_START, title, chrome, body, PAGE_END))
+
+
+def rewrite_pages(
+    site: Site,
+    outdir: Path,
+    package_paths: list[str],
+    assets: Sequence[str] = (),
+    chrome: Optional[bytes] = None,
+) -> tuple[int, bytes]:
+    """Write the pages again after a watcher patched some subjects.
+
+    Every page shows the navigation, so when the chrome differs from
+    the one the pages were written with, e.g. after a node was added,
+    removed or retitled, every page is written again.
+
+    Args:
+        site: A populated site.
+        outdir: The root of the output directory.
+        package_paths: Dotted paths, e.g. the ones a watcher reports.
+        assets: URLs of stylesheets and scripts to link to.
+        chrome: The chrome the pages on disk were written with.
+
+    Returns:
+        How many pages were written, and the chrome they now have.
+    """
+    current = render_chrome(site, assets)
+    if current == chrome:
+        keys = subject_keys(site, package_paths)
+    else:
+        keys = [(s.package_path, index) for s, index, _story in iter_stories(site)]
+    return build_pages(site, outdir, keys, assets=assets), current
+
+
+def write_if_changed(target: Path, content: bytes) -> bool:
+    """Atomically write a file, unless it already has these bytes.
+
+    Args:
+        target: The file to write.
+        content: The new bytes.
+
+    Returns:
+        True if the file was written.
+    """
+    try:
+        if target.stat().st_size == len(content):
+            if sha256(target.read_bytes()).digest() == sha256(content).digest():
+                return False
+    except FileNotFoundError:
+        target.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(target, content)
+    return True
+
+
+def _render_budgeted(
+    site: Site,
+    key: StoryKey,
+    assets: Sequence[str],
+    budget: RenderBudget,
+    ledger: RenderLedger,
+) -> Optional[bytes]:
+    """Render one page within its budget, recording its cost or failure."""
+    package_path, index = key
+    story = site.find_story(package_path, index)
+    title = getattr(story, "title", None) or ""
+    key_id = story_id(package_path, index)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        with time_limit(budget.timeout):
+            content = render_page(story, site, assets)
+    except Exception as error:
+        failure = RenderFailure(key_id, package_path, index, title, _describe(error))
+        ledger.failures.append(failure)
+        return None
+    ledger.seconds[key_id] = time.perf_counter() - start
+    ledger.titles[key_id] = title
+    if tracing:
+        ledger.peaks[key_id] = tracemalloc.get_traced_memory()[1] - baseline
+    return content
+
+
+def _describe(error: BaseException) -> str:
+    """The exception's type and message, for a failure report."""
+    message = str(error)
+    return type(error).__name__ + (f": {message}" if message else "")
+
+
+async def _prerender(
+    site: Site, keys: list[StoryKey], concurrency: int, timeout: Optional[float]
+) -> dict[StoryKey, str]:
+    """Render stories concurrently, returning why any of them failed."""
+    semaphore = asyncio.Semaphore(concurrency)
+    errors: dict[StoryKey, str] = {}
+
+    async def render_one(key: StoryKey) -> None:
+        this_story = site.find_story(*key)
+        if this_story is None:
+            return
+        async with semaphore:
+            try:
+                await asyncio.wait_for(this_story.arender(), timeout)
+            except asyncio.TimeoutError:
+                errors[key] = _describe(RenderTimeoutError(f"took over {timeout}s"))
+            except Exception as error:
+                errors[key] = _describe(error)
+
+    await asyncio.gather(*(render_one(key) for key in keys))
+    return errors
+
+
+def build_pages(
+    site: Site,
+    outdir: Path,
+    keys: list[StoryKey],
+    concurrency: int = 1,
+    ledger: Optional[RenderLedger] = None,
+    assets: Sequence[str] = (),
+    compress: bool = False,
+    budget: Optional[RenderBudget] = None,
+    documenter: Optional[Documenter] = None,
+) -> int:
+    """Render and write the pages for some of the site's stories.
+
+    A story which fails to render, or runs past its budget, gets no
+    page. It is recorded in the ledger and the others carry on.
+
+    Args:
+        site: A populated site.
+        outdir: The root of the output directory.
+        keys: The subject package path and story index of each page.
+        concurrency: With more than one, render the stories first on an
+            event loop, so async templates wait for their data together.
+        ledger: Collects each story's render cost, and the failures.
+        assets: URLs of stylesheets and scripts to link to.
+        compress: Also write compressed siblings of each page.
+        budget: Limits on rendering each story.
+        documenter: Keeps a document of each rendered story in the
+            ledger, for the search index.
+
+    Returns:
+        How many pages were written.
+    """
+    budget = budget or RenderBudget()
+    ledger = RenderLedger() if ledger is None else ledger
+    errors: dict[StoryKey, str] = {}
+    if concurrency > 1:
+        errors = asyncio.run(_prerender(site, keys, concurrency, budget.timeout))
+    tracing = budget.trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    written = 0
+    try:
+        for key in keys:
+            if key in errors:
+                story = site.find_story(*key)
+                title = getattr(story, "title", None) or ""
+                failure = RenderFailure(story_id(*key), *key, title, errors[key])
+                ledger.failures.append(failure)
+                continue
+            content = _render_budgeted(site, key, assets, budget, ledger)
+            if content is None:
+                continue
+            if documenter is not None:
+                subject = cast(Subject, site.find_path(key[0]))
+                document = documenter(subject, site.find_story(*key))
+                ledger.documents[story_id(*key)] = document
+            target = outdir / page_path(*key)
+            with span("write", page=str(target)):
+                written += write_if_changed(target, content)
+                if compress:
+                    precompress(target)
+    finally:
+        if tracing:
+            tracemalloc.stop()
+    return written
+
+
+# Each worker process builds the site once and keeps it here
+_worker_site: Optional[Site] = None
+
+
+def _init_worker(target_path: str, max_memory: Optional[int] = None) -> None:
+    """Build the site in a fresh worker process, then cap its memory."""
+    global _worker_site
+    _worker_site = make_site(target_path)
+    limit_memory(max_memory)
+
+
+def _run_chunk(work: Callable[[Site, list[StoryKey]], T], keys: list[StoryKey]) -> T:
+    """Do some work on the worker's site."""
+    return work(cast(Site, _worker_site), keys)
+
+
+def map_chunks(
+    target_path: str,
+    keys: list[StoryKey],
+    work: Callable[[Site, list[StoryKey]], T],
+    workers: int,
+    max_memory: Optional[int] = None,
+) -> Iterator[T]:
+    """Spread work on some stories over processes which each build the site.
+
+    Args:
+        target_path: String using dotted package path notation.
+        keys: The subject package path and story index of each story.
+        work: Called in a worker with its site and a chunk of the keys.
+            It must be picklable, e.g. a module function or a partial.
+        workers: How many processes to start.
+        max_memory: Cap on each worker's memory, in bytes.
+
+    Yields:
+        The result of each chunk, in order.
+    """
+    # Interleave, so each worker gets a similar mix of subjects
+    chunks = [keys[i :: workers * 4] for i in range(workers * 4)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(target_path, max_memory),
+    ) as executor:
+        yield from executor.map(partial(_run_chunk, work), chunks)
+
+
+def _build_chunk(
+    outdir: Path,
+    concurrency: int,
+    assets: Sequence[str],
+    compress: bool,
+    budget: RenderBudget,
+    documenter: Optional[Documenter],
+    site: Site,
+    keys: list[StoryKey],
+) -> tuple[int, RenderLedger]:
+    """Build some pages using a worker's site."""
+    ledger = RenderLedger()
+    written = build_pages(
+        site, outdir, keys, concurrency, ledger, assets, compress, budget, documenter
+    )
+    return written, ledger
+
+
+def build_site(
+    target_path: str,
+    outdir: Path,
+    workers: int = 1,
+    cache_dir: Optional[Path] = None,
+    stages: Sequence[BuildStage] = (),
+    concurrency: int = 1,
+    select: Optional[KeySelector] = None,
+    ledger: Optional[RenderLedger] = None,
+    compress: bool = False,
+    budget: Optional[RenderBudget] = None,
+    documenter: Optional[Documenter] = None,
+) -> BuildReport:
+    """Write every story page of a catalog package.
+
+    Args:
+        target_path: String using dotted package path notation.
+        outdir: The root of the output directory.
+        workers: How many processes render pages.
+        cache_dir: Directory for the persistent scan cache, if any.
+        stages: Extra steps, such as writing a search index, which run
+            with the site and the output directory after the pages.
+        concurrency: How many stories each process renders at once.
+        select: Picks which of the site's pages to build, such as one
+            shard of them. By default every page is built.
+        ledger: Collects each story's render cost, and the failures.
+        compress: Also write compressed siblings of the pages and assets.
+        budget: Limits on rendering each story. Its memory cap only
+            applies to worker processes.
+        documenter: Keeps a document of each rendered story in the
+            ledger, taken where the story was rendered, so a search
+            index stage needn't render the stories again.
+
+    Returns:
+        A report with page counts, timing and the ledger.
+    """
+    start = time.perf_counter()
+    budget = budget or RenderBudget()
+    ledger = RenderLedger() if ledger is None else ledger
+    site = make_site(target_path, cache_dir=cache_dir)
+    source_dirs = static_dirs(target_path)
+    assets: list[str] = []
+    if source_dirs:
+        assets = copy_assets(source_dirs, outdir, compress, cache_dir).links
+    keys = [(s.package_path, index) for s, index, _story in iter_stories(site)]
+    if select is not None:
+        keys = select(site, keys)
+    if workers < 2:
+        written = build_pages(
+            site,
+            outdir,
+            keys,
+            concurrency,
+            ledger,
+            assets,
+            compress,
+            budget,
+            documenter,
+        )
+    else:
+        build_chunk = partial(
+            _build_chunk, outdir, concurrency, assets, compress, budget, documenter
+        )
+        written = 0
+        results = map_chunks(target_path, keys, build_chunk, workers, budget.max_memory)
+        for chunk_written, chunk_ledger in results:
+            written += chunk_written
+            ledger.merge(chunk_ledger)
+    for stage in stages:
+        stage(site, outdir)
+    seconds = time.perf_counter() - start
+    return BuildReport(len(keys), written, seconds, ledger)
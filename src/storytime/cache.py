@@ -0,0 +1,207 @@
+"""Remember what a scan found, so unchanged stories files skip the rework.
+
+The cache is one small JSON file per root package, kept in a cache
+directory. Each ``stories.py`` gets an entry with its fingerprint
+(mtime, size and a content hash) plus the tree metadata derived from
+it: name, package path, parent path, kind of node and titles.
+
+Invalidation rules:
+
+- A cache written by a different cache format version, or for a
+  different root package, is discarded as a whole.
+- An entry whose mtime and size still match the file is trusted.
+- Otherwise the content hash decides. If the content is the same
+  (e.g. after a ``touch`` or a fresh checkout) the entry is kept and
+  its stat info refreshed, else the entry is dropped.
+- Entries for stories files that no longer exist are dropped on save.
+
+A fresh entry for a section or subject is enough to seat it in the
+tree, as a lazy proxy: its ``stories.py`` is only imported when its
+stories are first used. Only the root ``stories.py`` is always
+imported, since its ``Site`` carries the registry. An entry confirmed
+fresh keeps its fingerprint, so saving doesn't hash its file again.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+from typing import Optional
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from storytime import TreeNode  # pragma: no cover
+
+CACHE_VERSION = 1
+CACHE_DIRNAME = ".storytime-cache"
+
+
+def fingerprint_file(stories_path: Path) -> tuple[int, int, str]:
+    """Return the mtime, size and content hash of a file.
+
+    Args:
+        stories_path: The file to fingerprint.
+
+    Returns:
+        A ``(mtime_ns, size, sha256 hexdigest)`` tuple.
+    """
+    stat = stories_path.stat()
+    digest = sha256(stories_path.read_bytes()).hexdigest()
+    return stat.st_mtime_ns, stat.st_size, digest
+
+
+@dataclass()
+class CacheEntry:
+    """The fingerprint and tree metadata for one ``stories.py``."""
+
+    mtime_ns: int
+    size: int
+    digest: str
+    name: str
+    package_path: str
+    parent_path: Optional[str]
+    kind: Optional[str]
+    title: Optional[str] = None
+    story_titles: list[str] = field(default_factory=list)
+
+    def is_fresh(self, stories_path: Path) -> bool:
+        """Check the entry still describes the file on disk.
+
+        Args:
+            stories_path: The file this entry was recorded for.
+
+        Returns:
+            True when the file is unchanged.
+        """
+        stat = stories_path.stat()
+        if stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size:
+            return True
+        digest = sha256(stories_path.read_bytes()).hexdigest()
+        if digest != self.digest:
+            return False
+        # Same content with a new mtime, remember the new stat info
+        self.mtime_ns, self.size = stat.st_mtime_ns, stat.st_size
+        return True
+
+
+@dataclass()
+class ScanCache:
+    """The persistent scan results for one root package."""
+
+    cache_dir: Path
+    target_path: str
+    entries: dict[str, CacheEntry] = field(default_factory=dict)
+    seen: set[str] = field(default_factory=set)
+    fresh: set[str] = field(default_factory=set)
+
+    @property
+    def cache_file(self) -> Path:
+        """The JSON file holding this root package's entries."""
+        return self.cache_dir / f"scan-{self.target_path}.json"
+
+    def load(self) -> ScanCache:
+        """Read the entries from disk, discarding a stale cache file.
+
+        Returns:
+            This cache, for chaining.
+        """
+        self.entries = {}
+        try:
+            data: dict[str, Any] = json.loads(self.cache_file.read_text())
+        except (OSError, ValueError):
+            return self
+        if data.get("version") != CACHE_VERSION:
+            return self
+        if data.get("target_path") != self.target_path:
+            return self
+        self.entries = {
+            path: CacheEntry(**entry) for path, entry in data["entries"].items()
+        }
+        return self
+
+    def save(self) -> None:
+        """Write the entries seen during this scan to disk."""
+        entries = {
+            path: asdict(entry)
+            for path, entry in sorted(self.entries.items())
+            if path in self.seen
+        }
+        data = dict(
+            version=CACHE_VERSION, target_path=self.target_path, entries=entries
+        )
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(data, indent=1))
+        tmp_file.replace(self.cache_file)
+
+    def lookup(self, stories_path: Path) -> Optional[CacheEntry]:
+        """Get the entry for a stories file, if it is still valid.
+
+        Args:
+            stories_path: The ``stories.py`` being scanned.
+
+        Returns:
+            The cached entry or ``None`` on a miss.
+        """
+        key = str(stories_path)
+        self.seen.add(key)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if not entry.is_fresh(stories_path):
+            del self.entries[key]
+            return None
+        self.fresh.add(key)
+        return entry
+
+    def record(self, tree_node: TreeNode) -> CacheEntry:
+        """Store what was learned from a freshly scanned tree node.
+
+        A node made from its entry leaves the entry as it is. For a file
+        ``lookup`` found unchanged, the fingerprint is reused.
+
+        Args:
+            tree_node: A tree node, after the site has been linked.
+
+        Returns:
+            The new entry.
+        """
+        key = str(tree_node.stories_path)
+        self.seen.add(key)
+        previous = self.entries.get(key)
+        if previous is not None and key in self.fresh:
+            if tree_node.from_cache:
+                return previous
+            mtime_ns, size, digest = previous.mtime_ns, previous.size, previous.digest
+        else:
+            mtime_ns, size, digest = fingerprint_file(tree_node.stories_path)
+        instance = tree_node.called_instance
+        kind = None if instance is None else type(instance).__name__.lower()
+        stories = getattr(instance, "stories", [])
+        entry = CacheEntry(
+            mtime_ns=mtime_ns,
+            size=size,
+            digest=digest,
+            name=tree_node.name,
+            package_path=tree_node.package_path,
+            parent_path=tree_node.parent_path,
+            kind=kind,
+            title=getattr(instance, "title", None),
+            story_titles=[story.title for story in stories],
+        )
+        self.entries[key] = entry
+        return entry
+
+    def update(self, tree_nodes: list[TreeNode]) -> None:
+        """Record all the freshly scanned tree nodes and save.
+
+        Args:
+            tree_nodes: The tree nodes, after the site has been linked.
+        """
+        for tree_node in tree_nodes:
+            self.record(tree_node)
+        self.save()
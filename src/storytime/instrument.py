@@ -0,0 +1,190 @@
+"""Time the phases of a catalog build.
+
+The build code wraps each phase in a ``span``: globbing for stories
+files, importing each one, calling its factory, linking the tree,
+rendering and parsing stories. Spans cost next to nothing unless a
+``Recorder`` is active, started with ``recording()``.
+
+A recorder can report per-phase totals and the slowest stories files,
+and export its spans as JSON or in the Chrome trace event format, for
+``chrome://tracing`` or Perfetto.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Iterator
+from typing import Optional
+
+
+@dataclass()
+class Span:
+    """One timed piece of work."""
+
+    name: str
+    start: float
+    duration: float
+    thread_id: int
+    args: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass()
+class Recorder:
+    """Collects spans from every thread while it is active."""
+
+    origin: float = field(default_factory=time.perf_counter)
+    spans: list[Span] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, span: Span) -> None:
+        """Keep a finished span.
+
+        Args:
+            span: The span to keep.
+        """
+        with self.lock:
+            self.spans.append(span)
+
+    def phases(self) -> dict[str, tuple[int, float]]:
+        """Count and total the time of each phase.
+
+        Returns:
+            A mapping of phase name to its count and total seconds.
+        """
+        totals: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+        for span in self.spans:
+            totals[span.name][0] += 1
+            totals[span.name][1] += span.duration
+        return {name: (int(total[0]), total[1]) for name, total in totals.items()}
+
+    def slowest_files(self, limit: int = 20) -> list[tuple[str, float]]:
+        """The stories files that took longest to import and call.
+
+        Args:
+            limit: How many files to return.
+
+        Returns:
+            Stories file paths and their seconds, slowest first.
+        """
+        totals: dict[str, float] = defaultdict(float)
+        for span in self.spans:
+            stories_path = span.args.get("stories")
+            if stories_path is not None:
+                totals[stories_path] += span.duration
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+    def to_json(self) -> dict[str, Any]:
+        """Summarize the phases and stories files, plus every span.
+
+        Returns:
+            A JSON-serializable dictionary.
+        """
+        phases = {
+            name: dict(count=count, seconds=seconds)
+            for name, (count, seconds) in self.phases().items()
+        }
+        spans = [
+            dict(
+                name=span.name,
+                start=span.start - self.origin,
+                duration=span.duration,
+                thread=span.thread_id,
+                args=span.args,
+            )
+            for span in self.spans
+        ]
+        return dict(
+            phases=phases,
+            stories_files=dict(self.slowest_files(limit=len(self.spans))),
+            spans=spans,
+        )
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Export the spans as Chrome trace "complete" events.
+
+        Returns:
+            A JSON-serializable dictionary in the trace event format.
+        """
+        pid = os.getpid()
+        events = [
+            dict(
+                name=span.name,
+                cat="storytime",
+                ph="X",
+                ts=(span.start - self.origin) * 1e6,
+                dur=span.duration * 1e6,
+                pid=pid,
+                tid=span.thread_id,
+                args=span.args,
+            )
+            for span in self.spans
+        ]
+        return dict(traceEvents=events, displayTimeUnit="ms")
+
+    def report(self, limit: int = 20) -> str:
+        """A plain text report of the phases and the slowest files.
+
+        Args:
+            limit: How many stories files to list.
+
+        Returns:
+            The report.
+        """
+        lines = ["Phases:"]
+        for name, (count, seconds) in sorted(
+            self.phases().items(), key=lambda item: item[1][1], reverse=True
+        ):
+            lines.append(f"  {name:<16} {count:>7} {seconds:>10.4f}s")
+        lines.append(f"Slowest {limit} stories files:")
+        for stories_path, seconds in self.slowest_files(limit):
+            lines.append(f"  {seconds:>10.4f}s  {stories_path}")
+        return "\n".join(lines)
+
+
+# The active recorder, shared by all threads
+_recorder: Optional[Recorder] = None
+
+
+@contextmanager
+def recording() -> Iterator[Recorder]:
+    """Record spans from every thread until the block exits.
+
+    Yields:
+        The active recorder.
+    """
+    global _recorder
+    previous, _recorder = _recorder, Recorder()
+    try:
+        yield _recorder
+    finally:
+        _recorder = previous
+
+
+@contextmanager
+def span(name: str, **args: str) -> Iterator[None]:
+    """Time a block as one span of the named phase, if recording.
+
+    Args:
+        name: The phase, such as ``import`` or ``render``.
+        **args: Details to keep, such as ``stories`` for a file path.
+
+    Yields:
+        Nothing, the block runs inside the span.
+    """
+    recorder = _recorder
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        recorder.add(Span(name, start, duration, threading.get_ident(), args))
@@ -0,0 +1,334 @@
+"""Build a site whose sections and subjects load on first use.
+
+The tree comes from the sniffer, so nothing below the root is imported
+at startup. Only the root ``stories.py`` is imported eagerly, since the
+``Site`` it returns carries the registry every node inherits.
+
+A lazy subject imports its ``stories.py`` the first time its stories
+are asked for, after loading its section. Loading holds a lock, so
+concurrent first requests import a subject only once. A shared loader
+remembers the loaded subjects in use order and can release their
+stories again, either past a fixed bound or, checked by ``relieve``,
+all at once while the process is past a memory bound. A released
+subject simply loads again on its next use.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import fields
+from dataclasses import replace
+from pathlib import Path
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing import Union
+
+from storytime import get_certain_callable
+from storytime import get_tree_paths
+from storytime import import_stories
+from storytime import is_catalog
+from storytime import link_site
+from storytime import make_catalog
+from storytime import parse_mounts
+from storytime import scan_tree_nodes
+from storytime import Section
+from storytime import Site
+from storytime import Subject
+from storytime import TreeNode
+from storytime.cache import CacheEntry
+from storytime.memory import resident_bytes
+from storytime.sniff import SniffedTreeNode
+
+if TYPE_CHECKING:
+    from storytime.story import Story  # pragma: no cover
+
+# Guards loading for sections, and for subjects without a loader
+_loading = threading.RLock()
+
+# Fields set when linking the tree, or kept by the proxy itself
+_LINKED_FIELDS = frozenset(("parent", "name", "package_path", "items", "stories"))
+
+
+@dataclass()
+class LazyLoader:
+    """Track which lazy subjects hold their stories, in use order."""
+
+    max_loaded: Optional[int] = None
+    max_memory: Optional[int] = None
+    loaded: OrderedDict[int, LazySubject] = field(default_factory=OrderedDict)
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+    def touch(self, subject: LazySubject) -> None:
+        """Mark a subject as just used, releasing the oldest past the bound.
+
+        Args:
+            subject: A subject whose stories are loaded.
+        """
+        with self.lock:
+            if not subject.is_loaded:
+                # Released by another thread since it was used
+                return
+            self.loaded[id(subject)] = subject
+            self.loaded.move_to_end(id(subject))
+            while self.max_loaded is not None and len(self.loaded) > self.max_loaded:
+                _key, oldest = self.loaded.popitem(last=False)
+                oldest.release()
+
+    def release_all(self) -> int:
+        """Drop every loaded subject's stories, e.g. under memory pressure.
+
+        Returns:
+            How many subjects were released.
+        """
+        with self.lock:
+            subjects = list(self.loaded.values())
+            self.loaded.clear()
+        for subject in subjects:
+            subject.release()
+        return len(subjects)
+
+    def relieve(self) -> int:
+        """Release every loaded subject if the process is past its bound.
+
+        Call this now and then, e.g. between polls for changes.
+
+        Returns:
+            How many subjects were released.
+        """
+        if self.max_memory is None or resident_bytes() <= self.max_memory:
+            return 0
+        return self.release_all()
+
+
+def adopt(
+    proxy: Union[LazySection, LazySubject], real: Union[Section, Subject]
+) -> None:
+    """Give a proxy every field its factory set, as a cold build would.
+
+    Fields the factory left unset keep what the proxy inherited from its
+    parent. A new title is registered again.
+
+    Args:
+        proxy: The lazy section or subject in the tree.
+        real: The node its factory returned.
+    """
+    title = proxy.title
+    for real_field in fields(real):
+        if real_field.name in _LINKED_FIELDS:
+            continue
+        value = getattr(real, real_field.name)
+        if value is not None:
+            setattr(proxy, real_field.name, value)
+    if proxy.title != title:
+        proxy.site.register(proxy)
+
+
+def load_factory(
+    stories_path: Path, module_name: Optional[str] = None
+) -> Optional[Union[Site, Section, Subject]]:
+    """Import a stories file and call its factory.
+
+    Args:
+        stories_path: The full path to a ``stories.py``.
+        module_name: The stories module's fully qualified name.
+
+    Returns:
+        The constructed node, or ``None`` without a factory.
+    """
+    return get_certain_callable(import_stories(stories_path, module_name))
+
+
+class LazySection(Section):
+    """A section which imports its stories file when first needed."""
+
+    stories_path: Optional[Path] = None
+    module_name: Optional[str] = None
+    loaded: bool = False
+
+    def load(self) -> None:
+        """Take the registry and title from the real factory."""
+        if self.loaded or self.stories_path is None:
+            return
+        with _loading:
+            if self.loaded:
+                return
+            if isinstance(self.parent, LazySection):
+                self.parent.load()
+            real = load_factory(self.stories_path, self.module_name)
+            if isinstance(real, Section):
+                adopt(self, real)
+            self.loaded = True
+
+
+class LazySubject(Subject):
+    """A subject which imports its stories file when its stories are used."""
+
+    stories_path: Optional[Path] = None
+    module_name: Optional[str] = None
+    loader: Optional[LazyLoader] = None
+    _stories: Optional[list[Story]] = None
+
+    @property
+    def stories(self) -> list[Story]:
+        """The stories, importing the stories file if needed."""
+        stories = self._stories
+        if stories is None:
+            with self.lock:
+                if self._stories is None:
+                    self.load()
+                stories = self._stories
+        elif self.loader is not None:
+            self.loader.touch(self)
+        return stories or []
+
+    @stories.setter
+    def stories(self, stories: list[Story]) -> None:
+        self._stories = stories
+
+    @property
+    def lock(self) -> threading.RLock:
+        """The lock held while loading, the loader's if there is one."""
+        return _loading if self.loader is None else self.loader.lock
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the stories are currently held in memory."""
+        return self._stories is not None
+
+    def load(self) -> None:
+        """Import the stories file and keep the real stories."""
+        if self.stories_path is None:
+            return
+        with self.lock:
+            if isinstance(self.parent, LazySection):
+                self.parent.load()
+            real = load_factory(self.stories_path, self.module_name)
+            if not isinstance(real, Subject):
+                self._stories = []
+                return
+            adopt(self, real)
+            parser = self.parser
+            self._stories = [
+                (
+                    s
+                    if parser is None or s.parser is not None
+                    else replace(s, parser=parser)
+                )
+                for s in real.stories
+            ]
+            if self.loader is not None:
+                self.loader.touch(self)
+
+    def release(self) -> None:
+        """Forget the stories, they load again on next use."""
+        self._stories = None
+
+    def post_update(self, parent: Section, tree_node: TreeNode) -> Subject:
+        """Link into the tree without loading the stories.
+
+        Args:
+            parent: The Section that is the parent in the tree.
+            tree_node: The raw data from the scanning process.
+
+        Returns:
+            The updated Subject.
+        """
+        stories, self._stories = self._stories, []
+        super().post_update(parent, tree_node)
+        self._stories = stories
+        return self
+
+
+@dataclass()
+class LazyTreeNode(SniffedTreeNode):
+    """Sniff a stories file, making lazy proxies instead of placeholders."""
+
+    def __post_init__(self) -> None:
+        """Assign calculated fields, importing only the root stories file."""
+        super().__post_init__()
+        if self.sniffed is None:
+            return
+        if self.sniffed.kind == "Site":
+            # The root stays eager, its Site carries the shared registry
+            TreeNode.__post_init__(self)
+            return
+        proxy: Union[LazySection, LazySubject]
+        if self.sniffed.kind == "Section":
+            proxy = LazySection(title=self.sniffed.title)
+        else:
+            proxy = LazySubject(title=self.sniffed.title)
+            proxy.release()
+        proxy.stories_path = self.stories_path
+        proxy.module_name = self.module_name
+        self.called_instance = proxy
+
+
+@dataclass()
+class CachedTreeNode(TreeNode):
+    """Seat a section or subject as a lazy proxy, from its scan cache entry.
+
+    Nothing is imported for it until its stories are used. Other kinds
+    of entries, e.g. the root's, are imported as usual.
+    """
+
+    entry: Optional[CacheEntry] = None
+
+    def __post_init__(self) -> None:
+        """Assign calculated fields, from the entry if it is enough."""
+        entry = self.entry
+        if entry is None or entry.kind not in ("section", "subject"):
+            super().__post_init__()
+            return
+        paths = get_tree_paths(self.root_path, self.stories_path)
+        self.name, self.package_path, self.parent_path = paths
+        proxy: Union[LazySection, LazySubject]
+        if entry.kind == "section":
+            proxy = LazySection(title=entry.title)
+        else:
+            proxy = LazySubject(title=entry.title)
+            proxy.release()
+        proxy.stories_path = self.stories_path
+        proxy.module_name = self.module_name
+        self.called_instance = proxy
+        self.from_cache = True
+
+
+def make_lazy_site(
+    target_path: str,
+    workers: int = 1,
+    loader: Optional[LazyLoader] = None,
+    share_registry: bool = False,
+) -> Site:
+    """Create a site whose sections and subjects load on first use.
+
+    Args:
+        target_path: String using dotted package path notation, or
+            several packages separated by commas.
+        workers: How many threads to use when reading stories files.
+        loader: Tracks loaded subjects, to bound or release them.
+        share_registry: For a catalog, give every package the combined
+            site's registry, see ``make_catalog``.
+
+    Returns:
+        A populated site.
+    """
+    if is_catalog(target_path):
+        mounts = parse_mounts(target_path)
+        site = make_catalog(
+            mounts,
+            workers,
+            share_registry=share_registry,
+            tree_node_class=LazyTreeNode,
+        )
+    else:
+        tree_nodes = scan_tree_nodes(
+            target_path, workers=workers, tree_node_class=LazyTreeNode
+        )
+        site = link_site(tree_nodes)
+    if loader is not None:
+        for subject in site.find_kind(Subject):
+            if isinstance(subject, LazySubject):
+                subject.loader = loader
+    return site
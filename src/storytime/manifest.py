@@ -0,0 +1,104 @@
+"""Describe a catalog's structure as a stream of JSON records.
+
+Each record is one node of the tree or one story, with its dotted path,
+its parent's path, its kind and its title. Stories also carry their
+index in the subject and, unless only metadata was asked for, the hash
+of their normalized rendering, which changes when their output does.
+
+``iter_manifest`` yields records while the stories files are still
+being scanned, in sorted ``stories.py`` path order, so consumers can
+start before the scan finishes. That order isn't tree order: a
+subject's file can sort before its section's. ``site_manifest`` walks
+an already linked site instead, in tree order.
+"""
+from __future__ import annotations
+
+from typing import Any
+from typing import Iterator
+from typing import Optional
+from typing import Union
+
+from storytime import iter_tree_nodes
+from storytime import node_kind
+from storytime import Section
+from storytime import Site
+from storytime import Subject
+from storytime import TreeNode
+from storytime.snapshot import Snapshot
+from storytime.sniff import SniffedTreeNode
+
+Record = dict[str, Any]
+
+
+def node_records(
+    node: Union[Site, Section, Subject],
+    package_path: str,
+    parent_path: Optional[str],
+    metadata_only: bool = False,
+) -> Iterator[Record]:
+    """The records for one node and, for a subject, its stories.
+
+    Args:
+        node: A Site, Section or Subject, linked or not.
+        package_path: The node's dotted path.
+        parent_path: The dotted path of the node's parent, if any.
+        metadata_only: Leave out the rendering hash of stories.
+
+    Yields:
+        The node's record, then one per story.
+    """
+    yield dict(
+        kind=node_kind(node).__name__,
+        path=package_path,
+        parent=parent_path,
+        title=node.title if node.title is not None else package_path,
+    )
+    if not isinstance(node, Subject):
+        return
+    for index, story in enumerate(node.stories):
+        record = dict(kind="Story", path=package_path, parent=package_path, index=index)
+        record["title"] = story.title
+        if not metadata_only:
+            record["sha"] = Snapshot.of(getattr(story, "rendered", "")).sha
+        yield record
+
+
+def iter_manifest(
+    target_path: str, workers: int = 1, metadata_only: bool = False
+) -> Iterator[Record]:
+    """Stream the records of a catalog package while scanning it.
+
+    Args:
+        target_path: String using dotted package path notation.
+        workers: How many threads to use when reading stories files.
+        metadata_only: Read the stories files without importing them or
+            rendering any templates.
+
+    Yields:
+        One record per node and per story.
+    """
+    tree_node_class = SniffedTreeNode if metadata_only else TreeNode
+    tree_nodes = iter_tree_nodes(
+        target_path, workers=workers, tree_node_class=tree_node_class
+    )
+    for tree_node in tree_nodes:
+        node = tree_node.called_instance
+        if isinstance(node, (Site, Section, Subject)):
+            yield from node_records(
+                node, tree_node.package_path, tree_node.parent_path, metadata_only
+            )
+
+
+def site_manifest(site: Site, metadata_only: bool = False) -> Iterator[Record]:
+    """The records of a linked site, in tree order.
+
+    Args:
+        site: A populated site.
+        metadata_only: Leave out the rendering hash of stories.
+
+    Yields:
+        One record per node and per story.
+    """
+    for node in site.iter_nodes():
+        parent_path = None if node.parent is None else node.parent.package_path
+        yield from node_records(node, node.package_path, parent_path, metadata_only)
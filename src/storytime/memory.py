@@ -0,0 +1,116 @@
+"""Keep the tree's nodes small, and measure how small they are.
+
+Catalog servers can hold several sites in one process, each with
+thousands of nodes and stories. ``slotted`` gives a dataclass
+``__slots__`` instead of a per-instance ``__dict__``, like
+``@dataclass(slots=True)`` does on Python 3.10 and later.
+"""
+from __future__ import annotations
+
+import os
+import sys
+from dataclasses import fields
+from dataclasses import MISSING
+from functools import wraps
+from typing import Any
+from typing import Callable
+from typing import cast
+from typing import Iterable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def slotted(cls: type[T]) -> type[T]:
+    """Rebuild a dataclass with ``__slots__`` for its fields.
+
+    Apply it above ``@dataclass``. Methods of the class must not use
+    zero-argument ``super()``, since they still refer to the original
+    class. Frozen instances get pickling support, which slots need.
+
+    Args:
+        cls: A dataclass without ``__slots__``.
+
+    Returns:
+        An equivalent class whose instances have no ``__dict__``.
+    """
+    cls_fields = fields(cls)  # type: ignore
+    names = tuple(f.name for f in cls_fields)
+    namespace = dict(cls.__dict__)
+    for name in (*names, "__dict__", "__weakref__"):
+        namespace.pop(name, None)
+    namespace["__slots__"] = names
+    namespace["__getstate__"] = _getstate
+    namespace["__setstate__"] = _setstate
+    # ``__init__`` leaves these to class attributes, which slots replace
+    defaults = {f.name: f.default for f in cls_fields if not f.init}
+    defaults = {k: v for k, v in defaults.items() if v is not MISSING}
+    if defaults:
+        namespace["__init__"] = _init_defaults(namespace["__init__"], defaults)
+    new_cls = type(cls.__name__, cls.__bases__, namespace)
+    new_cls.__qualname__ = cls.__qualname__
+    return cast(type[T], new_cls)
+
+
+def _init_defaults(
+    init: Callable[..., None], defaults: dict[str, Any]
+) -> Callable[..., None]:
+    """Wrap ``__init__`` to assign the defaults of non-init fields."""
+
+    @wraps(init)
+    def init_with_defaults(self: Any, *args: Any, **kwargs: Any) -> None:
+        for name, value in defaults.items():
+            object.__setattr__(self, name, value)
+        init(self, *args, **kwargs)
+
+    return init_with_defaults
+
+
+def _getstate(self: Any) -> dict[str, Any]:
+    """The assigned slots of an instance."""
+    return {n: getattr(self, n) for n in self.__slots__ if hasattr(self, n)}
+
+
+def _setstate(self: Any, state: dict[str, Any]) -> None:
+    """Restore the slots of an instance, even a frozen one."""
+    for name, value in state.items():
+        object.__setattr__(self, name, value)
+
+
+def footprint(objects: Iterable[object]) -> int:
+    """The bytes used by some objects themselves.
+
+    This counts each object and its instance dictionary, if it has one,
+    but nothing they refer to. Strings, templates and registries which
+    nodes share are not counted again for every node.
+
+    Args:
+        objects: The objects to measure, such as a site's nodes.
+
+    Returns:
+        The total size in bytes.
+    """
+    total = 0
+    for obj in objects:
+        total += sys.getsizeof(obj)
+        instance_dict = getattr(obj, "__dict__", None)
+        if instance_dict is not None:
+            total += sys.getsizeof(instance_dict)
+    return total
+
+
+def resident_bytes() -> int:
+    """The current resident set size of this process.
+
+    Unlike the peak from ``getrusage``, this goes down again when memory
+    is given back, so it can tell when pressure has passed.
+
+    Returns:
+        Bytes, or zero where it can't be measured.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0
+    return pages * os.sysconf("SC_PAGE_SIZE")
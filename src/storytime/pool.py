@@ -0,0 +1,397 @@
+"""A pool of warm worker processes which render story pages.
+
+Each worker builds the site once, keeping the catalog's modules
+imported, then renders the pages it is sent by story key. A render
+costs the template and nothing else, instead of a fresh process paying
+for every import first.
+
+When the catalog changes, ``refresh`` tells the workers, and each one
+polls its own watcher before its next render. Workers can be recycled
+after a number of renders, or once their peak RSS passes a limit; a
+retired worker is replaced by a fresh one, which takes no requests
+until its site is built.
+
+Every worker has its own pipe, and the pool sends each request to the
+worker with the fewest outstanding, so it always knows which requests a
+worker holds, and the worker says which one it starts. When a worker
+exits, its requests go to the others. If it died instead of retiring,
+e.g. killed for running out of memory, the request it had started
+fails at once rather than waiting out the caller's timeout, and a
+fresh worker takes its place.
+
+A worker says when its site is built. One that dies before then, e.g.
+because a stories file raises on import, fails the requests it holds,
+and is replaced after a growing delay. After several such failures in a
+row the pool stops replacing workers, and fails new requests at once.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from dataclasses import field
+from itertools import count
+from multiprocessing.connection import Connection
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+from typing import Optional
+from typing import Union
+
+from storytime import make_site
+from storytime.build import render_page
+from storytime.build import StoryKey
+from storytime.watch import make_watcher
+
+# A request is ``(request_id, story_key, generation)``. Workers answer
+# with ``(kind, request_id, page, error)``, first started, then done.
+# Before any of that, a worker says it is ready, once its site is built.
+Task = tuple[int, StoryKey, int]
+READY = "ready"
+STARTED = "started"
+DONE = "done"
+
+# Seconds before replacing a worker which failed to start, doubling
+# with each failure in a row
+RESPAWN_DELAY = 0.1
+MAX_RESPAWN_DELAY = 5.0
+
+
+def rss_bytes() -> int:
+    """The peak resident set size of this process.
+
+    Returns:
+        Bytes, or zero where it can't be measured.
+    """
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def serve_renders(
+    target_path: str,
+    conn: Connection,
+    max_renders: Optional[int] = None,
+    max_rss: Optional[int] = None,
+    share_registry: bool = False,
+) -> None:
+    """Run one worker: build the site, then render until told to stop.
+
+    Args:
+        target_path: String using dotted package path notation, or
+            several packages separated by commas.
+        conn: This worker's end of its pipe, for requests and results.
+        max_renders: Retire after this many renders.
+        max_rss: Retire once the peak RSS passes this many bytes.
+        share_registry: For a catalog, share the site's registry.
+    """
+    site = make_site(target_path, share_registry=share_registry)
+    watcher = make_watcher(target_path, site, share_registry)
+    conn.send((READY, None, None, None))
+    generation = 0
+    renders = 0
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        request_id, story_key, task_generation = task
+        conn.send((STARTED, request_id, None, None))
+        try:
+            if task_generation != generation:
+                watcher.poll()
+                generation = task_generation
+            story = watcher.site.find_story(*story_key)
+            page = None if story is None else render_page(story, watcher.site)
+            conn.send((DONE, request_id, page, None))
+        except Exception as error:
+            conn.send((DONE, request_id, None, repr(error)))
+        renders += 1
+        if max_renders is not None and renders >= max_renders:
+            break
+        if max_rss is not None and rss_bytes() > max_rss:
+            break
+
+
+@dataclass()
+class Worker:
+    """One worker process, the requests sent to it, and the one it started."""
+
+    process: BaseProcess
+    conn: Connection
+    tasks: dict[int, Task] = field(default_factory=dict)
+    started: Optional[int] = None
+    ready: bool = False
+
+
+class WorkerPool:
+    """Render pages in warm worker processes, recycling them as asked."""
+
+    def __init__(
+        self,
+        target_path: str,
+        workers: int = 2,
+        max_renders: Optional[int] = None,
+        max_rss: Optional[int] = None,
+        share_registry: bool = False,
+        max_start_failures: int = 5,
+    ) -> None:
+        """Describe the pool, ``start`` runs it.
+
+        Args:
+            target_path: String using dotted package path notation, or
+                several packages separated by commas.
+            workers: How many worker processes to keep running.
+            max_renders: Recycle a worker after this many renders.
+            max_rss: Recycle a worker once its peak RSS passes this many
+                bytes.
+            share_registry: For a catalog, share the site's registry.
+            max_start_failures: Stop replacing workers after this many
+                die in a row before their site is built.
+        """
+        self.target_path = target_path
+        self.workers = workers
+        self.max_renders = max_renders
+        self.max_rss = max_rss
+        self.share_registry = share_registry
+        self.max_start_failures = max_start_failures
+        self.generation = 0
+        self.recycled = 0
+        self.crashed = 0
+        self.failed_starts = 0
+        self.broken: Optional[str] = None
+        self.members: dict[int, Worker] = {}
+        self.pending: dict[int, Future[Optional[bytes]]] = {}
+        self.lock = threading.Lock()
+        self.ids = count()
+        self.closing = False
+        self.wake_reader, self.wake_writer = multiprocessing.Pipe(duplex=False)
+        self.collector = threading.Thread(
+            target=self._collect, name="storytime-pool", daemon=True
+        )
+
+    def start(self) -> WorkerPool:
+        """Start the workers and the thread collecting their results.
+
+        Returns:
+            The started pool.
+        """
+        with self.lock:
+            for _worker in range(self.workers):
+                self._spawn()
+        self.collector.start()
+        return self
+
+    def _spawn(self) -> None:
+        """Start one worker process, with the lock held."""
+        worker_id = next(self.ids)
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=serve_renders,
+            args=(self.target_path, child_conn),
+            kwargs=dict(
+                max_renders=self.max_renders,
+                max_rss=self.max_rss,
+                share_registry=self.share_registry,
+            ),
+            name=f"storytime-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self.members[worker_id] = Worker(process, conn)
+
+    def _dispatch(self, task: Task) -> None:
+        """Send a request to the least busy worker, with the lock held."""
+        if not self.members:
+            raise RuntimeError(self.broken or "the worker pool is closed")
+        worker = min(self.members.values(), key=lambda member: len(member.tasks))
+        worker.tasks[task[0]] = task
+        try:
+            worker.conn.send(task)
+        except OSError:
+            # The worker is gone, the collector hands its requests on
+            pass
+
+    def _collect(self) -> None:
+        """Hand results to their futures, and replace exited workers."""
+        while True:
+            with self.lock:
+                members = list(self.members.items())
+            waitables: list[Union[Connection, int]] = [self.wake_reader]
+            for _worker_id, worker in members:
+                waitables.extend((worker.conn, worker.process.sentinel))
+            ready = wait(waitables)
+            if self.wake_reader in ready:
+                return
+            for worker_id, worker in members:
+                if worker.conn in ready:
+                    self._receive(worker)
+                if worker.process.sentinel in ready:
+                    self._reap(worker_id, worker)
+
+    def _receive(self, worker: Worker) -> bool:
+        """Take one message from a worker, if it is still there."""
+        try:
+            kind, request_id, page, error = worker.conn.recv()
+        except (EOFError, OSError):
+            # It exited, its sentinel says so too
+            return False
+        if kind == READY:
+            worker.ready = True
+            with self.lock:
+                self.failed_starts = 0
+        elif kind == STARTED:
+            worker.started = request_id
+        else:
+            self._finish(worker, request_id, page, error)
+        return True
+
+    def _finish(
+        self,
+        worker: Worker,
+        request_id: int,
+        page: Optional[bytes],
+        error: Optional[str],
+    ) -> None:
+        """Resolve a request's future."""
+        with self.lock:
+            worker.tasks.pop(request_id, None)
+            if worker.started == request_id:
+                worker.started = None
+            future = self.pending.pop(request_id, None)
+        if future is None:
+            return
+        if error is None:
+            future.set_result(page)
+        else:
+            future.set_exception(RuntimeError(error))
+
+    def _reap(self, worker_id: int, worker: Worker) -> None:
+        """Replace a worker which exited, sending its requests elsewhere."""
+        worker.process.join()
+        while worker.conn.poll() and self._receive(worker):
+            pass
+        worker.conn.close()
+        exitcode = worker.process.exitcode
+        if not worker.ready:
+            error = f"render worker {worker_id} failed to start, exit code {exitcode}"
+            for request_id in list(worker.tasks):
+                self._finish(worker, request_id, None, error)
+        elif worker.started is not None:
+            error = f"render worker {worker_id} died with exit code {exitcode}"
+            self._finish(worker, worker.started, None, error)
+        with self.lock:
+            del self.members[worker_id]
+            tasks = list(worker.tasks.values())
+            if self.closing:
+                return
+            delay = self._count_exit(worker, exitcode)
+            if delay is None:
+                return
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            if self.closing:
+                return
+            self._spawn()
+            for task in tasks:
+                self._dispatch(task)
+
+    def _count_exit(self, worker: Worker, exitcode: Optional[int]) -> Optional[float]:
+        """Count a worker's exit, with the lock held.
+
+        Args:
+            worker: The worker which exited.
+            exitcode: Its exit code.
+
+        Returns:
+            Seconds to wait before replacing it, or ``None`` to stop
+            replacing workers.
+        """
+        if exitcode == 0:
+            self.recycled += 1
+        else:
+            self.crashed += 1
+        if worker.ready:
+            return 0.0
+        self.failed_starts += 1
+        if self.failed_starts >= self.max_start_failures:
+            self.broken = (
+                f"render workers failed to start {self.failed_starts} times in a row"
+            )
+            return None
+        return min(RESPAWN_DELAY * 2.0 ** (self.failed_starts - 1), MAX_RESPAWN_DELAY)
+
+    def submit(self, story_key: StoryKey) -> Future[Optional[bytes]]:
+        """Ask for a page, without waiting for it.
+
+        Args:
+            story_key: The subject package path and story index.
+
+        Returns:
+            A future for the page, or for ``None`` if there's no such story.
+        """
+        future: Future[Optional[bytes]] = Future()
+        with self.lock:
+            request_id = next(self.ids)
+            self._dispatch((request_id, story_key, self.generation))
+            self.pending[request_id] = future
+        return future
+
+    def render(
+        self, story_key: StoryKey, timeout: Optional[float] = None
+    ) -> Optional[bytes]:
+        """Render a page in a worker and wait for it.
+
+        Args:
+            story_key: The subject package path and story index.
+            timeout: Seconds to wait before giving up.
+
+        Returns:
+            The page, or ``None`` if there's no such story.
+        """
+        return self.submit(story_key).result(timeout)
+
+    def refresh(self) -> None:
+        """Have each worker poll its watcher before its next render."""
+        self.generation += 1
+
+    def close(self) -> None:
+        """Stop the workers once they finish the requests they were sent."""
+        with self.lock:
+            self.closing = True
+            processes = []
+            for worker in self.members.values():
+                processes.append(worker.process)
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+        for process in processes:
+            process.join()
+        self.wake_writer.send(None)
+        self.collector.join()
+
+    def __enter__(self) -> WorkerPool:
+        """Start the pool for a ``with`` block.
+
+        Returns:
+            The started pool.
+        """
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the pool at the end of a ``with`` block.
+
+        Args:
+            *exc_info: The exception details, if any.
+        """
+        self.close()
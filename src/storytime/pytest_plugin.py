@@ -0,0 +1,151 @@
+"""A pytest plugin which turns every story in a catalog into a test.
+
+Point it at a catalog package with ``--storytime-package`` or the
+``storytime_package`` ini setting. Any test asking for a ``story``
+argument is then parametrized over every story in the catalog, with
+stable IDs such as ``components.heading-0``.
+
+The site is built once per session, and the scan cache is kept in
+pytest's cache directory so later runs start warm. With
+``--storytime-shard=I/N`` only the stories in shard ``I`` (counting
+from 1) of ``N`` are used. A story's shard comes from a hash of its
+ID, so it doesn't move when other stories are added or removed.
+"""
+from __future__ import annotations
+
+from functools import cached_property
+from hashlib import sha256
+from typing import Any
+from typing import Optional
+
+import pytest
+
+from storytime import make_site
+from storytime import Site
+from storytime.build import iter_stories
+from storytime.build import story_id
+from storytime.shard import parse_shard
+
+PLUGIN_NAME = "storytime-stories"
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the storytime command-line options and ini setting.
+
+    Args:
+        parser: The pytest option parser.
+    """
+    group = parser.getgroup("storytime")
+    group.addoption(
+        "--storytime-package",
+        help="Dotted name of the catalog package to collect stories from.",
+    )
+    group.addoption(
+        "--storytime-shard",
+        help="Only use shard I of N of the stories, e.g. 1/4.",
+    )
+    parser.addini("storytime_package", "Catalog package to collect stories from.")
+
+
+def shard_option(value: Optional[str]) -> tuple[int, int]:
+    """Read the ``--storytime-shard`` option, with ``parse_shard``.
+
+    Args:
+        value: The option value, if given.
+
+    Returns:
+        The shard number, counting from 1, and the number of shards.
+
+    Raises:
+        UsageError: If the value isn't a valid shard.
+    """
+    if value is None:
+        return 1, 1
+    try:
+        return parse_shard(value)
+    except ValueError as exc:
+        raise pytest.UsageError(f"--storytime-shard: {exc}") from exc
+
+
+def in_shard(test_id: str, shard: int, shards: int) -> bool:
+    """Whether a story belongs to a shard.
+
+    Args:
+        test_id: The story's stable test ID.
+        shard: The shard number, counting from 1.
+        shards: How many shards there are.
+
+    Returns:
+        True if the story is in this shard.
+    """
+    bucket = int(sha256(test_id.encode("utf-8")).hexdigest()[:8], 16) % shards
+    return bucket == shard - 1
+
+
+class StorytimePlugin:
+    """Holds the session's site and parametrizes ``story`` arguments."""
+
+    def __init__(self, config: pytest.Config, package: str) -> None:
+        """Remember what to collect.
+
+        Args:
+            config: The pytest config.
+            package: The dotted name of the catalog package.
+        """
+        self.config = config
+        self.package = package
+        self.shard = shard_option(config.getoption("storytime_shard"))
+
+    @cached_property
+    def site(self) -> Site:
+        """Build the site once per session, with a warm scan cache."""
+        cache = getattr(self.config, "cache", None)
+        cache_dir = None if cache is None else cache.mkdir("storytime")
+        return make_site(self.package, cache_dir=cache_dir)
+
+    def pytest_generate_tests(self, metafunc: pytest.Metafunc) -> None:
+        """Parametrize tests with a ``story`` argument over this shard's stories.
+
+        Args:
+            metafunc: The test function being collected.
+        """
+        if "story" not in metafunc.fixturenames:
+            return
+        stories: list[Any] = []
+        ids: list[str] = []
+        for subject, index, story in iter_stories(self.site):
+            test_id = story_id(subject.package_path, index)
+            if in_shard(test_id, *self.shard):
+                stories.append(story)
+                ids.append(test_id)
+        metafunc.parametrize("story", stories, ids=ids)
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Register the story collection, if a catalog package is configured.
+
+    Args:
+        config: The pytest config.
+    """
+    package = config.getoption("storytime_package") or config.getini(
+        "storytime_package"
+    )
+    if package:
+        config.pluginmanager.register(StorytimePlugin(config, package), PLUGIN_NAME)
+
+
+@pytest.fixture(scope="session")
+def storytime_site(request: pytest.FixtureRequest) -> Site:
+    """The catalog's site, built once per session.
+
+    Args:
+        request: The pytest fixture request.
+
+    Returns:
+        The site the stories were collected from.
+    """
+    plugin = request.config.pluginmanager.get_plugin(PLUGIN_NAME)
+    if plugin is None:
+        pytest.skip("No storytime package configured")
+    site: Site = plugin.site
+    return site
@@ -0,0 +1,346 @@
+"""A full-text search index over every story in a catalog.
+
+Each story is indexed by the words of its title, its subject's title,
+its package path and the visible text of its rendered HTML. The index
+maps each word to the IDs of the stories containing it, and is queried
+by word prefix, so ``head`` finds stories mentioning ``Heading``.
+
+Every indexed story keeps a fingerprint of what went into it. Updating
+the index renders the stories again, but only parses and re-indexes
+those whose fingerprint changed, and the dev server only updates the
+subjects its watcher reports. A build can instead hand over each
+story's fingerprint and text, taken by ``search_document`` in whichever
+process rendered it. The markup is parsed into a throwaway tree, so
+indexing keeps no story's DOM alive.
+
+On disk the index is gzipped JSON: a list of stories, and for each word
+the positions of its stories in that list, delta encoded.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from dataclasses import field
+from hashlib import sha256
+from pathlib import Path
+from typing import AbstractSet
+from typing import Any
+from typing import Iterable
+from typing import Mapping
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+from storytime import Section
+from storytime import Site
+from storytime import Subject
+from storytime.build import story_id
+from storytime.story import DEFAULT_PARSER
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_INDEX_NAME = "search-index.json.gz"
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def story_fingerprint(subject: Subject, story: Any) -> str:
+    """Summarize everything a story is indexed by.
+
+    Args:
+        subject: The story's subject.
+        story: The story, whose markup is rendered if it isn't yet.
+
+    Returns:
+        A hex digest that changes when the story's words may have.
+    """
+    rendered = getattr(story, "rendered", "")
+    parts = (subject.package_path, subject.title or "", story.title or "", rendered)
+    return sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def visible_text(rendered: str) -> str:
+    """The text a reader sees in some markup.
+
+    Args:
+        rendered: A story's rendered markup.
+
+    Returns:
+        The text, with the tags' contents separated by spaces.
+    """
+    return BeautifulSoup(rendered, DEFAULT_PARSER).get_text(" ")
+
+
+def search_document(subject: Subject, story: Any) -> tuple[str, str]:
+    """What indexing a rendered story needs, for ``build_site``.
+
+    Args:
+        subject: The story's subject.
+        story: The story.
+
+    Returns:
+        The story's fingerprint and its visible text.
+    """
+    return story_fingerprint(subject, story), visible_text(story.rendered)
+
+
+def tokenize(text: str) -> set[str]:
+    """The distinct lowercase words in some text.
+
+    Args:
+        text: Any text, such as a title or a page's visible text.
+
+    Returns:
+        The words.
+    """
+    return set(_WORD.findall(text.lower()))
+
+
+@dataclass(frozen=True)
+class IndexedStory:
+    """What a search result needs to show and link to a story."""
+
+    path: str
+    index: int
+    title: str
+    fingerprint: str
+
+
+@dataclass()
+class SearchIndex:
+    """Words mapped to the IDs of the stories which contain them."""
+
+    stories: dict[str, IndexedStory] = field(default_factory=dict)
+    postings: dict[str, set[str]] = field(default_factory=dict)
+    words: dict[str, frozenset[str]] = field(default_factory=dict, repr=False)
+    _vocabulary: Optional[list[str]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def add(self, key: str, entry: IndexedStory, words: Iterable[str]) -> None:
+        """Index a story, replacing any previous version of it.
+
+        Args:
+            key: The story ID.
+            entry: The story's details.
+            words: The words to find the story by.
+        """
+        self.remove(key)
+        self.stories[key] = entry
+        self.words[key] = frozenset(words)
+        for word in self.words[key]:
+            if word not in self.postings:
+                self.postings[word] = set()
+                self._vocabulary = None
+            self.postings[word].add(key)
+
+    def remove(self, key: str) -> None:
+        """Take a story out of the index.
+
+        Args:
+            key: The story ID.
+        """
+        self.stories.pop(key, None)
+        for word in self.words.pop(key, frozenset()):
+            posting = self.postings[word]
+            posting.discard(key)
+            if not posting:
+                del self.postings[word]
+                self._vocabulary = None
+
+    @property
+    def vocabulary(self) -> list[str]:
+        """Every indexed word, sorted, kept until a word comes or goes."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def update(
+        self,
+        site: Site,
+        package_paths: Optional[list[str]] = None,
+        skip: AbstractSet[str] = frozenset(),
+        documents: Optional[Mapping[str, tuple[str, str]]] = None,
+    ) -> int:
+        """Bring the index up to date with the site.
+
+        Args:
+            site: A populated site.
+            package_paths: Only look at the stories below these dotted
+                paths, e.g. the ones a watcher reports. By default the
+                whole site is indexed.
+            skip: IDs of stories to leave out, such as ones which failed
+                to render during the build.
+            documents: Each story's fingerprint and text by ID, from
+                ``search_document``. Stories with one aren't rendered.
+
+        Returns:
+            How many stories were re-indexed.
+        """
+        if package_paths is None:
+            package_paths = ["."]
+        documents = documents or {}
+        seen: set[str] = set()
+        indexed = 0
+        for package_path in package_paths:
+            for subject in _subjects_below(site, package_path):
+                for index, story in enumerate(subject.stories):
+                    key = story_id(subject.package_path, index)
+                    if key in skip:
+                        continue
+                    seen.add(key)
+                    document = documents.get(key)
+                    indexed += self._index_story(key, subject, index, story, document)
+        for key, entry in list(self.stories.items()):
+            if key not in seen and _is_below(entry.path, package_paths):
+                self.remove(key)
+        return indexed
+
+    def _index_story(
+        self,
+        key: str,
+        subject: Subject,
+        index: int,
+        story: Any,
+        document: Optional[tuple[str, str]] = None,
+    ) -> bool:
+        """Index one story, unless it is unchanged."""
+        if document is None:
+            fingerprint = story_fingerprint(subject, story)
+        else:
+            fingerprint = document[0]
+        previous = self.stories.get(key)
+        if previous is not None and previous.fingerprint == fingerprint:
+            return False
+        if document is None:
+            body = visible_text(getattr(story, "rendered", ""))
+        else:
+            body = document[1]
+        text = " ".join((subject.package_path, subject.title or "", story.title or ""))
+        words = tokenize(text) | tokenize(body)
+        entry = IndexedStory(subject.package_path, index, story.title, fingerprint)
+        self.add(key, entry, words)
+        return True
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[str]:
+        """Find the stories matching every word of a query.
+
+        Each word of the query matches any indexed word it starts.
+
+        Args:
+            query: The words to look for.
+            limit: The most results to return.
+
+        Returns:
+            The matching story IDs, sorted.
+        """
+        words = self.vocabulary
+        matches: Optional[set[str]] = None
+        for prefix in tokenize(query):
+            found: set[str] = set()
+            position = bisect_left(words, prefix)
+            while position < len(words) and words[position].startswith(prefix):
+                found |= self.postings[words[position]]
+                position += 1
+            matches = found if matches is None else matches & found
+        return sorted(matches or ())[:limit]
+
+    def save(self, target: Path) -> None:
+        """Write the index as gzipped JSON.
+
+        Args:
+            target: The file to write.
+        """
+        keys = sorted(self.stories)
+        positions = {key: position for position, key in enumerate(keys)}
+        postings = {}
+        for word, posting in sorted(self.postings.items()):
+            deltas, previous = [], 0
+            for position in sorted(positions[key] for key in posting):
+                deltas.append(position - previous)
+                previous = position
+            postings[word] = deltas
+        stories = [
+            [key, entry.path, entry.index, entry.title, entry.fingerprint]
+            for key, entry in ((key, self.stories[key]) for key in keys)
+        ]
+        data = dict(version=SEARCH_INDEX_VERSION, stories=stories, postings=postings)
+        content = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(gzip.compress(content, mtime=0))
+
+    @classmethod
+    def load(cls, target: Path) -> SearchIndex:
+        """Read an index written by ``save``.
+
+        A missing, unreadable or outdated file gives an empty index.
+
+        Args:
+            target: The file to read.
+
+        Returns:
+            The index.
+        """
+        try:
+            data = json.loads(gzip.decompress(target.read_bytes()))
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != SEARCH_INDEX_VERSION:
+            return cls()
+        keys = [story[0] for story in data["stories"]]
+        words: dict[str, set[str]] = {key: set() for key in keys}
+        for word, deltas in data["postings"].items():
+            position = 0
+            for delta in deltas:
+                position += delta
+                words[keys[position]].add(word)
+        index = cls()
+        for key, path, story_index, title, fingerprint in data["stories"]:
+            entry = IndexedStory(path, story_index, title, fingerprint)
+            index.add(key, entry, words[key])
+        return index
+
+
+def _is_below(package_path: str, package_paths: list[str]) -> bool:
+    """Whether a dotted path is one of, or inside one of, some others."""
+    for parent in package_paths:
+        if parent == "." or package_path == parent:
+            return True
+        if package_path.startswith(parent + "."):
+            return True
+    return False
+
+
+def _subjects_below(site: Site, package_path: str) -> list[Subject]:
+    """The subjects at or under a dotted path, if it's still in the site."""
+    subjects = []
+    stack: list[object] = [site.find_path(package_path)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Subject):
+            subjects.append(node)
+        elif isinstance(node, (Site, Section)):
+            stack.extend(reversed(node.items.values()))
+    return subjects
+
+
+def write_search_index(
+    site: Site,
+    outdir: Path,
+    skip: AbstractSet[str] = frozenset(),
+    documents: Optional[Mapping[str, tuple[str, str]]] = None,
+) -> None:
+    """A build stage that updates the search index in the output directory.
+
+    Args:
+        site: A populated site.
+        outdir: The root of the output directory.
+        skip: IDs of stories to leave out, such as ones which failed.
+        documents: The stories' fingerprints and text, from the build.
+    """
+    target = outdir / SEARCH_INDEX_NAME
+    index = SearchIndex.load(target)
+    index.update(site, skip=skip, documents=documents)
+    index.save(target)
@@ -0,0 +1,354 @@
+"""Serve the story pages during development.
+
+Rendered pages are kept in a bounded LRU cache, keyed by the story's
+page key and a fingerprint of its sources: the mtimes of its subject's
+``stories.py`` and every catalog module that file imports, plus the
+site's revision, since every page shows the navigation tree. A watcher
+keeps the site and those mtimes current, so a page is only rendered on
+a cache miss or after one of its sources, or the tree, changed.
+
+Responses carry a strong ``ETag``, and a matching ``If-None-Match``
+gets a ``304 Not Modified`` without sending the page again. Each cached
+page is also gzipped once, when it is cached, for clients which accept
+that, instead of compressing it for every request.
+
+With a ``WorkerPool``, cache misses are rendered by warm worker
+processes instead of in the server.
+
+``/search?q=...`` answers with the matching stories as JSON. The search
+index is built on the first search, then kept current from the subjects
+the watcher reports.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import field
+from hashlib import sha256
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import Optional
+from urllib.parse import parse_qs
+
+from storytime.build import page_path
+from storytime.build import parse_page_path
+from storytime.build import render_page
+from storytime.build import StoryKey
+from storytime.lazy import LazyLoader
+from storytime.pool import WorkerPool
+from storytime.search import SearchIndex
+from storytime.watch import BaseWatcher
+
+CacheKey = tuple[StoryKey, str]
+Response = tuple[HTTPStatus, dict[str, str], bytes]
+SEARCH_LIMIT = 50
+POOL_TIMEOUT = 60.0
+
+
+@dataclass()
+class CachedPage:
+    """A rendered page and its strong entity tag."""
+
+    etag: str
+    content: bytes
+    gzipped: bytes = b""
+
+    @property
+    def gzip_etag(self) -> str:
+        """The entity tag of the gzipped page, which differs from the page's."""
+        return self.etag[:-1] + '-gz"'
+
+
+@dataclass()
+class RenderCache:
+    """A thread-safe LRU cache of rendered pages."""
+
+    maxsize: int = 1024
+    pages: OrderedDict[CacheKey, CachedPage] = field(default_factory=OrderedDict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def get(self, key: CacheKey) -> Optional[CachedPage]:
+        """Return a cached page, marking it as recently used.
+
+        Args:
+            key: The story key and source fingerprint.
+
+        Returns:
+            The cached page or ``None`` on a miss.
+        """
+        with self.lock:
+            page = self.pages.get(key)
+            if page is not None:
+                self.pages.move_to_end(key)
+            return page
+
+    def put(self, key: CacheKey, content: bytes) -> CachedPage:
+        """Store a freshly rendered page, evicting the oldest if full.
+
+        Args:
+            key: The story key and source fingerprint.
+            content: The rendered page.
+
+        Returns:
+            The cached page, with its entity tag.
+        """
+        etag = '"' + sha256(content).hexdigest()[:32] + '"'
+        gzipped = gzip.compress(content, mtime=0)
+        page = CachedPage(etag=etag, content=content, gzipped=gzipped)
+        with self.lock:
+            self.pages[key] = page
+            self.pages.move_to_end(key)
+            while len(self.pages) > self.maxsize:
+                self.pages.popitem(last=False)
+        return page
+
+    def invalidate(self, package_paths: list[str]) -> None:
+        """Drop every cached page of the given subjects.
+
+        Args:
+            package_paths: Dotted paths of the changed subjects.
+        """
+        changed = set(package_paths)
+        with self.lock:
+            for key in [k for k in self.pages if k[0][0] in changed]:
+                del self.pages[key]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an ``If-None-Match`` header against a page's entity tag.
+
+    Args:
+        if_none_match: The raw header value, if the client sent one.
+        etag: The page's current strong entity tag.
+
+    Returns:
+        True if the client's copy is current.
+    """
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Check whether an ``Accept-Encoding`` header allows gzip.
+
+    Args:
+        accept_encoding: The raw header value, if the client sent one.
+
+    Returns:
+        True if the client takes a gzipped body.
+    """
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            quality = params.strip().removeprefix("q=") or "1"
+            try:
+                return float(quality) > 0
+            except ValueError:
+                return False
+    return False
+
+
+@dataclass()
+class StoryApp:
+    """Answer page requests from a watched site and a render cache."""
+
+    watcher: BaseWatcher
+    cache: RenderCache = field(default_factory=RenderCache)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    search_index: Optional[SearchIndex] = None
+    pool: Optional[WorkerPool] = None
+    loader: Optional[LazyLoader] = None
+
+    def refresh(self) -> list[str]:
+        """Pick up source changes and drop their cached pages.
+
+        A lazy site's loaded subjects are also released, if the process
+        is past its memory bound.
+
+        Returns:
+            The package paths the watcher updated.
+        """
+        if self.loader is not None:
+            self.loader.relieve()
+        with self.lock:
+            updated = self.watcher.poll()
+            if updated and self.search_index is not None:
+                self.search_index.update(self.watcher.site, updated)
+            if updated and self.pool is not None:
+                self.pool.refresh()
+        self.cache.invalidate(updated)
+        return updated
+
+    def search(self, query: str) -> list[dict[str, Any]]:
+        """Search the stories, indexing the whole site on first use.
+
+        Args:
+            query: The words to look for.
+
+        Returns:
+            The matching stories, with the URL path of each page.
+        """
+        with self.lock:
+            if self.search_index is None:
+                self.search_index = SearchIndex()
+                self.search_index.update(self.watcher.site)
+            index = self.search_index
+            results = []
+            for key in index.search(query, limit=SEARCH_LIMIT):
+                entry = index.stories[key]
+                url = "/" + page_path(entry.path, entry.index).as_posix()
+                results.append(dict(id=key, title=entry.title, url=url))
+        return results
+
+    def fingerprint(self, package_path: str) -> str:
+        """Summarize the mtimes of all the sources behind a subject's pages.
+
+        Args:
+            package_path: The dotted path of a subject.
+
+        Returns:
+            A short hex digest that changes when any source, or the
+            tree in the page's navigation, changes.
+        """
+        stamps = self.watcher.stamps(package_path)
+        stamp = ";".join([f"revision={self.watcher.site.revision}", *stamps])
+        return sha256(stamp.encode("utf-8")).hexdigest()[:16]
+
+    def page(self, story_key: StoryKey) -> Optional[CachedPage]:
+        """Get a page from the cache, rendering it on a miss.
+
+        Args:
+            story_key: The subject package path and story index.
+
+        Returns:
+            The page, or ``None`` if there's no such story.
+        """
+        package_path, index = story_key
+        content: Optional[bytes] = None
+        with self.lock:
+            story = self.watcher.site.find_story(package_path, index)
+            if story is None:
+                return None
+            key = (story_key, self.fingerprint(package_path))
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            if self.pool is None:
+                # The page's navigation walks the tree, which refresh patches
+                content = render_page(story, self.watcher.site)
+        if self.pool is not None:
+            content = self.pool.render(story_key, timeout=POOL_TIMEOUT)
+        if content is None:
+            return None
+        return self.cache.put(key, content)
+
+    def respond(
+        self,
+        path: str,
+        if_none_match: Optional[str] = None,
+        accept_encoding: Optional[str] = None,
+    ) -> Response:
+        """Produce the status, headers and body for a request.
+
+        Args:
+            path: The request's URL path.
+            if_none_match: The request's ``If-None-Match`` header, if any.
+            accept_encoding: The request's ``Accept-Encoding`` header, if any.
+
+        Returns:
+            The status, the headers and the body.
+        """
+        path, _, query = path.partition("?")
+        if path == "/search":
+            terms = parse_qs(query).get("q", [""])[0]
+            body = json.dumps(self.search(terms)).encode("utf-8")
+            headers = {"Content-Type": "application/json", "Cache-Control": "no-cache"}
+            return HTTPStatus.OK, headers, body
+        story_key = parse_page_path(path)
+        page = None if story_key is None else self.page(story_key)
+        if page is None:
+            return HTTPStatus.NOT_FOUND, {}, b"Not Found"
+        gzipped = accepts_gzip(accept_encoding)
+        etag = page.gzip_etag if gzipped else page.etag
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(if_none_match, etag):
+            return HTTPStatus.NOT_MODIFIED, headers, b""
+        headers["Content-Type"] = "text/html; charset=utf-8"
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+            return HTTPStatus.OK, headers, page.gzipped
+        return HTTPStatus.OK, headers, page.content
+
+
+class StoryServer(ThreadingHTTPServer):
+    """An HTTP server which hands requests to a ``StoryApp``."""
+
+    app: StoryApp
+
+
+class StoryRequestHandler(BaseHTTPRequestHandler):
+    """Turn GET requests into ``StoryApp.respond`` calls."""
+
+    server: StoryServer
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Send the page, a 304, or a 404."""
+        status, headers, body = self.server.app.respond(
+            self.path,
+            self.headers.get("If-None-Match"),
+            self.headers.get("Accept-Encoding"),
+        )
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(
+    app: StoryApp, host: str = "127.0.0.1", port: int = 8000
+) -> StoryServer:
+    """Create, but don't start, an HTTP server for the app.
+
+    Args:
+        app: The app answering the requests.
+        host: The interface to listen on.
+        port: The port to listen on, ``0`` picks a free one.
+
+    Returns:
+        The bound server.
+    """
+    server = StoryServer((host, port), StoryRequestHandler)
+    server.app = app
+    return server
+
+
+def watch_in_background(app: StoryApp, interval: float = 0.5) -> threading.Thread:
+    """Keep refreshing the app from a daemon thread.
+
+    Args:
+        app: The app to refresh.
+        interval: Seconds between polls.
+
+    Returns:
+        The started thread.
+    """
+
+    def run() -> None:
+        while True:
+            time.sleep(interval)
+            app.refresh()
+
+    thread = threading.Thread(target=run, name="storytime-watch", daemon=True)
+    thread.start()
+    return thread
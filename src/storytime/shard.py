@@ -0,0 +1,373 @@
+"""Split a catalog build across machines, then merge the results.
+
+``plan_shards`` puts each subject, by its package path, in one of N
+shards. The heaviest subjects are placed first, each on the lightest
+shard so far. A subject weighs the render seconds its stories took on
+an earlier run, from a costs file, and a story never timed weighs the
+mean of the known ones, so without a costs file shards balance by story
+count. The plan depends only on the tree and the costs, so every
+machine given the same inputs makes the same plan.
+
+Each shard writes its own pages plus a partial manifest: its pages,
+with their hashes and render seconds, and the whole tree, for
+navigation. ``merge_shards`` checks that the shards agree, copies their
+pages and assets into one directory, combines their search indexes,
+and writes a manifest and a costs file for the whole site.
+"""
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+from typing import Iterator
+from typing import Optional
+
+from storytime import Site
+from storytime.budget import RenderBudget
+from storytime.budget import RenderLedger
+from storytime.build import build_site
+from storytime.build import BuildReport
+from storytime.build import iter_stories
+from storytime.build import page_path
+from storytime.build import parse_page_path
+from storytime.build import StoryKey
+from storytime.build import story_id
+from storytime.build import write_if_changed
+from storytime.manifest import Record
+from storytime.manifest import site_manifest
+from storytime.search import search_document
+from storytime.search import SEARCH_INDEX_NAME
+from storytime.search import SearchIndex
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = "build-manifest.json"
+COSTS_NAME = "build-costs.json"
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Read an ``I/N`` shard option.
+
+    Args:
+        value: The option value, such as ``2/4``.
+
+    Returns:
+        The shard number, counting from 1, and the number of shards.
+
+    Raises:
+        ValueError: If the value isn't a valid shard.
+    """
+    shard, _, shards = value.partition("/")
+    if not (shard.isdigit() and shards.isdigit()) or not 1 <= int(shard) <= int(shards):
+        raise ValueError(f"shard must be I/N, not {value!r}")
+    return int(shard), int(shards)
+
+
+def load_costs(target: Path) -> dict[str, float]:
+    """Read the render seconds of each story, from an earlier build.
+
+    A missing or unreadable file gives no costs.
+
+    Args:
+        target: The costs file.
+
+    Returns:
+        Seconds by story ID.
+    """
+    try:
+        data = json.loads(target.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {key: float(seconds) for key, seconds in data.items()}
+
+
+def save_costs(target: Path, costs: dict[str, float]) -> None:
+    """Write the render seconds of each story.
+
+    Args:
+        target: The costs file.
+        costs: Seconds by story ID.
+    """
+    content = json.dumps(dict(sorted(costs.items())), indent=0)
+    write_if_changed(target, content.encode("utf-8"))
+
+
+def plan_shards(
+    site: Site, shards: int, costs: Optional[dict[str, float]] = None
+) -> dict[str, int]:
+    """Assign every subject to a shard, balancing their render cost.
+
+    Args:
+        site: A populated site.
+        shards: How many shards there are.
+        costs: Earlier render seconds by story ID.
+
+    Returns:
+        The shard number, counting from 1, of each subject's package path.
+    """
+    costs = costs or {}
+    unknown = sum(costs.values()) / len(costs) if costs else 1.0
+    weights: dict[str, float] = {}
+    for subject, index, _story in iter_stories(site):
+        key = story_id(subject.package_path, index)
+        weight = weights.get(subject.package_path, 0.0)
+        weights[subject.package_path] = weight + costs.get(key, unknown)
+    loads = [0.0] * shards
+    plan: dict[str, int] = {}
+    for package_path, weight in sorted(weights.items(), key=lambda i: (-i[1], i[0])):
+        lightest = loads.index(min(loads))
+        loads[lightest] += weight
+        plan[package_path] = lightest + 1
+    return dict(sorted(plan.items()))
+
+
+def plan_digest(plan: dict[str, int]) -> str:
+    """A short hash of a plan, to check that shards agree on it.
+
+    Args:
+        plan: The shard number of each subject's package path.
+
+    Returns:
+        A hex digest.
+    """
+    content = json.dumps(sorted(plan.items()), separators=(",", ":"))
+    return sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass()
+class BuildManifest:
+    """The pages one shard, or a merged site, is made of."""
+
+    shard: int
+    shards: int
+    plan: str
+    pages: dict[str, dict[str, Any]] = field(default_factory=dict)
+    tree: list[Record] = field(default_factory=list)
+
+    def save(self, target: Path) -> None:
+        """Write the manifest as JSON.
+
+        Args:
+            target: The file to write.
+        """
+        data = dict(
+            version=MANIFEST_VERSION,
+            shard=[self.shard, self.shards],
+            plan=self.plan,
+            pages=self.pages,
+            tree=self.tree,
+        )
+        write_if_changed(target, json.dumps(data, indent=0).encode("utf-8"))
+
+    @classmethod
+    def load(cls, target: Path) -> BuildManifest:
+        """Read a manifest written by ``save``.
+
+        Args:
+            target: The file to read.
+
+        Returns:
+            The manifest.
+
+        Raises:
+            ValueError: If the file is missing, unreadable or outdated.
+        """
+        try:
+            data = json.loads(target.read_text())
+        except (OSError, ValueError) as exc:
+            raise ValueError(f"{target}: not a build manifest") from exc
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"{target}: build manifest version is not supported")
+        shard, shards = data["shard"]
+        return cls(shard, shards, data["plan"], data["pages"], data["tree"])
+
+
+def build_shard(
+    target_path: str,
+    outdir: Path,
+    shard: int,
+    shards: int,
+    costs: Optional[dict[str, float]] = None,
+    workers: int = 1,
+    cache_dir: Optional[Path] = None,
+    concurrency: int = 1,
+    search_index: bool = False,
+    compress: bool = False,
+    budget: Optional[RenderBudget] = None,
+) -> BuildReport:
+    """Write one shard's pages, its search index and its partial manifest.
+
+    Args:
+        target_path: String using dotted package path notation.
+        outdir: The shard's output directory.
+        shard: The shard number, counting from 1.
+        shards: How many shards there are.
+        costs: Earlier render seconds by story ID, to balance the shards.
+        workers: How many processes render pages.
+        cache_dir: Directory for the persistent scan cache, if any.
+        concurrency: How many stories each process renders at once.
+        search_index: Also write a search index of this shard's stories.
+        compress: Also write compressed siblings of the pages and assets.
+        budget: Limits on rendering each story. Stories that fail are
+            left out of the manifest, the search index and the costs.
+
+    Returns:
+        A report with this shard's page counts, timing and ledger.
+    """
+    plan: dict[str, int] = {}
+    ledger = RenderLedger()
+
+    def select(site: Site, keys: list[StoryKey]) -> list[StoryKey]:
+        plan.update(plan_shards(site, shards, costs))
+        return [key for key in keys if plan[key[0]] == shard]
+
+    def write_manifest(site: Site, outdir: Path) -> None:
+        mine = [path for path, number in plan.items() if number == shard]
+        if search_index:
+            target = outdir / SEARCH_INDEX_NAME
+            index = SearchIndex.load(target)
+            index.update(site, mine, skip=ledger.failed, documents=ledger.documents)
+            for key, entry in list(index.stories.items()):
+                if plan.get(entry.path) != shard:
+                    index.remove(key)
+            index.save(target)
+        manifest = BuildManifest(shard, shards, plan_digest(plan))
+        for subject, position, _story in iter_stories(site):
+            key = story_id(subject.package_path, position)
+            if plan[subject.package_path] == shard and key in ledger.seconds:
+                path = page_path(subject.package_path, position)
+                manifest.pages[key] = dict(
+                    path=path.as_posix(),
+                    sha=sha256((outdir / path).read_bytes()).hexdigest(),
+                    seconds=round(ledger.seconds[key], 6),
+                )
+        manifest.tree = list(site_manifest(site, metadata_only=True))
+        manifest.save(outdir / MANIFEST_NAME)
+
+    return build_site(
+        target_path,
+        outdir,
+        workers=workers,
+        cache_dir=cache_dir,
+        stages=[write_manifest],
+        concurrency=concurrency,
+        select=select,
+        ledger=ledger,
+        compress=compress,
+        budget=budget,
+        documenter=search_document if search_index else None,
+    )
+
+
+@dataclass()
+class MergeReport:
+    """What happened while merging shards."""
+
+    shards: int = 0
+    pages: int = 0
+    files: int = 0
+    written: int = 0
+    seconds: float = 0.0
+
+
+def load_shards(shard_dirs: list[Path]) -> list[tuple[BuildManifest, Path]]:
+    """Read every shard's manifest, checking that they make one whole site.
+
+    Args:
+        shard_dirs: The output directory of each shard, in any order.
+
+    Returns:
+        Each shard's manifest and directory, in shard order.
+
+    Raises:
+        ValueError: If shards are missing, or don't agree with each other.
+    """
+    manifests = sorted(
+        ((BuildManifest.load(d / MANIFEST_NAME), d) for d in shard_dirs),
+        key=lambda item: item[0].shard,
+    )
+    if not manifests:
+        raise ValueError("no shards to merge")
+    first = manifests[0][0]
+    numbers = [manifest.shard for manifest, _shard_dir in manifests]
+    if numbers != list(range(1, first.shards + 1)):
+        raise ValueError(f"expected shards 1 to {first.shards}, got {numbers}")
+    for manifest, shard_dir in manifests:
+        if (manifest.shards, manifest.plan) != (first.shards, first.plan):
+            raise ValueError(f"{shard_dir}: built with a different shard plan")
+        if manifest.tree != first.tree:
+            raise ValueError(f"{shard_dir}: built from a different catalog")
+    return manifests
+
+
+def _shard_files(manifest: BuildManifest, shard_dir: Path) -> Iterator[Path]:
+    """A shard's pages and assets, relative to its directory."""
+    pages = {Path(page["path"]) for page in manifest.pages.values()}
+    for source in sorted(p for p in shard_dir.rglob("*") if p.is_file()):
+        relative = source.relative_to(shard_dir)
+        name = relative.name
+        if name in (MANIFEST_NAME, SEARCH_INDEX_NAME) or name.startswith("."):
+            continue
+        # A page this shard no longer builds is left over from another plan
+        page = (
+            relative.with_suffix("") if relative.suffix in (".gz", ".br") else relative
+        )
+        if page in pages or parse_page_path(page.as_posix()) is None:
+            yield relative
+
+
+def merge_shards(shard_dirs: list[Path], outdir: Path) -> MergeReport:
+    """Combine the output of every shard into one site.
+
+    Story pages come from each shard's manifest, so pages left over from
+    an earlier plan are ignored. Any other file, such as an asset, may
+    be in several shards, but only with the same bytes.
+
+    Args:
+        shard_dirs: The output directory of each shard, in any order.
+        outdir: Where to write the merged site.
+
+    Returns:
+        A report with file counts and timing.
+
+    Raises:
+        ValueError: If shards are missing, don't agree with each other,
+            or have different files at the same path.
+    """
+    start = time.perf_counter()
+    manifests = load_shards(shard_dirs)
+    first = manifests[0][0]
+    merged = BuildManifest(1, 1, first.plan, tree=first.tree)
+    sources: dict[Path, Path] = {}
+    index = SearchIndex()
+    for manifest, shard_dir in manifests:
+        for key, page in manifest.pages.items():
+            if key in merged.pages:
+                raise ValueError(f"{shard_dir}: {key} is in more than one shard")
+            merged.pages[key] = page
+        for relative in _shard_files(manifest, shard_dir):
+            source = shard_dir / relative
+            if relative not in sources:
+                sources[relative] = source
+            elif sources[relative].read_bytes() != source.read_bytes():
+                raise ValueError(f"{relative} differs between shards")
+        shard_index = SearchIndex.load(shard_dir / SEARCH_INDEX_NAME)
+        for key, entry in shard_index.stories.items():
+            index.add(key, entry, shard_index.words[key])
+
+    report = MergeReport(shards=len(manifests), pages=len(merged.pages))
+    for relative, source in sorted(sources.items()):
+        report.files += 1
+        report.written += write_if_changed(outdir / relative, source.read_bytes())
+    if index.stories:
+        index.save(outdir / SEARCH_INDEX_NAME)
+    merged.save(outdir / MANIFEST_NAME)
+    costs = {key: page["seconds"] for key, page in merged.pages.items()}
+    save_costs(outdir / COSTS_NAME, costs)
+    report.seconds = time.perf_counter() - start
+    return report
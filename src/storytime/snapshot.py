@@ -0,0 +1,304 @@
+"""Compare every story's rendered HTML against stored snapshots.
+
+A snapshot is the story's rendered markup, normalized so whitespace
+between tags doesn't matter, plus the SHA-256 of that markup. Snapshots
+are keyed by the story's stable ID, e.g. ``components.heading-0``.
+
+Checking compares hashes first. Only a story whose hash differs is
+parsed, and then both sides are pretty-printed by BeautifulSoup and
+diffed line by line, so the diff follows the element structure.
+
+The store is a directory of up to 16 JSON shards, picked by the first
+hex digit of the hash of the story ID. A story always lands in the same
+shard, and an update only rewrites the shards that changed.
+"""
+from __future__ import annotations
+
+import json
+import re
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from difflib import unified_diff
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+from storytime import make_site
+from storytime import Site
+from storytime.build import iter_stories
+from storytime.build import map_chunks
+from storytime.build import story_id
+from storytime.build import StoryKey
+from storytime.build import write_if_changed
+from storytime.story import DEFAULT_PARSER
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIRNAME = "snapshots"
+
+_BETWEEN_TAGS = re.compile(r">\s+<")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(markup: str) -> str:
+    """Make markup comparable, ignoring insignificant whitespace.
+
+    Whitespace between tags is dropped and other runs of whitespace
+    become one space. This is not suitable for ``<pre>`` content.
+
+    Args:
+        markup: Rendered HTML.
+
+    Returns:
+        The normalized HTML.
+    """
+    return _WHITESPACE.sub(" ", _BETWEEN_TAGS.sub("><", markup)).strip()
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """The normalized rendering of a story and its hash."""
+
+    sha: str
+    html: str
+
+    @classmethod
+    def of(cls, markup: str) -> Snapshot:
+        """Snapshot some rendered markup.
+
+        Args:
+            markup: Rendered HTML.
+
+        Returns:
+            The snapshot of its normalized form.
+        """
+        normalized = normalize(markup)
+        return cls(sha256(normalized.encode("utf-8")).hexdigest(), normalized)
+
+
+def structural_diff(expected: str, actual: str, parser: str = DEFAULT_PARSER) -> str:
+    """Diff two renderings by their pretty-printed element trees.
+
+    Args:
+        expected: The stored HTML.
+        actual: The newly rendered HTML.
+        parser: The BeautifulSoup parser to use.
+
+    Returns:
+        A unified diff.
+    """
+    before = BeautifulSoup(expected, parser).prettify().splitlines()
+    after = BeautifulSoup(actual, parser).prettify().splitlines()
+    lines = unified_diff(before, after, "snapshot", "rendered", lineterm="")
+    return "\n".join(lines)
+
+
+@dataclass()
+class SnapshotStore:
+    """A directory of sharded JSON files holding snapshots."""
+
+    directory: Path
+    shards: dict[str, dict[str, Snapshot]] = field(default_factory=dict)
+    dirty: set[str] = field(default_factory=set)
+
+    @staticmethod
+    def shard_of(key: str) -> str:
+        """The shard a story ID belongs to.
+
+        Args:
+            key: A story ID.
+
+        Returns:
+            A single hex digit.
+        """
+        return sha256(key.encode("utf-8")).hexdigest()[0]
+
+    def shard(self, name: str) -> dict[str, Snapshot]:
+        """The snapshots in one shard, read on first use.
+
+        Args:
+            name: The shard's hex digit.
+
+        Returns:
+            The shard's snapshots by story ID.
+        """
+        if name not in self.shards:
+            snapshots: dict[str, Snapshot] = {}
+            try:
+                data = json.loads((self.directory / f"{name}.json").read_text())
+            except (FileNotFoundError, ValueError):
+                data = {}
+            if data.get("version") == SNAPSHOT_VERSION:
+                for key, (sha, html) in data["snapshots"].items():
+                    snapshots[key] = Snapshot(sha, html)
+            self.shards[name] = snapshots
+        return self.shards[name]
+
+    def keys(self) -> set[str]:
+        """Every story ID in the store, reading all shards.
+
+        Returns:
+            The stored story IDs.
+        """
+        for path in self.directory.glob("*.json"):
+            self.shard(path.stem)
+        return {key for snapshots in self.shards.values() for key in snapshots}
+
+    def get(self, key: str) -> Optional[Snapshot]:
+        """Look up a story's snapshot.
+
+        Args:
+            key: A story ID.
+
+        Returns:
+            The stored snapshot, if any.
+        """
+        return self.shard(self.shard_of(key)).get(key)
+
+    def put(self, key: str, snapshot: Snapshot) -> bool:
+        """Store a story's snapshot.
+
+        Args:
+            key: A story ID.
+            snapshot: The new snapshot.
+
+        Returns:
+            True if the stored snapshot changed.
+        """
+        name = self.shard_of(key)
+        snapshots = self.shard(name)
+        if snapshots.get(key) == snapshot:
+            return False
+        snapshots[key] = snapshot
+        self.dirty.add(name)
+        return True
+
+    def remove(self, key: str) -> None:
+        """Forget a story's snapshot.
+
+        Args:
+            key: A story ID.
+        """
+        name = self.shard_of(key)
+        if self.shard(name).pop(key, None) is not None:
+            self.dirty.add(name)
+
+    def save(self) -> None:
+        """Write the shards that changed, one entry per line."""
+        for name in sorted(self.dirty):
+            snapshots = self.shards[name]
+            target = self.directory / f"{name}.json"
+            if not snapshots:
+                target.unlink(missing_ok=True)
+                continue
+            data = dict(
+                version=SNAPSHOT_VERSION,
+                snapshots={k: [s.sha, s.html] for k, s in snapshots.items()},
+            )
+            content = json.dumps(data, indent=0, sort_keys=True) + "\n"
+            write_if_changed(target, content.encode("utf-8"))
+        self.dirty.clear()
+
+
+@dataclass()
+class SnapshotReport:
+    """How the rendered stories compare with the store."""
+
+    matched: int = 0
+    updated: int = 0
+    missing: list[str] = field(default_factory=list)
+    stale: list[str] = field(default_factory=list)
+    changed: dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """Whether every story matched its snapshot."""
+        return not (self.missing or self.stale or self.changed)
+
+
+def take_snapshots(site: Site, keys: list[StoryKey]) -> dict[str, Snapshot]:
+    """Render some of the site's stories into snapshots.
+
+    Args:
+        site: A populated site.
+        keys: The subject package path and story index of each story.
+
+    Returns:
+        The snapshots by story ID.
+    """
+    snapshots = {}
+    for package_path, index in keys:
+        story: Any = site.find_story(package_path, index)
+        markup = getattr(story, "rendered", "")
+        snapshots[story_id(package_path, index)] = Snapshot.of(markup)
+    return snapshots
+
+
+def snapshot_catalog(target_path: str, workers: int = 1) -> dict[str, Snapshot]:
+    """Render every story of a catalog package into snapshots.
+
+    Args:
+        target_path: String using dotted package path notation.
+        workers: How many processes render stories.
+
+    Returns:
+        The snapshots by story ID.
+    """
+    site = make_site(target_path)
+    keys = [(s.package_path, index) for s, index, _story in iter_stories(site)]
+    if workers < 2:
+        return take_snapshots(site, keys)
+    snapshots: dict[str, Snapshot] = {}
+    for result in map_chunks(target_path, keys, take_snapshots, workers):
+        snapshots.update(result)
+    return snapshots
+
+
+def check_snapshots(
+    target_path: str,
+    store: SnapshotStore,
+    workers: int = 1,
+    update: bool = False,
+) -> SnapshotReport:
+    """Compare a catalog with its stored snapshots, or update them.
+
+    Args:
+        target_path: String using dotted package path notation.
+        store: The snapshots to compare with.
+        workers: How many processes render stories.
+        update: Store the new renderings and drop stale snapshots,
+            instead of reporting differences.
+
+    Returns:
+        What matched and what didn't.
+    """
+    start = time.perf_counter()
+    report = SnapshotReport()
+    snapshots = snapshot_catalog(target_path, workers=workers)
+    for key, snapshot in snapshots.items():
+        if update:
+            if store.put(key, snapshot):
+                report.updated += 1
+            else:
+                report.matched += 1
+            continue
+        stored = store.get(key)
+        if stored is None:
+            report.missing.append(key)
+        elif stored.sha == snapshot.sha:
+            report.matched += 1
+        else:
+            report.changed[key] = structural_diff(stored.html, snapshot.html)
+    stale = sorted(store.keys() - snapshots.keys())
+    if update:
+        for key in stale:
+            store.remove(key)
+        store.save()
+    else:
+        report.stale = stale
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,193 @@
+"""Discover the catalog tree by reading stories files, without importing them.
+
+``get_certain_callable`` has to import each ``stories.py``, and with it
+every component it uses, just to find the function returning a
+``Site``/``Section``/``Subject``. The sniffer reads the file with
+``ast`` instead. It finds the factory by its return annotation and
+pulls out the titles when they are written as string literals.
+
+This gives the catalog skeleton: the tree, its names, paths and titles.
+Unlike ``get_certain_callable``, only functions defined in the stories
+file itself are considered, not ones it imports.
+"""
+from __future__ import annotations
+
+import ast
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import Optional
+from typing import Union
+
+from storytime import get_tree_paths
+from storytime import link_site
+from storytime import scan_tree_nodes
+from storytime import Section
+from storytime import Site
+from storytime import Subject
+from storytime import TreeNode
+from storytime.story import Story
+
+VALID_RETURNS = ("Site", "Section", "Subject")
+
+
+@dataclass()
+class Sniffed:
+    """What the sniffer could learn about a stories file's factory."""
+
+    factory: str
+    kind: str
+    title: Optional[str] = None
+    story_titles: list[str] = field(default_factory=list)
+
+
+def expression_name(node: Optional[ast.expr]) -> Optional[str]:
+    """The last name in ``Section``, ``storytime.Section`` or ``"Section"``.
+
+    Args:
+        node: An annotation or the callee of a call.
+
+    Returns:
+        The bare name, or ``None`` for anything more complicated.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value.rpartition(".")[2]
+    return None
+
+
+def literal_title(call: ast.Call) -> Optional[str]:
+    """The ``title=`` of a call, if it is a string literal.
+
+    Args:
+        call: A call such as ``Section(title="Components")``.
+
+    Returns:
+        The title, or ``None``.
+    """
+    for keyword in call.keywords:
+        if keyword.arg == "title" and isinstance(keyword.value, ast.Constant):
+            if isinstance(keyword.value.value, str):
+                return keyword.value.value
+    return None
+
+
+def literal_story_titles(call: ast.Call) -> list[str]:
+    """The titles in a literal ``stories=[Story(title="...")]`` list.
+
+    Args:
+        call: A call such as ``Subject(stories=[...])``.
+
+    Returns:
+        The titles, or an empty list unless they are all literals.
+    """
+    for keyword in call.keywords:
+        if keyword.arg == "stories" and isinstance(keyword.value, ast.List):
+            calls = keyword.value.elts
+            titles = [
+                literal_title(c)
+                for c in calls
+                if isinstance(c, ast.Call) and expression_name(c.func) == "Story"
+            ]
+            if len(titles) == len(calls) and None not in titles:
+                return [t for t in titles if t is not None]
+    return []
+
+
+def sniff_source(
+    source: Union[str, bytes], filename: str = "<stories>"
+) -> Optional[Sniffed]:
+    """Find the factory function in the source of a stories module.
+
+    Functions are checked in name order, like ``getmembers`` does.
+
+    Args:
+        source: The contents of a ``stories.py``.
+        filename: Used in syntax error messages.
+
+    Returns:
+        The factory and its titles, or ``None`` if there's no factory.
+    """
+    tree = ast.parse(source, filename=filename)
+    functions = [node for node in tree.body if isinstance(node, ast.FunctionDef)]
+    for function in sorted(functions, key=lambda f: f.name):
+        kind = expression_name(function.returns)
+        if kind not in VALID_RETURNS:
+            continue
+        sniffed = Sniffed(factory=function.name, kind=kind)
+        for node in ast.walk(function):
+            if not isinstance(node, ast.Return) or not isinstance(node.value, ast.Call):
+                continue
+            if expression_name(node.value.func) == kind:
+                sniffed.title = literal_title(node.value)
+                sniffed.story_titles = literal_story_titles(node.value)
+                break
+        return sniffed
+    return None
+
+
+def sniff_stories(stories_path: Path) -> Optional[Sniffed]:
+    """Find the factory function in a stories file, without importing it.
+
+    Args:
+        stories_path: The full path to a ``stories.py``.
+
+    Returns:
+        The factory and its titles, or ``None`` if there's no factory.
+    """
+    return sniff_source(stories_path.read_bytes(), filename=str(stories_path))
+
+
+def make_placeholder(sniffed: Sniffed) -> Union[Site, Section, Subject]:
+    """Construct a node from what was sniffed, without the real factory.
+
+    Subjects get title-only stories, with no templates.
+
+    Args:
+        sniffed: The sniffed factory information.
+
+    Returns:
+        A new, not yet linked, Site, Section or Subject.
+    """
+    if sniffed.kind == "Site":
+        return Site(title=sniffed.title)
+    if sniffed.kind == "Section":
+        return Section(title=sniffed.title)
+    stories = [Story(title=title) for title in sniffed.story_titles]
+    return Subject(title=sniffed.title, stories=stories)
+
+
+@dataclass()
+class SniffedTreeNode(TreeNode):
+    """A tree node from reading, rather than importing, a stories file."""
+
+    sniffed: Optional[Sniffed] = field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        """Assign calculated fields, without importing anything."""
+        self.sniffed = sniff_stories(self.stories_path)
+        if self.sniffed is None:
+            self.called_instance = None
+        else:
+            self.called_instance = make_placeholder(self.sniffed)
+        paths = get_tree_paths(self.root_path, self.stories_path)
+        self.name, self.package_path, self.parent_path = paths
+
+
+def make_skeleton(target_path: str, workers: int = 1) -> Site:
+    """Create a site with the tree, names and titles but no real stories.
+
+    Args:
+        target_path: String using dotted package path notation.
+        workers: How many threads to use when reading stories files.
+
+    Returns:
+        A populated site.
+    """
+    tree_nodes = scan_tree_nodes(
+        target_path, workers=workers, tree_node_class=SniffedTreeNode
+    )
+    return link_site(tree_nodes)
@@ -1,28 +1,129 @@
 """A Storytime story has all the information for viewing and testing."""
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
+from dataclasses import field
+from functools import lru_cache
+from importlib.util import find_spec
+from inspect import isawaitable
+from typing import Awaitable
+from typing import Callable
+from typing import cast
 from typing import Optional
+from typing import Union
 
 from bs4 import BeautifulSoup
 from viewdom.render import render
 from viewdom.render import VDOM
 
+from storytime.instrument import span
+from storytime.memory import slotted
 
+DEFAULT_PARSER = "html.parser"
+
+Template = Union[VDOM, Callable[[], Union[VDOM, Awaitable[VDOM]]]]
+
+
+@lru_cache(maxsize=None)
+def best_parser() -> str:
+    """Pick the fastest BeautifulSoup parser that is installed.
+
+    Pass it as a site's, subject's or story's ``parser`` to opt in; by
+    default stories are parsed with Python's own parser.
+
+    Returns:
+        ``lxml`` if it is installed, else Python's own parser.
+    """
+    return "lxml" if find_spec("lxml") is not None else DEFAULT_PARSER
+
+
+@slotted
 @dataclass(frozen=True)
 class Story:
-    """The actual contents of an actual story."""
+    """The actual contents of an actual story.
+
+    The template is either a VDOM, or a function returning one. That
+    function may be ``async``, e.g. to get fixture data from an async
+    provider, in which case ``arender`` lets many stories wait at once.
+
+    The rendered markup and the parsed DOM are each computed once, on
+    first access, and then kept in slots on the instance. Without a
+    parser of its own, or from its subject, a story is parsed with
+    Python's own parser, whatever else is installed.
+    """
 
     title: str
-    template: Optional[VDOM] = None
+    template: Optional[Template] = None
+    parser: Optional[str] = field(default=None, compare=False)
+    _rendered: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _html: Optional[BeautifulSoup] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @property
+    def rendered(self) -> str:
+        """Render the template to a string, without parsing it.
+
+        An async template is run to completion on a new event loop, so
+        inside a running loop use ``arender`` instead.
+        """
+        if self._rendered is not None:
+            return self._rendered
+        if not callable(self.template):
+            return self._render(self.template)
+        made = self.template()
+        if isawaitable(made):
+            return self._render(asyncio.run(_wait_for(made)))
+        return self._render(made)
+
+    async def arender(self) -> str:
+        """Render the template to a string, awaiting an async template.
+
+        Returns:
+            The rendered markup, also kept as ``rendered``.
+        """
+        if self._rendered is not None:
+            return self._rendered
+        if not callable(self.template):
+            return self._render(self.template)
+        made = self.template()
+        if isawaitable(made):
+            return self._render(await made)
+        return self._render(made)
+
+    def _render(self, template: Optional[VDOM]) -> str:
+        """Render a VDOM, and keep the markup."""
+        if template is None:
+            rendered = ""
+        else:
+            # if self.registry is None:
+            #     rendered = viewdom_render(self.vdom)
+            # else:
+            #     rendered = viewdom_wired_render(self.vdom, container=self.container)
+            with span("render", title=self.title):
+                rendered = render(template)  # type: ignore
+        object.__setattr__(self, "_rendered", rendered)
+        return rendered
 
     @property
     def html(self) -> BeautifulSoup:
-        """Render to a DOM-like BeautifulSoup representation."""
-        # if self.registry is None:
-        #     rendered = viewdom_render(self.vdom)
-        # else:
-        #     rendered = viewdom_wired_render(self.vdom, container=self.container)
-        rendered = render(self.template)  # type: ignore
-        this_html = BeautifulSoup(rendered, "html.parser")
-        return this_html
+        """Render to a DOM-like BeautifulSoup representation.
+
+        Every caller gets the same tree, and so does every test given
+        this story. Don't change it: use ``copy.copy(story.html)`` for a
+        tree of your own to change.
+        """
+        if self._html is None:
+            rendered = self.rendered
+            with span("parse", title=self.title):
+                this_html = BeautifulSoup(rendered, self.parser or DEFAULT_PARSER)
+            object.__setattr__(self, "_html", this_html)
+        return cast(BeautifulSoup, self._html)
+
+
+async def _wait_for(awaitable: Awaitable[VDOM]) -> VDOM:
+    """Await something, from a coroutine that ``asyncio.run`` can take."""
+    return await awaitable
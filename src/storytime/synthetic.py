@@ -0,0 +1,125 @@
+"""Generate synthetic catalog packages of any size.
+
+These look like ``examples.minimal``, scaled up: a ``Site``, then N
+sections of M subjects with K stories each. Every subject imports a
+small component module, like real catalogs do, and the story templates
+can be made larger to exercise rendering and parsing.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+SITE = '''\
+"""The synthetic site."""
+from storytime import Site
+
+
+def this_site() -> Site:
+    """The top of the synthetic catalog."""
+    return Site(title="Synthetic Site")
+'''
+
+SECTION = '''\
+"""A synthetic section."""
+from storytime import Section
+
+
+def this_section() -> Section:
+    """Section {section}."""
+    return Section(title="Section {section}")
+'''
+
+COMPONENT = '''\
+"""A synthetic component."""
+LABEL = "Subject {section}.{subject}"
+'''
+
+SUBJECT = '''\
+"""A synthetic subject."""
+from viewdom.render import html
+
+from storytime import Subject
+from storytime.story import Story
+from {package}.section{section}.subject{subject}.component import LABEL
+
+
+def this_subject() -> Subject:
+    """Subject {section}.{subject}."""
+    return Subject(
+        title=LABEL,
+        stories=[
+{stories}
+        ],
+    )
+'''
+
+STORY = """\
+            Story(
+                title="Story {story}",
+                template=html("<div class='story'>{body}</div>"),
+            ),"""
+
+
+@dataclass(frozen=True)
+class CatalogShape:
+    """How big a synthetic catalog is."""
+
+    sections: int = 2
+    subjects: int = 3
+    stories: int = 2
+    template_size: int = 1
+
+    @property
+    def subject_count(self) -> int:
+        """How many subjects, across all sections."""
+        return self.sections * self.subjects
+
+    @property
+    def story_count(self) -> int:
+        """How many stories, across all subjects."""
+        return self.subject_count * self.stories
+
+
+def write_module(path: Path, content: str) -> None:
+    """Write a module, creating its package directories.
+
+    Args:
+        path: The module's file.
+        content: The module source.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    init = path.parent / "__init__.py"
+    if not init.exists():
+        init.write_text("")
+    path.write_text(content)
+
+
+def write_catalog(parent: Path, package: str, shape: CatalogShape) -> Path:
+    """Write a synthetic catalog package.
+
+    Args:
+        parent: The directory to write the package into, which must be
+            on ``sys.path`` to import it.
+        package: The name of the top-level package.
+        shape: How many sections, subjects and stories to write.
+
+    Returns:
+        The package's directory.
+    """
+    root = parent / package
+    write_module(root / "stories.py", SITE)
+    body = "".join(f"<p>Paragraph {i}</p>" for i in range(shape.template_size))
+    stories = "\n".join(
+        STORY.format(story=story, body=body) for story in range(shape.stories)
+    )
+    for section in range(shape.sections):
+        section_dir = root / f"section{section}"
+        write_module(section_dir / "stories.py", SECTION.format(section=section))
+        for subject in range(shape.subjects):
+            subject_dir = section_dir / f"subject{subject}"
+            names = dict(package=package, section=section, subject=subject)
+            write_module(subject_dir / "component.py", COMPONENT.format(**names))
+            content = SUBJECT.format(stories=stories, **names)
+            write_module(subject_dir / "stories.py", content)
+    return root
@@ -0,0 +1,512 @@
+"""Keep a built site current as stories and components are edited.
+
+A dependency graph records which files each ``stories.py`` pulls in:
+itself plus the modules inside the catalog package that it imports,
+directly or indirectly. Imports are read with ``ast``, so building the
+graph doesn't execute anything, and after a change only the changed
+files are read again.
+
+On a change, only the changed component modules (and the modules that
+import them) are reloaded, only the affected stories files are imported
+again, and the new Section/Subject instances are patched into the
+existing ``Site`` in place. The caller gets the package paths of the
+changed nodes, to re-render just those pages. A catalog of several
+packages gets one watcher per mount, each patching the combined site.
+"""
+from __future__ import annotations
+
+import ast
+import sys
+from abc import ABC
+from abc import abstractmethod
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from importlib import reload
+from importlib.resources import files
+from importlib.util import resolve_name
+from pathlib import Path
+from typing import Callable
+from typing import cast
+from typing import Optional
+from typing import Union
+
+from storytime import get_tree_paths
+from storytime import is_catalog
+from storytime import mount_tree_node
+from storytime import parse_mounts
+from storytime import seat_node
+from storytime import Section
+from storytime import Site
+from storytime import Subject
+from storytime import TreeNode
+
+
+def module_file(module_name: str, target_path: str, root_path: Path) -> Optional[Path]:
+    """Find the file for a module, if it lives in the catalog package.
+
+    Args:
+        module_name: The dotted module name from an import statement.
+        target_path: The dotted name of the catalog's root package.
+        root_path: The directory of the catalog's root package.
+
+    Returns:
+        The module's file, or ``None`` for modules outside the catalog.
+    """
+    if module_name != target_path and not module_name.startswith(target_path + "."):
+        return None
+    parts = module_name[len(target_path) :].split(".")[1:]
+    base = root_path.joinpath(*parts)
+    for candidate in (base.with_suffix(".py"), base / "__init__.py"):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def module_name(module_path: Path, target_path: str, root_path: Path) -> str:
+    """Convert a file in the catalog package to its dotted module name.
+
+    Args:
+        module_path: A ``.py`` file under the root package.
+        target_path: The dotted name of the catalog's root package.
+        root_path: The directory of the catalog's root package.
+
+    Returns:
+        The dotted module name.
+    """
+    parts = module_path.relative_to(root_path).with_suffix("").parts
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join((target_path, *parts))
+
+
+def module_imports(module_path: Path, target_path: str, root_path: Path) -> set[Path]:
+    """Find the catalog modules that a module imports directly.
+
+    Args:
+        module_path: A ``.py`` file under the root package.
+        target_path: The dotted name of the catalog's root package.
+        root_path: The directory of the catalog's root package.
+
+    Returns:
+        The files of the imported catalog modules.
+    """
+    name = module_name(module_path, target_path, root_path)
+    package = name if module_path.name == "__init__.py" else name.rpartition(".")[0]
+    tree = ast.parse(module_path.read_bytes(), filename=str(module_path))
+    names: list[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = resolve_name("." * node.level + (node.module or ""), package)
+            names.append(base)
+            # ``from package import module`` imports a module too
+            names.extend(f"{base}.{alias.name}" for alias in node.names)
+    found = (module_file(n, target_path, root_path) for n in names)
+    return {path for path in found if path is not None and path != module_path}
+
+
+@dataclass()
+class DependencyGraph:
+    """Which catalog files each ``stories.py`` depends on."""
+
+    target_path: str
+    root_path: Path = field(init=False)
+    imports: dict[Path, set[Path]] = field(default_factory=dict)
+    depends: dict[Path, set[Path]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        """Locate the root package."""
+        self.root_path = cast(Path, files(self.target_path))
+
+    def build(self) -> DependencyGraph:
+        """Read the imports of every stories file, and what they import.
+
+        Returns:
+            This graph, for chaining.
+        """
+        self.imports = {}
+        self.depends = {
+            stories_path: self.closure(stories_path)
+            for stories_path in sorted(self.root_path.glob("**/stories.py"))
+        }
+        return self
+
+    def update(self, changed: set[Path]) -> DependencyGraph:
+        """Read the imports of just the changed files, and redo what they touch.
+
+        Args:
+            changed: Files that were edited, added or removed.
+
+        Returns:
+            This graph, for chaining.
+        """
+        for path in changed:
+            self.imports.pop(path, None)
+        stale = {p for p, depends in self.depends.items() if depends & changed}
+        stale |= {p for p in changed if p.name == "stories.py"}
+        for stories_path in stale:
+            if stories_path.exists():
+                self.depends[stories_path] = self.closure(stories_path)
+            else:
+                self.depends.pop(stories_path, None)
+        return self
+
+    def closure(self, module_path: Path) -> set[Path]:
+        """All the catalog files a module depends on, including itself.
+
+        Args:
+            module_path: The module to start from.
+
+        Returns:
+            The module's file plus everything it imports, transitively.
+        """
+        seen = {module_path}
+        pending = [module_path]
+        while pending:
+            current = pending.pop()
+            if current not in self.imports:
+                self.imports[current] = module_imports(
+                    current, self.target_path, self.root_path
+                )
+            for imported in self.imports[current] - seen:
+                seen.add(imported)
+                pending.append(imported)
+        return seen
+
+    def affected(self, changed: set[Path]) -> set[Path]:
+        """The stories files which depend on any of the changed files.
+
+        Args:
+            changed: Files that were edited, added or removed.
+
+        Returns:
+            The stories files to import again.
+        """
+        return {
+            stories_path
+            for stories_path, depends in self.depends.items()
+            if depends & changed
+        }
+
+    def importers(self, changed: set[Path]) -> list[Path]:
+        """Changed modules plus their importers, dependencies first.
+
+        Args:
+            changed: Files that were edited.
+
+        Returns:
+            The non-stories modules to reload, in a safe order.
+        """
+        stale = set(changed)
+        grew = True
+        while grew:
+            before = len(stale)
+            stale |= {m for m, imported in self.imports.items() if imported & stale}
+            grew = len(stale) > before
+        ordered: list[Path] = []
+        visited: set[Path] = set()
+
+        def visit(module_path: Path) -> None:
+            if module_path in visited:
+                return
+            visited.add(module_path)  # before recursing, guards import cycles
+            for imported in sorted(self.imports.get(module_path, set()) & stale):
+                visit(imported)
+            ordered.append(module_path)
+
+        for module_path in sorted(stale):
+            visit(module_path)
+        return [m for m in ordered if m.name != "stories.py"]
+
+    def snapshot(self) -> dict[Path, int]:
+        """The mtimes of every tracked file and every stories file.
+
+        Returns:
+            A mapping of file to its ``st_mtime_ns``.
+        """
+        tracked: set[Path] = set(self.root_path.glob("**/stories.py"))
+        for depends in self.depends.values():
+            tracked |= depends
+        mtimes = {}
+        for path in tracked:
+            try:
+                mtimes[path] = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+        return mtimes
+
+
+def reload_modules(module_paths: list[Path]) -> None:
+    """Reload the already-imported modules that live at these files.
+
+    Args:
+        module_paths: The module files to reload, in order.
+    """
+    by_file = {}
+    for module in list(sys.modules.values()):
+        filename = getattr(module, "__file__", None)
+        if filename is not None:
+            by_file[Path(filename)] = module
+    for module_path in module_paths:
+        if module_path in by_file:
+            reload(by_file[module_path])
+
+
+def patch_site(site: Site, tree_node: TreeNode) -> list[str]:
+    """Seat a freshly imported tree node into an existing site.
+
+    Args:
+        site: The site to update in place.
+        tree_node: The newly scanned node.
+
+    Returns:
+        The package paths whose pages need rendering again.
+    """
+    instance = tree_node.called_instance
+    existing = site.find_path(tree_node.package_path)
+    if isinstance(instance, Site):
+        site.title = (
+            tree_node.package_path if instance.title is None else instance.title
+        )
+        site.register(site)
+        return ["."]
+    parent = site.find_path(tree_node.parent_path or ".")
+    if not seat_node(instance, parent, tree_node):
+        # The factory went away, so the node leaves the tree
+        return unlink_path(site, tree_node.package_path)
+    if isinstance(instance, Section) and isinstance(existing, Section):
+        # Keep everything that was below the old section
+        instance.items = existing.items
+        for child in instance.items.values():
+            child.parent = instance
+        return [node.package_path for node in _walk(instance)]
+    return [tree_node.package_path]
+
+
+def _walk(node: Union[Section, Subject]) -> list[Union[Section, Subject]]:
+    """A node and everything below it, depth first."""
+    nodes: list[Union[Section, Subject]] = [node]
+    if isinstance(node, Section):
+        for child in node.items.values():
+            nodes.extend(_walk(child))
+    return nodes
+
+
+def unlink_path(site: Site, package_path: str) -> list[str]:
+    """Remove a node whose stories file is gone, or no longer has a factory.
+
+    Args:
+        site: The site to update in place.
+        package_path: The dotted path of the node to drop.
+
+    Returns:
+        The dropped package path, if it was in the tree.
+    """
+    parent_path, _, name = package_path.rpartition(".")
+    parent = site.find_path(parent_path or ".")
+    if parent is None or not isinstance(parent, (Site, Section)):
+        return []
+    if parent.items.pop(name, None) is None:
+        return []
+    site.unregister(package_path)
+    return [package_path]
+
+
+class BaseWatcher(ABC):
+    """Patch a site as its sources change, polled by ``watch``."""
+
+    site: Site
+
+    @abstractmethod
+    def poll(self) -> list[str]:
+        """Check for changed files and patch the site.
+
+        Returns:
+            The package paths whose pages need rendering again.
+        """
+
+    @abstractmethod
+    def stamps(self, package_path: str) -> list[str]:
+        """Describe the sources behind a subject's pages, with their mtimes.
+
+        Args:
+            package_path: The dotted path of a subject in the site.
+
+        Returns:
+            One ``path=mtime`` string per source file.
+        """
+
+    def watch(
+        self,
+        on_change: Callable[[list[str]], None],
+        interval: float = 0.5,
+        max_polls: Optional[int] = None,
+    ) -> None:
+        """Poll forever, or ``max_polls`` times, reporting each change.
+
+        Args:
+            on_change: Called with the package paths that were updated.
+            interval: Seconds to sleep between polls.
+            max_polls: Stop after this many polls, mainly for tests.
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            updated = self.poll()
+            if updated:
+                on_change(updated)
+            polls += 1
+            time.sleep(interval)
+
+
+@dataclass()
+class Watcher(BaseWatcher):
+    """Poll a catalog package and patch its site when files change.
+
+    With a mount, the package is one part of a combined site, below
+    that mount name, as ``make_catalog`` links it.
+    """
+
+    target_path: str
+    site: Site
+    mount: Optional[str] = None
+    share_registry: bool = False
+    graph: DependencyGraph = field(init=False)
+    mtimes: dict[Path, int] = field(init=False)
+
+    def __post_init__(self) -> None:
+        """Take the first snapshot to compare against."""
+        self.graph = DependencyGraph(self.target_path).build()
+        self.mtimes = self.graph.snapshot()
+
+    def poll(self) -> list[str]:
+        """Check for changed files and patch the site.
+
+        Returns:
+            The package paths whose pages need rendering again.
+        """
+        current = self.graph.snapshot()
+        changed = {
+            path
+            for path in current.keys() | self.mtimes.keys()
+            if current.get(path) != self.mtimes.get(path)
+        }
+        self.mtimes = current
+        if not changed:
+            return []
+        return self.apply(changed)
+
+    def apply(self, changed: set[Path]) -> list[str]:
+        """Reload what changed and patch the affected nodes.
+
+        Args:
+            changed: Files that were edited, added or removed.
+
+        Returns:
+            The package paths whose pages need rendering again.
+        """
+        reload_modules(self.graph.importers(changed))
+        affected = self.graph.affected(changed)
+        self.graph.update(changed)
+        affected |= {p for p in changed if p in self.graph.depends}
+        # Parents before children, so new Subjects find their Section
+        updated: list[str] = []
+        for stories_path in sorted(affected, key=lambda p: len(p.parts)):
+            if stories_path.exists():
+                tree_node = TreeNode(self.target_path, stories_path, reload=True)
+                if self.mount is not None:
+                    tree_node = mount_tree_node(
+                        tree_node, self.mount, self.target_path, self.share_registry
+                    )
+                updated.extend(patch_site(self.site, tree_node))
+            else:
+                paths = get_tree_paths(self.target_path, stories_path)
+                updated.extend(unlink_path(self.site, self.site_path(paths[1])))
+        self.mtimes = self.graph.snapshot()
+        return sorted(set(updated))
+
+    def site_path(self, package_path: str) -> str:
+        """Find where a node of the package sits in the site.
+
+        Args:
+            package_path: The node's dotted path within the package.
+
+        Returns:
+            The node's dotted path in the site, below the mount if any.
+        """
+        if self.mount is None:
+            return package_path
+        return f".{self.mount}{package_path.rstrip('.')}"
+
+    def stamps(self, package_path: str) -> list[str]:
+        """Describe the sources behind a subject's pages, with their mtimes.
+
+        Args:
+            package_path: The dotted path of a subject in the site.
+
+        Returns:
+            One ``path=mtime`` string per source file.
+        """
+        segments = package_path.split(".")[1:]
+        if self.mount is not None:
+            segments = segments[1:]
+        stories_path = self.graph.root_path.joinpath(*segments, "stories.py")
+        sources = sorted(self.graph.depends.get(stories_path, set()))
+        return [f"{source}={self.mtimes.get(source)}" for source in sources]
+
+
+@dataclass()
+class CatalogWatcher(BaseWatcher):
+    """Poll every package of a combined site, with one watcher per mount."""
+
+    site: Site
+    watchers: dict[str, Watcher] = field(default_factory=dict)
+
+    def poll(self) -> list[str]:
+        """Check each package for changed files and patch the site.
+
+        Returns:
+            The package paths whose pages need rendering again.
+        """
+        updated: list[str] = []
+        for watcher in self.watchers.values():
+            updated.extend(watcher.poll())
+        return sorted(set(updated))
+
+    def stamps(self, package_path: str) -> list[str]:
+        """Describe the sources behind a subject's pages, with their mtimes.
+
+        Args:
+            package_path: The dotted path of a subject in the site.
+
+        Returns:
+            One ``path=mtime`` string per source file.
+        """
+        mount = package_path.split(".")[1]
+        watcher = self.watchers.get(mount)
+        return [] if watcher is None else watcher.stamps(package_path)
+
+
+def make_watcher(
+    target_path: str, site: Site, share_registry: bool = False
+) -> BaseWatcher:
+    """Watch a package, or each package of a catalog, for one site.
+
+    Args:
+        target_path: String using dotted package path notation, or
+            several packages separated by commas.
+        site: The site built from the target.
+        share_registry: Whether the catalog's packages share the site's
+            registry, as when it was made.
+
+    Returns:
+        The watcher, ready to poll.
+    """
+    if not is_catalog(target_path):
+        return Watcher(target_path, site)
+    watchers = {
+        mount: Watcher(package, site, mount=mount, share_registry=share_registry)
+        for mount, package in parse_mounts(target_path)
+    }
+    return CatalogWatcher(site, watchers)
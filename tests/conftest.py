@@ -0,0 +1,41 @@
+"""Fixtures shared by the test modules."""
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from storytime.synthetic import CatalogShape
+from storytime.synthetic import write_catalog
+
+
+@pytest.fixture
+def broken_catalog(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Callable[..., str]:
+    """Write an importable catalog whose first subjects are broken.
+
+    The returned function takes one replacement for ``template=html(`` per
+    broken subject, followed by one healthy subject, and returns the
+    package name. ``stories`` sets the stories per subject, and ``count``
+    limits the replacement to that many of each subject's stories.
+
+    Args:
+        tmp_path: Where the catalog is written.
+        monkeypatch: Puts the catalog on ``sys.path``.
+
+    Returns:
+        The function writing the catalog.
+    """
+
+    def write(*templates: str, stories: int = 1, count: int = -1) -> str:
+        name = f"broken_{tmp_path.name}"
+        shape = CatalogShape(sections=1, subjects=len(templates) + 1, stories=stories)
+        write_catalog(tmp_path, name, shape)
+        for subject, template in enumerate(templates):
+            path = tmp_path / name / "section0" / f"subject{subject}" / "stories.py"
+            source = path.read_text().replace("template=html(", template, count)
+            path.write_text(source)
+        monkeypatch.syspath_prepend(str(tmp_path))
+        return name
+
+    return write
@@ -0,0 +1,98 @@
+"""Copy static files into the output, fingerprinted and compressed."""
+import gzip
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from storytime.assets import ASSET_MANIFEST_NAME
+from storytime.assets import ASSET_STAMPS_NAME
+from storytime.assets import AssetManifest
+from storytime.assets import copy_assets
+from storytime.assets import fingerprinted
+from storytime.assets import precompress
+
+STYLE = "body { color: black; }\n" * 20
+
+
+@pytest.fixture
+def source_dir(tmp_path: Path) -> Path:
+    """A static directory with a stylesheet, a script and an image."""
+    static = tmp_path / "package" / "static"
+    (static / "images").mkdir(parents=True)
+    (static / "style.css").write_text(STYLE)
+    (static / "app.js").write_text("console.log('hi');\n")
+    (static / "images" / "logo.png").write_bytes(b"\x89PNG")
+    return static
+
+
+def test_fingerprinted() -> None:
+    """The hash goes between the name and the suffix."""
+    assert fingerprinted(Path("static/style.css"), "0123456789abcdef") == Path(
+        "static/style.0123456789ab.css"
+    )
+
+
+def test_copy_assets(source_dir: Path, tmp_path: Path) -> None:
+    """Files are linked under their hashed names, and listed in the manifest."""
+    outdir = tmp_path / "out"
+    manifest = copy_assets({"": source_dir}, outdir)
+    assert manifest.copied == 3
+    style = manifest.assets["static/style.css"]
+    assert style.path.startswith("static/style.") and style.path.endswith(".css")
+    assert (outdir / style.path).read_text() == STYLE
+    assert manifest.links == [
+        "/" + manifest.assets["static/app.js"].path,
+        "/" + style.path,
+    ]
+    saved = json.loads((outdir / ASSET_MANIFEST_NAME).read_text())
+    assert saved["assets"]["static/images/logo.png"]["path"].startswith(
+        "static/images/logo."
+    )
+    assert AssetManifest.load(outdir / ASSET_MANIFEST_NAME) == manifest
+
+
+def test_copy_assets_incremental(source_dir: Path, tmp_path: Path) -> None:
+    """Only changed files are copied again, under a new name."""
+    outdir = tmp_path / "out"
+    first = copy_assets({"": source_dir}, outdir)
+    assert copy_assets({"": source_dir}, outdir).copied == 0
+    (source_dir / "style.css").unlink()
+    (source_dir / "style.css").write_text(STYLE + "p {}\n")
+    changed = copy_assets({"": source_dir}, outdir)
+    assert changed.copied == 1
+    old, new = first.assets["static/style.css"], changed.assets["static/style.css"]
+    assert old.path != new.path
+    assert (outdir / old.path).read_text() == STYLE
+
+
+def test_copy_assets_stamps(source_dir: Path, tmp_path: Path) -> None:
+    """Stamps stay in the cache, so the manifest only depends on content."""
+    outdir, cache_dir = tmp_path / "out", tmp_path / "cache"
+    first = copy_assets({"": source_dir}, outdir, cache_dir=cache_dir)
+    published = (outdir / ASSET_MANIFEST_NAME).read_bytes()
+    assert b"mtime" not in published
+    assert (cache_dir / ASSET_STAMPS_NAME).exists()
+    os.utime(source_dir / "style.css", ns=(1, 1))
+    again = copy_assets({"": source_dir}, outdir, cache_dir=cache_dir)
+    assert again.copied == 0
+    assert again.assets == first.assets
+    assert (outdir / ASSET_MANIFEST_NAME).read_bytes() == published
+
+
+def test_precompress(tmp_path: Path) -> None:
+    """Large enough text files get a gzip sibling, once."""
+    page = tmp_path / "story-0.html"
+    page.write_text(STYLE)
+    assert precompress(page) >= 1
+    assert (
+        gzip.decompress((tmp_path / "story-0.html.gz").read_bytes())
+        == page.read_bytes()
+    )
+    assert precompress(page) == 0
+    small = tmp_path / "small.css"
+    small.write_text("p {}")
+    image = tmp_path / "logo.png"
+    image.write_bytes(b"\x89PNG" * 100)
+    assert precompress(small) == precompress(image) == 0
@@ -0,0 +1,82 @@
+"""Render each story within a budget, and report the outliers."""
+import time
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from storytime.budget import RenderBudget
+from storytime.budget import RenderFailure
+from storytime.budget import RenderLedger
+from storytime.budget import RenderTimeoutError
+from storytime.budget import time_limit
+from storytime.build import build_site
+
+TEMPLATES = {
+    "sleep": "template=lambda: __import__('time').sleep(60) or html(",
+    "raise": "template=lambda: 1 / 0 or html(",
+    "hog": "template=lambda: bytearray(2 * 1024 ** 3) and html(",
+    "wait": "template=lambda: __import__('asyncio').sleep(60) if 1 else html(",
+}
+
+
+def test_time_limit() -> None:
+    """A block past its limit is interrupted, and no limit is a no-op."""
+    with pytest.raises(RenderTimeoutError):
+        with time_limit(0.05):
+            time.sleep(5)
+    with time_limit(None):
+        time.sleep(0)
+
+
+def test_ledger_report() -> None:
+    """The report lists failures, then the slowest and heaviest stories."""
+    ledger = RenderLedger(
+        seconds={"a-0": 0.5, "b-0": 2.0},
+        peaks={"a-0": 4096, "b-0": 1024},
+        titles={"a-0": "A", "b-0": "B"},
+    )
+    ledger.merge(RenderLedger(failures=[RenderFailure("c-0", ".c", 0, "C", "Oops")]))
+    assert ledger.slowest(1) == [("b-0", 2.0)]
+    assert ledger.heaviest(1) == [("a-0", 4096)]
+    assert ledger.failed == {"c-0"}
+    report = ledger.report(1).splitlines()
+    assert report[:2] == ["Failed 1 stories:", "  .c 0 (C): Oops"]
+    assert report[3].endswith("b-0 (B)")
+    assert report[5].endswith("a-0 (A)")
+
+
+def test_build_continues(tmp_path: Path, broken_catalog: Callable[..., str]) -> None:
+    """A hanging and a broken story are recorded, and the rest is built."""
+    name = broken_catalog(TEMPLATES["sleep"], TEMPLATES["raise"])
+    outdir = tmp_path / "out"
+    budget = RenderBudget(timeout=0.2, trace_memory=True)
+    report = build_site(name, outdir, budget=budget)
+    assert (report.pages, report.written, report.failed) == (3, 1, 2)
+    failures = {f.package_path: f for f in report.ledger.failures}
+    assert failures[".section0.subject0"].error.startswith("RenderTimeoutError")
+    assert failures[".section0.subject1"].error.startswith("ZeroDivisionError")
+    assert failures[".section0.subject1"].title == "Story 0"
+    assert (outdir / "section0" / "subject2" / "story-0.html").exists()
+    assert not (outdir / "section0" / "subject0" / "story-0.html").exists()
+    assert list(report.ledger.peaks) == ["section0.subject2-0"]
+
+
+def test_async_timeout(tmp_path: Path, broken_catalog: Callable[..., str]) -> None:
+    """An async template is given up on after the timeout."""
+    name = broken_catalog(TEMPLATES["wait"])
+    budget = RenderBudget(timeout=0.2)
+    report = build_site(name, tmp_path / "out", concurrency=2, budget=budget)
+    [failure] = report.ledger.failures
+    assert failure.error.startswith("RenderTimeoutError")
+    assert report.written == 1
+
+
+def test_worker_memory_cap(tmp_path: Path, broken_catalog: Callable[..., str]) -> None:
+    """A story allocating past the worker's cap fails with a MemoryError."""
+    name = broken_catalog(TEMPLATES["hog"])
+    budget = RenderBudget(max_memory=1024**3)
+    report = build_site(name, tmp_path / "out", workers=2, budget=budget)
+    [failure] = report.ledger.failures
+    assert failure.error.startswith("MemoryError")
+    assert report.written == 1
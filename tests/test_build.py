@@ -0,0 +1,171 @@
+"""Write the HTML pages for a catalog."""
+import os
+import stat
+from pathlib import Path
+
+import pytest
+from viewdom.render import html
+from viewdom.render import VDOM
+
+from storytime import make_site
+from storytime import Subject
+from storytime.build import build_pages
+from storytime.build import build_site
+from storytime.build import FragmentCache
+from storytime.build import page_path
+from storytime.build import render_page
+from storytime.build import rewrite_pages
+from storytime.build import subject_keys
+from storytime.build import write_if_changed
+from storytime.story import Story
+from storytime.synthetic import CatalogShape
+from storytime.synthetic import write_catalog
+
+
+def test_page_path() -> None:
+    """Pages live under their subject's package path."""
+    assert page_path(".components.heading", 1) == Path(
+        "components/heading/story-1.html"
+    )
+
+
+def test_render_page() -> None:
+    """A story's template becomes the page body."""
+    story = Story(title="Hello & Bye", template=html("<div>Hello</div>"))
+    page = render_page(story).decode("utf-8")
+    assert "<title>Hello &amp; Bye</title>" in page
+    assert "<div>Hello</div>" in page
+
+
+def test_render_page_chrome() -> None:
+    """With the site, pages get its title, navigation and asset links."""
+    site = make_site("examples.minimal")
+    story = site.find_story(".components.heading", 0)
+    assets = ["/style.css", "/app.js"]
+    page = render_page(story, site, assets, FragmentCache()).decode("utf-8")
+    assert "<title>Default Heading</title>" in page
+    assert '<header><a href="/">Minimal Site</a></header>' in page
+    assert '<li>Components<ul><li><a href="/components/heading/story-0.html">' in page
+    assert '<link rel="stylesheet" href="/style.css">' in page
+    assert '<script src="/app.js" defer></script>' in page
+
+
+def test_fragment_cache() -> None:
+    """The chrome is rendered once per revision of the tree."""
+    site = make_site("examples.minimal")
+    story = site.find_story(".components.heading", 0)
+    fragments = FragmentCache()
+    first = render_page(story, site, fragments=fragments)
+    assert render_page(story, site, fragments=fragments) == first
+    assert fragments.renders == 1
+    subject = site.find_path(".components.heading")
+    assert isinstance(subject, Subject)
+    subject.title = "Renamed Heading"
+    site.register(subject)
+    assert b"Renamed Heading</a>" in render_page(story, site, fragments=fragments)
+    assert fragments.renders == 2
+
+
+def test_build_site_assets(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Static files are copied first, linked from every page, and compressed."""
+    name = f"styled_{tmp_path.name}"
+    package = write_catalog(tmp_path, name, CatalogShape(sections=1, subjects=1))
+    (package / "static").mkdir()
+    (package / "static" / "style.css").write_text("body { color: black; }\n" * 20)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    outdir = tmp_path / "out"
+    build_site(name, outdir, compress=True)
+    [stylesheet] = (outdir / "static").glob("style.*.css")
+    page = outdir / "section0" / "subject0" / "story-0.html"
+    assert f'href="/static/{stylesheet.name}"' in page.read_text()
+    assert (outdir / "static" / f"{stylesheet.name}.gz").exists()
+    assert page.with_name("story-0.html.gz").exists()
+
+
+def test_build_catalog_assets(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Each package of a catalog has its own pages and static directory."""
+    names = [f"styled{n}_{tmp_path.name}" for n in range(2)]
+    for name in names:
+        package = write_catalog(tmp_path, name, CatalogShape(sections=1, subjects=1))
+        (package / "static").mkdir()
+        (package / "static" / "style.css").write_text(f"/* {name} */\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    outdir = tmp_path / "out"
+    build_site(f"one={names[0]},two={names[1]}", outdir)
+    for mount in ("one", "two"):
+        [stylesheet] = (outdir / "static" / mount).glob("style.*.css")
+        page = outdir / "one" / "section0" / "subject0" / "story-0.html"
+        assert f'href="/static/{mount}/{stylesheet.name}"' in page.read_text()
+
+
+def test_rewrite_pages(tmp_path: Path) -> None:
+    """Only updated subjects are written, unless the navigation changed."""
+    site = make_site("examples.minimal")
+    written, chrome = rewrite_pages(site, tmp_path, [])
+    assert written == 1
+    assert rewrite_pages(site, tmp_path, [], chrome=chrome) == (0, chrome)
+    subject = site.find_path(".components.heading")
+    assert isinstance(subject, Subject)
+    subject.title = "Renamed Heading"
+    site.register(subject)
+    written, renamed = rewrite_pages(site, tmp_path, [], chrome=chrome)
+    assert written == 1
+    assert b"Renamed Heading" in renamed
+    page = tmp_path / "components" / "heading" / "story-0.html"
+    assert b"Renamed Heading</a>" in page.read_bytes()
+
+
+def test_subject_keys() -> None:
+    """Only subjects in the tree have pages."""
+    site = make_site("examples.minimal")
+    paths = [".components", ".components.heading", ".components.gone"]
+    assert subject_keys(site, paths) == [(".components.heading", 0)]
+
+
+def test_write_if_changed(tmp_path: Path) -> None:
+    """Identical bytes are not written again."""
+    target = tmp_path / "a" / "page.html"
+    assert write_if_changed(target, b"one")
+    assert not write_if_changed(target, b"one")
+    assert write_if_changed(target, b"two")
+    assert target.read_bytes() == b"two"
+    assert [p.name for p in target.parent.iterdir()] == ["page.html"]
+
+
+def test_write_if_changed_mode(tmp_path: Path) -> None:
+    """Written files are readable by others, as the umask allows."""
+    previous = os.umask(0o022)
+    try:
+        write_if_changed(tmp_path / "page.html", b"one")
+    finally:
+        os.umask(previous)
+    assert stat.S_IMODE((tmp_path / "page.html").stat().st_mode) == 0o644
+
+
+def test_build_site(tmp_path: Path) -> None:
+    """Every story gets a page, and a rebuild leaves them alone."""
+    outdir = tmp_path / "out"
+    report = build_site("examples.minimal", outdir)
+    assert (report.pages, report.written) == (1, 1)
+    page = outdir / "components" / "heading" / "story-0.html"
+    assert "<title>Default Heading</title>" in page.read_text()
+    mtime_ns = page.stat().st_mtime_ns
+    again = build_site("examples.minimal", outdir, workers=2)
+    assert (again.pages, again.written, again.unchanged) == (1, 0, 1)
+    assert page.stat().st_mtime_ns == mtime_ns
+
+
+def test_build_pages_concurrently(tmp_path: Path) -> None:
+    """Async templates render on an event loop before the pages are written."""
+
+    async def fetch() -> VDOM:
+        return html("<p>Fetched</p>")
+
+    site = make_site("examples.minimal")
+    subject = site.find_path(".components.heading")
+    assert isinstance(subject, Subject)
+    subject.stories = [Story(title="Async", template=fetch)]
+    keys = [(".components.heading", 0)]
+    assert build_pages(site, tmp_path, keys, concurrency=4) == 1
+    page = tmp_path / "components" / "heading" / "story-0.html"
+    assert "<p>Fetched</p>" in page.read_text()
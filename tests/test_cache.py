@@ -0,0 +1,180 @@
+"""Remember scan results between runs."""
+import os
+from dataclasses import fields
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import pytest
+
+import storytime
+import storytime.cache
+from storytime import make_site
+from storytime.cache import CacheEntry
+from storytime.cache import fingerprint_file
+from storytime.cache import ScanCache
+from storytime.lazy import LazySubject
+from storytime.synthetic import CatalogShape
+from storytime.synthetic import write_catalog
+
+
+def make_entry(stories_path: Path) -> CacheEntry:
+    """Fingerprint a file into an entry without a node kind."""
+    mtime_ns, size, digest = fingerprint_file(stories_path)
+    return CacheEntry(
+        mtime_ns=mtime_ns,
+        size=size,
+        digest=digest,
+        name="x",
+        package_path=".x",
+        parent_path=".",
+        kind=None,
+    )
+
+
+def test_make_site_records(tmp_path: Path) -> None:
+    """Building a site fills the cache with tree metadata."""
+    make_site("examples.minimal", cache_dir=tmp_path)
+    cache = ScanCache(cache_dir=tmp_path, target_path="examples.minimal").load()
+    kinds = {entry.package_path: entry.kind for entry in cache.entries.values()}
+    assert kinds == {
+        ".": "site",
+        ".components": "section",
+        ".components.heading": "subject",
+    }
+    heading = [e for e in cache.entries.values() if e.kind == "subject"][0]
+    assert heading.title == "Heading"
+    assert heading.story_titles == ["Default Heading"]
+
+
+def test_warm_site_matches(tmp_path: Path) -> None:
+    """A warm build gives the same tree as a cold one."""
+    cold = make_site("examples.minimal", cache_dir=tmp_path)
+    warm = make_site("examples.minimal", cache_dir=tmp_path)
+    assert warm.title == cold.title
+    assert list(warm.items["components"].items) == ["heading"]
+
+
+def describe(site: storytime.Site) -> list[dict[str, Any]]:
+    """Every node's fields, with its stories loaded, to compare trees."""
+    links = {"parent", "registry", "items", "stories", "index", "titles", "kinds"}
+    nodes = []
+    for node in site.iter_nodes():
+        stories = node.stories if isinstance(node, storytime.Subject) else []
+        described = {
+            node_field.name: getattr(node, node_field.name)
+            for node_field in fields(node)
+            if node_field.name not in links
+        }
+        described["registry"] = node.registry is site.registry
+        described["stories"] = [(s.title, s.parser) for s in stories]
+        nodes.append(described)
+    return nodes
+
+
+def test_warm_site_fields(tmp_path: Path) -> None:
+    """Warm and cold nodes have the same fields once loaded."""
+    cold = make_site("examples.minimal", cache_dir=tmp_path)
+    warm = make_site("examples.minimal", cache_dir=tmp_path)
+    heading = warm.find_path(".components.heading")
+    assert isinstance(heading, LazySubject)
+    assert describe(warm) == describe(cold)
+    assert heading.subject_path is not None
+
+
+def test_warm_site_imports_root_only(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A warm build seats unchanged nodes from the cache, importing nothing."""
+    name = f"warm_{tmp_path.name}"
+    package = write_catalog(tmp_path, name, CatalogShape(sections=1, subjects=2))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    cache_dir = tmp_path / "cache"
+    make_site(name, cache_dir=cache_dir)
+    imported: list[str] = []
+    real_import_stories = storytime.import_stories
+
+    def recording_import_stories(
+        stories_path: Path, *args: Any, **kwargs: Any
+    ) -> ModuleType:
+        imported.append(stories_path.parent.name)
+        return real_import_stories(stories_path, *args, **kwargs)
+
+    monkeypatch.setattr("storytime.import_stories", recording_import_stories)
+    monkeypatch.setattr("storytime.lazy.import_stories", recording_import_stories)
+    changed = package / "section0" / "subject1" / "stories.py"
+    changed.write_text(changed.read_text() + "\n")
+    warm = make_site(name, cache_dir=cache_dir)
+    assert sorted(imported) == sorted([name, "subject1"])
+    subject = warm.find_path(".section0.subject0")
+    assert isinstance(subject, LazySubject)
+    assert not subject.is_loaded
+    assert subject.stories
+    assert imported[2:] == ["section0", "subject0"]
+
+
+def test_warm_site_hashes_nothing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Saving a warm cache reuses the fingerprints lookup confirmed."""
+    make_site("examples.minimal", cache_dir=tmp_path)
+    hashed: list[Path] = []
+    real_fingerprint = storytime.cache.fingerprint_file
+
+    def recording_fingerprint(stories_path: Path) -> tuple[int, int, str]:
+        hashed.append(stories_path)
+        return real_fingerprint(stories_path)
+
+    monkeypatch.setattr("storytime.cache.fingerprint_file", recording_fingerprint)
+    make_site("examples.minimal", cache_dir=tmp_path)
+    assert hashed == []
+    cache = ScanCache(cache_dir=tmp_path, target_path="examples.minimal").load()
+    kinds = sorted(str(entry.kind) for entry in cache.entries.values())
+    assert kinds == ["section", "site", "subject"]
+
+
+def test_lookup_touched(tmp_path: Path) -> None:
+    """A new mtime with the same content keeps the entry."""
+    stories_path = tmp_path / "stories.py"
+    stories_path.write_text("x = 1\n")
+    cache = ScanCache(cache_dir=tmp_path, target_path="pkg")
+    cache.entries[str(stories_path)] = make_entry(stories_path)
+    os.utime(stories_path, ns=(1, 1))
+    entry = cache.lookup(stories_path)
+    assert entry is not None
+    assert entry.mtime_ns == 1
+
+
+def test_lookup_changed(tmp_path: Path) -> None:
+    """Changed content invalidates the entry."""
+    stories_path = tmp_path / "stories.py"
+    stories_path.write_text("x = 1\n")
+    cache = ScanCache(cache_dir=tmp_path, target_path="pkg")
+    cache.entries[str(stories_path)] = make_entry(stories_path)
+    stories_path.write_text("x = 22\n")
+    assert cache.lookup(stories_path) is None
+    assert cache.entries == {}
+
+
+def test_stale_cache_file(tmp_path: Path) -> None:
+    """A cache file for another root or version is ignored."""
+    stories_path = tmp_path / "stories.py"
+    stories_path.write_text("x = 1\n")
+    cache = ScanCache(cache_dir=tmp_path, target_path="pkg")
+    cache.entries[str(stories_path)] = make_entry(stories_path)
+    cache.seen.add(str(stories_path))
+    cache.save()
+    assert ScanCache(cache_dir=tmp_path, target_path="pkg").load().entries
+    cache.cache_file.rename(tmp_path / "scan-other.json")
+    other = ScanCache(cache_dir=tmp_path, target_path="other").load()
+    assert other.entries == {}
+
+
+def test_save_prunes_unseen(tmp_path: Path) -> None:
+    """Entries for files which weren't seen in this scan are dropped."""
+    stories_path = tmp_path / "stories.py"
+    stories_path.write_text("x = 1\n")
+    cache = ScanCache(cache_dir=tmp_path, target_path="pkg")
+    cache.entries[str(stories_path)] = make_entry(stories_path)
+    cache.save()
+    assert ScanCache(cache_dir=tmp_path, target_path="pkg").load().entries == {}
@@ -0,0 +1,58 @@
+"""Test the phase timing and trace export."""
+import json
+
+from storytime import make_site
+from storytime.instrument import Recorder
+from storytime.instrument import recording
+from storytime.instrument import Span
+from storytime.instrument import span
+
+
+def test_span_without_recording() -> None:
+    """Spans outside a recording block are not kept anywhere."""
+    with recording() as recorder:
+        pass
+    with span("import", stories="stories.py"):
+        pass
+    assert recorder.spans == []
+
+
+def test_make_site_phases() -> None:
+    """Building a site records each phase and each stories file."""
+    with recording() as recorder:
+        make_site("examples.minimal")
+    phases = recorder.phases()
+    assert phases["glob"][0] == 1
+    assert phases["import"][0] == 3
+    assert phases["factory"][0] == 3
+    assert phases["link"][0] == 1
+    files = recorder.slowest_files()
+    assert len(files) == 3
+    assert all(path.endswith("stories.py") for path, _seconds in files)
+
+
+def test_slowest_files() -> None:
+    """Stories files are ranked by their combined time, slowest first."""
+    recorder = Recorder(origin=0.0)
+    recorder.add(Span("import", 0.0, 1.0, 1, dict(stories="a.py")))
+    recorder.add(Span("factory", 1.0, 2.0, 1, dict(stories="a.py")))
+    recorder.add(Span("import", 3.0, 2.5, 1, dict(stories="b.py")))
+    recorder.add(Span("glob", 0.0, 9.0, 1))
+    assert recorder.slowest_files() == [("a.py", 3.0), ("b.py", 2.5)]
+    assert recorder.slowest_files(limit=1) == [("a.py", 3.0)]
+    assert "a.py" in recorder.report()
+
+
+def test_chrome_trace() -> None:
+    """Spans export as complete events, in microseconds."""
+    recorder = Recorder(origin=10.0)
+    recorder.add(Span("render", 10.5, 0.25, 7, dict(title="Heading")))
+    trace = json.loads(json.dumps(recorder.to_chrome_trace()))
+    (event,) = trace["traceEvents"]
+    assert event["ph"] == "X"
+    assert event["ts"] == 500000.0
+    assert event["dur"] == 250000.0
+    assert event["tid"] == 7
+    assert event["args"] == dict(title="Heading")
+    summary = recorder.to_json()
+    assert summary["phases"] == dict(render=dict(count=1, seconds=0.25))
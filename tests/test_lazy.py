@@ -0,0 +1,148 @@
+"""Load sections and subjects only when they are used."""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import pytest
+
+import storytime
+from storytime.lazy import LazyLoader
+from storytime.lazy import LazySection
+from storytime.lazy import LazySubject
+from storytime.lazy import make_lazy_site
+from storytime.story import Story
+from storytime.synthetic import CatalogShape
+from storytime.synthetic import write_catalog
+
+
+@pytest.fixture
+def imported(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Record the package of each stories file that gets imported."""
+    paths: list[str] = []
+    real_import_stories = storytime.import_stories
+
+    def recording_import_stories(
+        stories_path: Path, *args: Any, **kwargs: Any
+    ) -> ModuleType:
+        paths.append(stories_path.parent.name)
+        return real_import_stories(stories_path, *args, **kwargs)
+
+    monkeypatch.setattr("storytime.import_stories", recording_import_stories)
+    monkeypatch.setattr("storytime.lazy.import_stories", recording_import_stories)
+    return paths
+
+
+def test_startup_imports_root_only(imported: list[str]) -> None:
+    """Only the root stories file is imported to build the tree."""
+    site = make_lazy_site("examples.minimal")
+    assert imported == ["minimal"]
+    heading = site.find_path(".components.heading")
+    assert isinstance(heading, LazySubject)
+    assert heading.title == "Heading"
+    assert not heading.is_loaded
+    assert isinstance(heading.parent, LazySection)
+    assert heading.registry is site.registry
+
+
+def test_lazy_catalog(imported: list[str]) -> None:
+    """A lazy catalog imports only the root of each package at startup."""
+    site = make_lazy_site("a=examples.minimal,b=examples.minimal")
+    assert imported == ["minimal", "minimal"]
+    heading = site.find_path(".b.components.heading")
+    assert isinstance(heading, LazySubject)
+    assert not heading.is_loaded
+    assert heading.stories[0].title == "Default Heading"
+
+
+def test_load_retitles(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A subject loaded under its real title is no longer found by the old one."""
+    name = f"retitled_{tmp_path.name}"
+    write_catalog(tmp_path, name, CatalogShape(sections=1, subjects=1))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    site = make_lazy_site(name)
+    subject = site.find_path(".section0.subject0")
+    assert isinstance(subject, LazySubject)
+    sniffed = subject.title
+    subject.load()
+    assert subject.title != sniffed
+    assert site.find_title(subject.title or "") == [subject]
+    assert site.find_title(sniffed or "") == []
+
+
+def test_first_use_loads(imported: list[str]) -> None:
+    """Asking for the stories imports the section, then the subject."""
+    site = make_lazy_site("examples.minimal")
+    heading = site.find_path(".components.heading")
+    assert isinstance(heading, LazySubject)
+    assert [story.title for story in heading.stories] == ["Default Heading"]
+    assert imported == ["minimal", "components", "heading"]
+    assert heading.is_loaded
+    heading.stories
+    assert len(imported) == 3
+
+
+def test_release_all() -> None:
+    """Released subjects load again on their next use."""
+    loader = LazyLoader()
+    site = make_lazy_site("examples.minimal", loader=loader)
+    heading = site.find_path(".components.heading")
+    assert isinstance(heading, LazySubject)
+    heading.stories
+    assert loader.release_all() == 1
+    assert not heading.is_loaded
+    assert heading.stories[0].title == "Default Heading"
+
+
+def test_max_loaded() -> None:
+    """The least recently used subject is released past the bound."""
+    loader = LazyLoader(max_loaded=1)
+    first, second = LazySubject(title="First"), LazySubject(title="Second")
+    for subject in (first, second):
+        subject.stories = [Story(title="x")]
+        loader.touch(subject)
+    assert not first.is_loaded
+    assert second.is_loaded
+
+
+def test_max_loaded_use_order(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Using loaded stories again keeps them, the unused ones go first."""
+    name = f"used_{tmp_path.name}"
+    write_catalog(tmp_path, name, CatalogShape(sections=1, subjects=3))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    site = make_lazy_site(name, loader=LazyLoader(max_loaded=2))
+    first, second, third = [
+        site.find_path(f".section0.subject{number}") for number in range(3)
+    ]
+    assert isinstance(first, LazySubject)
+    assert isinstance(second, LazySubject)
+    assert isinstance(third, LazySubject)
+    for subject in (first, second, first, third):
+        assert subject.stories
+    assert first.is_loaded
+    assert not second.is_loaded
+    assert third.is_loaded
+
+
+def test_relieve(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Loaded subjects are released only while past the memory bound."""
+    loader = LazyLoader(max_memory=1000)
+    subject = LazySubject(title="Subject")
+    subject.stories = [Story(title="x")]
+    loader.touch(subject)
+    monkeypatch.setattr("storytime.lazy.resident_bytes", lambda: 1000)
+    assert loader.relieve() == 0
+    monkeypatch.setattr("storytime.lazy.resident_bytes", lambda: 1001)
+    assert loader.relieve() == 1
+    assert not subject.is_loaded
+
+
+def test_concurrent_first_use(imported: list[str]) -> None:
+    """Requests racing for an unloaded subject import it only once."""
+    site = make_lazy_site("examples.minimal", loader=LazyLoader())
+    heading = site.find_path(".components.heading")
+    assert isinstance(heading, LazySubject)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        counts = list(executor.map(lambda _: len(heading.stories), range(8)))
+    assert counts == [1] * 8
+    assert imported.count("heading") == 1
@@ -1,4 +1,8 @@
 """Test cases for the __main__ module."""
+import json
+from pathlib import Path
+from typing import Callable
+
 import pytest
 from click.testing import CliRunner
 
@@ -15,3 +19,130 @@ def test_main_succeeds(runner: CliRunner) -> None:
     """It exits with a status code of zero."""
     result = runner.invoke(__main__.main)
     assert result.exit_code == 0
+
+
+def test_scan(runner: CliRunner, tmp_path: Path) -> None:
+    """Scanning writes the cache, and a warm scan gives the same tree."""
+    cache_dir = tmp_path / "cache"
+    args = ["scan", "examples.minimal", "--cache-dir", str(cache_dir)]
+    cold = runner.invoke(__main__.main, args)
+    assert cold.exit_code == 0
+    assert "1 sections, 1 subjects, 1 stories" in cold.output
+    assert (cache_dir / "scan-examples.minimal.json").exists()
+    warm = runner.invoke(__main__.main, args)
+    assert warm.output == cold.output
+
+
+def test_scan_no_cache(runner: CliRunner, tmp_path: Path) -> None:
+    """The cache can be skipped entirely."""
+    cache_dir = tmp_path / "cache"
+    args = ["scan", "examples.minimal", "--no-cache", "--cache-dir", str(cache_dir)]
+    result = runner.invoke(__main__.main, args)
+    assert result.exit_code == 0
+    assert not cache_dir.exists()
+
+
+def test_build(runner: CliRunner, tmp_path: Path) -> None:
+    """The build command writes pages and reports throughput."""
+    outdir = tmp_path / "out"
+    result = runner.invoke(__main__.main, ["build", "examples.minimal", str(outdir)])
+    assert result.exit_code == 0
+    assert "1 pages (1 written, 0 unchanged)" in result.output
+    assert "pages/s" in result.output
+    assert (tmp_path / ".storytime-cache").is_dir()
+
+
+def test_scan_static(runner: CliRunner) -> None:
+    """The tree can be read without importing the stories."""
+    result = runner.invoke(__main__.main, ["scan", "examples.minimal", "--static"])
+    assert result.exit_code == 0
+    assert "Minimal Site: 1 sections, 1 subjects, 1 stories" in result.output
+
+
+def test_scan_profile(runner: CliRunner, tmp_path: Path) -> None:
+    """A profiled scan writes a trace and prints the phases."""
+    profile = tmp_path / "trace.json"
+    args = ["scan", "examples.minimal", "--no-cache", "--profile", str(profile)]
+    result = runner.invoke(__main__.main, args)
+    assert result.exit_code == 0
+    assert "Phases:" in result.output
+    assert "Slowest 20 stories files:" in result.output
+    trace = json.loads(profile.read_text())
+    assert {event["name"] for event in trace["traceEvents"]} >= {"glob", "import"}
+
+
+def test_snapshot(runner: CliRunner, tmp_path: Path) -> None:
+    """Snapshots fail until they are updated, in parallel here."""
+    args = ["snapshot", "examples.minimal", "--snapshot-dir", str(tmp_path)]
+    missing = runner.invoke(__main__.main, args)
+    assert missing.exit_code == 1
+    assert "Missing: components.heading-0" in missing.output
+    update = runner.invoke(
+        __main__.main, args + ["--update-snapshots", "--workers", "2"]
+    )
+    assert update.exit_code == 0
+    assert "1 updated" in update.output
+    result = runner.invoke(__main__.main, args)
+    assert result.exit_code == 0
+    assert "1 matched" in result.output
+
+
+def test_manifest(runner: CliRunner) -> None:
+    """The manifest is printed as one JSON record per line."""
+    args = ["manifest", "examples.minimal", "--metadata-only"]
+    result = runner.invoke(__main__.main, args)
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert {record["kind"] for record in records} == {
+        "Site",
+        "Section",
+        "Subject",
+        "Story",
+    }
+
+
+def test_build_search_index(runner: CliRunner, tmp_path: Path) -> None:
+    """The build can also write the search index."""
+    outdir = tmp_path / "out"
+    args = ["build", "examples.minimal", str(outdir), "--search-index"]
+    result = runner.invoke(__main__.main, args)
+    assert result.exit_code == 0
+    assert (outdir / "search-index.json.gz").exists()
+
+
+def test_build_shards_and_merge(runner: CliRunner, tmp_path: Path) -> None:
+    """Each shard builds its part, and the merge puts them together."""
+    shard_dirs = [str(tmp_path / "one"), str(tmp_path / "two")]
+    for shard, shard_dir in enumerate(shard_dirs, start=1):
+        args = ["build", "examples.minimal", shard_dir, "--shard", f"{shard}/2"]
+        assert runner.invoke(__main__.main, args).exit_code == 0
+    outdir = tmp_path / "site"
+    result = runner.invoke(__main__.main, ["merge", str(outdir), *shard_dirs])
+    assert result.exit_code == 0
+    assert "1 pages from 2 shards" in result.output
+    assert (outdir / "components" / "heading" / "story-0.html").exists()
+    result = runner.invoke(__main__.main, ["merge", str(outdir), shard_dirs[0]])
+    assert result.exit_code == 1
+    assert "expected shards 1 to 2" in result.output
+
+
+def test_build_failures(
+    runner: CliRunner, tmp_path: Path, broken_catalog: Callable[..., str]
+) -> None:
+    """Failed stories are listed after the build, which exits with 1."""
+    name = broken_catalog("template=lambda: 1 / 0 or html(")
+    args = ["build", name, str(tmp_path / "out"), "--timeout", "5", "--report", "3"]
+    result = runner.invoke(__main__.main, args)
+    assert result.exit_code == 1
+    assert "2 pages (1 written, 0 unchanged, 1 failed)" in result.output
+    assert ".section0.subject0 0 (Story 0): ZeroDivisionError" in result.output
+    assert "Slowest 3 stories:" in result.output
+    assert "Heaviest 3 stories:" in result.output
+
+
+def test_build_bad_shard(runner: CliRunner, tmp_path: Path) -> None:
+    """A shard outside the number of shards is a usage error."""
+    args = ["build", "examples.minimal", str(tmp_path), "--shard", "3/2"]
+    result = runner.invoke(__main__.main, args)
+    assert result.exit_code == 2
+    assert "shard must be I/N" in result.output
@@ -0,0 +1,37 @@
+"""Stream the structure of a catalog as records."""
+from storytime import make_site
+from storytime.manifest import iter_manifest
+from storytime.manifest import site_manifest
+
+
+def test_iter_manifest() -> None:
+    """Every node and story gets a record, with its place in the tree."""
+    records = {(r["kind"], r["path"]): r for r in iter_manifest("examples.minimal")}
+    assert set(records) == {
+        ("Site", "."),
+        ("Section", ".components"),
+        ("Subject", ".components.heading"),
+        ("Story", ".components.heading"),
+    }
+    assert records[("Section", ".components")]["parent"] == "."
+    story = records[("Story", ".components.heading")]
+    assert story["title"] == "Default Heading"
+    assert story["index"] == 0
+    assert len(story["sha"]) == 64
+
+
+def test_metadata_only() -> None:
+    """Without importing, the records match apart from rendering hashes."""
+    full = list(iter_manifest("examples.minimal"))
+    for record in full:
+        record.pop("sha", None)
+    assert list(iter_manifest("examples.minimal", metadata_only=True)) == full
+
+
+def test_site_manifest() -> None:
+    """A linked site gives the same records, in tree order."""
+    records = list(site_manifest(make_site("examples.minimal")))
+    assert [r["kind"] for r in records] == ["Site", "Section", "Subject", "Story"]
+    assert sorted(map(str, records)) == sorted(
+        map(str, iter_manifest("examples.minimal"))
+    )
@@ -0,0 +1,72 @@
+"""Keep the tree's nodes and stories small."""
+import gc
+import pickle  # noqa: S403
+import sys
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Optional
+
+from viewdom.render import html
+
+from storytime import make_site
+from storytime import Section
+from storytime import Subject
+from storytime import TreeNode
+from storytime.memory import footprint
+from storytime.memory import slotted
+from storytime.story import Story
+
+
+def test_slotted() -> None:
+    """Slotted dataclasses keep their behavior, minus the ``__dict__``."""
+
+    @dataclass()
+    class Plain:
+        name: str
+        label: Optional[str] = None
+        count: int = field(default=0, init=False)
+
+    compact = slotted(Plain)
+    this = compact("a", label="b")
+    assert not hasattr(this, "__dict__")
+    assert (this.name, this.label, this.count) == ("a", "b", 0)
+    assert this == compact("a", label="b")
+    assert repr(this).endswith("Plain(name='a', label='b', count=0)")
+    assert footprint([this]) < footprint([Plain("a", label="b")])
+
+
+def test_nodes_have_no_dict() -> None:
+    """Nodes and stories of a site use slots."""
+    site = make_site("examples.minimal")
+    for node in site.index.values():
+        assert not hasattr(node, "__dict__")
+    subject = site.find_path(".components.heading")
+    assert isinstance(subject, Subject)
+    assert not hasattr(subject.stories[0], "__dict__")
+
+
+def test_paths_interned() -> None:
+    """Each dotted path is one string, however many nodes refer to it."""
+    site = make_site("examples.minimal")
+    subject = site.find_path(".components.heading")
+    assert isinstance(subject, Subject)
+    assert isinstance(subject.parent, Section)
+    assert subject.package_path is sys.intern(".components.heading")
+    assert subject.parent.package_path is sys.intern(".components")
+
+
+def test_no_tree_nodes_retained() -> None:
+    """Once the site is linked, the scan's tree nodes can be collected."""
+    site = make_site("examples.minimal")
+    gc.collect()
+    assert site.find_path(".components") is not None
+    assert not [obj for obj in gc.get_objects() if isinstance(obj, TreeNode)]
+
+
+def test_story_pickles() -> None:
+    """A frozen slotted story survives pickling, with its cached markup."""
+    story = Story(title="Hello", template=html("<div>Hello</div>"))
+    assert story.rendered == "<div>Hello</div>"
+    copy = pickle.loads(pickle.dumps(story))  # noqa: S301
+    assert copy == story
+    assert copy.rendered == "<div>Hello</div>"
@@ -0,0 +1,88 @@
+"""Render pages in a pool of warm worker processes."""
+import time
+from typing import Callable
+
+import pytest
+
+from storytime.pool import rss_bytes
+from storytime.pool import WorkerPool
+
+HEADING = (".components.heading", 0)
+
+
+def test_render() -> None:
+    """Workers render pages, and unknown stories are ``None``."""
+    with WorkerPool("examples.minimal", workers=2) as pool:
+        page = pool.render(HEADING, timeout=30)
+        assert page is not None
+        assert b"<title>Default Heading</title>" in page
+        assert pool.render((".components.heading", 9), timeout=30) is None
+
+
+def test_recycle_after_renders() -> None:
+    """A worker is replaced after its quota of renders."""
+    with WorkerPool("examples.minimal", workers=1, max_renders=1) as pool:
+        for _render in range(3):
+            assert pool.render(HEADING, timeout=30) is not None
+    assert pool.recycled >= 2
+
+
+def test_recycle_over_rss() -> None:
+    """A worker past its memory limit is replaced after its render."""
+    with WorkerPool("examples.minimal", workers=1, max_rss=1) as pool:
+        pool.render(HEADING, timeout=30)
+        pool.refresh()
+        assert pool.render(HEADING, timeout=30) is not None
+    assert pool.recycled >= 1
+
+
+def test_render_error(broken_catalog: Callable[..., str]) -> None:
+    """A failed render is raised in the caller."""
+    name = broken_catalog("template=lambda: 1 / 0 or html(")
+    with WorkerPool(name, workers=1) as pool:
+        with pytest.raises(RuntimeError, match="ZeroDivisionError"):
+            pool.render((".section0.subject0", 0), timeout=30)
+
+
+def test_worker_dies(broken_catalog: Callable[..., str]) -> None:
+    """A worker killed mid-render fails its request and is replaced."""
+    exit_template = "template=lambda: __import__('os')._exit(9) or html("
+    name = broken_catalog(exit_template, stories=2, count=1)
+    with WorkerPool(name, workers=1) as pool:
+        with pytest.raises(RuntimeError, match="exit code 9"):
+            pool.render((".section0.subject0", 0), timeout=30)
+        assert pool.render((".section0.subject0", 1), timeout=30) is not None
+        assert pool.crashed == 1
+
+
+def test_workers_fail_to_start(broken_catalog: Callable[..., str]) -> None:
+    """Workers which can't import the catalog fail requests, then give up."""
+    name = broken_catalog("template=1 / 0 or html(")
+    with WorkerPool(name, workers=1, max_start_failures=2) as pool:
+        with pytest.raises(RuntimeError, match="failed to start"):
+            pool.render((".section0.subject0", 0), timeout=30)
+        deadline = time.monotonic() + 30
+        while pool.broken is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.broken is not None
+        with pytest.raises(RuntimeError, match="2 times in a row"):
+            pool.render((".section0.subject0", 0), timeout=30)
+        assert not pool.members
+    assert pool.crashed == 2
+
+
+def test_idle_worker_killed() -> None:
+    """A worker killed while idle is replaced, and the pool keeps working."""
+    with WorkerPool("examples.minimal", workers=1) as pool:
+        assert pool.render(HEADING, timeout=30) is not None
+        [worker] = pool.members.values()
+        assert worker.ready
+        worker.process.kill()
+        worker.process.join()
+        assert pool.render(HEADING, timeout=30) is not None
+    assert pool.crashed == 1
+
+
+def test_rss_bytes() -> None:
+    """The peak RSS is measured in bytes."""
+    assert rss_bytes() > 1024 * 1024
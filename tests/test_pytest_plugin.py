@@ -0,0 +1,54 @@
+"""Collect every story of a catalog as a test."""
+import pytest
+
+from storytime.build import story_id
+from storytime.pytest_plugin import in_shard
+from storytime.pytest_plugin import shard_option
+
+pytest_plugins = ["pytester"]
+
+STORY_TEST = """
+def test_story(story):
+    assert story.title == "Default Heading"
+
+def test_site(storytime_site):
+    assert storytime_site.title == "Minimal Site"
+"""
+
+
+def test_shard_option() -> None:
+    """Shards count from 1, and a bad one is a usage error."""
+    assert shard_option(None) == (1, 1)
+    assert shard_option("2/4") == (2, 4)
+    for bad in ("0/4", "5/4", "x/4", "2"):
+        with pytest.raises(pytest.UsageError, match="--storytime-shard"):
+            shard_option(bad)
+
+
+def test_shards_partition() -> None:
+    """Every story lands in exactly one shard."""
+    ids = [story_id(f".section.subject{i}", i % 3) for i in range(200)]
+    counts = [sum(in_shard(i, shard, 4) for i in ids) for shard in (1, 2, 3, 4)]
+    assert sum(counts) == len(ids)
+    assert min(counts) > 25
+
+
+def test_story_fixture(pytester: pytest.Pytester) -> None:
+    """Tests asking for ``story`` run once per story, with stable IDs."""
+    pytester.makepyfile(STORY_TEST)
+    result = pytester.runpytest_inprocess(
+        "-p", "storytime.pytest_plugin", "--storytime-package", "examples.minimal", "-v"
+    )
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(["*test_story?components.heading-0? PASSED*"])
+
+
+def test_story_shard(pytester: pytest.Pytester) -> None:
+    """Stories outside the shard aren't collected."""
+    pytester.makepyfile(STORY_TEST)
+    args = ["-p", "storytime.pytest_plugin", "--storytime-package", "examples.minimal"]
+    shards = [
+        pytester.runpytest_inprocess(*args, f"--storytime-shard={i}/2").parseoutcomes()
+        for i in (1, 2)
+    ]
+    assert sum(outcome.get("passed", 0) for outcome in shards) == 3
@@ -0,0 +1,123 @@
+"""Search the catalog's stories by their words."""
+from pathlib import Path
+
+from viewdom.render import html
+
+from storytime import make_site
+from storytime import Site
+from storytime import Subject
+from storytime.budget import RenderLedger
+from storytime.build import build_site
+from storytime.build import iter_stories
+from storytime.search import IndexedStory
+from storytime.search import search_document
+from storytime.search import SEARCH_INDEX_NAME
+from storytime.search import SearchIndex
+from storytime.search import tokenize
+from storytime.search import write_search_index
+from storytime.story import Story
+
+HEADING = ".components.heading"
+
+
+def heading_subject(index: SearchIndex) -> Subject:
+    """Index the minimal example and return its one subject."""
+    site = make_site("examples.minimal")
+    index.update(site)
+    subject = site.find_path(HEADING)
+    assert isinstance(subject, Subject)
+    return subject
+
+
+def test_tokenize() -> None:
+    """Words are lowercased, and punctuation splits them."""
+    assert tokenize("Default Heading, .components.heading") == {
+        "default",
+        "heading",
+        "components",
+    }
+
+
+def test_search() -> None:
+    """Titles and package paths are searchable, by word prefix."""
+    index = SearchIndex()
+    heading_subject(index)
+    assert index.search("heading") == ["components.heading-0"]
+    assert index.search("DEF head") == ["components.heading-0"]
+    assert index.search("heading missing") == []
+    assert index.search("") == []
+
+
+def test_incremental_update() -> None:
+    """Only changed stories are indexed again, and gone ones are removed."""
+    index = SearchIndex()
+    subject = heading_subject(index)
+    site = subject.site
+    assert index.update(site) == 0
+    subject.stories = [
+        subject.stories[0],
+        Story(title="Large", template=html("<h1>Welcome aboard</h1>")),
+    ]
+    assert index.update(site, [HEADING]) == 1
+    assert index.search("aboard") == ["components.heading-1"]
+    subject.stories = subject.stories[:1]
+    assert index.update(site, [HEADING]) == 0
+    assert index.search("aboard") == []
+    assert "aboard" not in index.postings
+    assert "aboard" not in index.vocabulary
+
+
+def test_no_dom_kept() -> None:
+    """Indexing parses a throwaway tree, not the story's own."""
+    index = SearchIndex()
+    subject = heading_subject(index)
+    assert index.search("default") == ["components.heading-0"]
+    assert subject.stories[0]._html is None
+
+
+def test_parallel_build_documents(tmp_path: Path) -> None:
+    """The build's workers take the documents, so indexing renders nothing."""
+    ledger = RenderLedger()
+    rendered: list[bool] = []
+
+    def stage(site: Site, outdir: Path) -> None:
+        write_search_index(site, outdir, documents=ledger.documents)
+        rendered.extend(s._rendered is not None for _, _, s in iter_stories(site))
+
+    build_site(
+        "examples.minimal",
+        tmp_path,
+        workers=2,
+        stages=[stage],
+        ledger=ledger,
+        documenter=search_document,
+    )
+    assert list(ledger.documents) == ["components.heading-0"]
+    assert rendered == [False]
+    index = SearchIndex.load(tmp_path / SEARCH_INDEX_NAME)
+    assert index.search("default heading") == ["components.heading-0"]
+
+
+def test_vocabulary_kept() -> None:
+    """The sorted words are kept between queries, until a word is added."""
+    index = SearchIndex()
+    heading_subject(index)
+    vocabulary = index.vocabulary
+    assert vocabulary == sorted(index.postings)
+    index.search("head")
+    assert index.vocabulary is vocabulary
+    entry = IndexedStory(HEADING, 9, "Other", "")
+    index.add("components.heading-9", entry, ["heading"])
+    assert index.vocabulary is vocabulary
+    index.add("components.heading-9", entry, ["zebra"])
+    assert index.vocabulary[-1] == "zebra"
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    """The index survives a round trip through its compressed file."""
+    site = make_site("examples.minimal")
+    write_search_index(site, tmp_path)
+    index = SearchIndex.load(tmp_path / SEARCH_INDEX_NAME)
+    assert index.search("heading") == ["components.heading-0"]
+    assert index.update(site) == 0
+    assert SearchIndex.load(tmp_path / "missing.json.gz").stories == {}
@@ -0,0 +1,191 @@
+"""Serve cached story pages with entity tags."""
+import gzip
+import json
+import threading
+from http import HTTPStatus
+from typing import Any
+from urllib.error import HTTPError
+from urllib.request import Request
+from urllib.request import urlopen
+
+import pytest
+
+from storytime import make_site
+from storytime.build import render_page
+from storytime.lazy import make_lazy_site
+from storytime.pool import WorkerPool
+from storytime.server import accepts_gzip
+from storytime.server import etag_matches
+from storytime.server import make_server
+from storytime.server import RenderCache
+from storytime.server import StoryApp
+from storytime.watch import make_watcher
+from storytime.watch import Watcher
+
+HEADING = "/components/heading/story-0.html"
+
+
+@pytest.fixture
+def app() -> StoryApp:
+    """An app for the minimal example."""
+    watcher = Watcher("examples.minimal", make_site("examples.minimal"))
+    return StoryApp(watcher=watcher)
+
+
+@pytest.fixture
+def renders(monkeypatch: pytest.MonkeyPatch) -> list[Any]:
+    """Record each story that actually gets rendered."""
+    rendered: list[Any] = []
+
+    def counting_render_page(story: Any, site: Any = None) -> bytes:
+        rendered.append(story)
+        return render_page(story, site)
+
+    monkeypatch.setattr("storytime.server.render_page", counting_render_page)
+    return rendered
+
+
+def test_render_under_lock(app: StoryApp, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Pages render while the watcher can't patch the tree."""
+    locked: list[bool] = []
+
+    def checking_render_page(story: Any, site: Any = None) -> bytes:
+        locked.append(app.lock.locked())
+        return render_page(story, site)
+
+    monkeypatch.setattr("storytime.server.render_page", checking_render_page)
+    assert app.respond(HEADING)[0] == HTTPStatus.OK
+    assert locked == [True]
+
+
+def test_render_cache_lru() -> None:
+    """The least recently used page is evicted first."""
+    cache = RenderCache(maxsize=2)
+    a, b, c = ((".a", 0), "x"), ((".b", 0), "x"), ((".c", 0), "x")
+    cache.put(a, b"a")
+    cache.put(b, b"b")
+    assert cache.get(a) is not None
+    cache.put(c, b"c")
+    assert cache.get(b) is None
+    assert cache.get(a) is not None
+    cache.invalidate([".a"])
+    assert cache.get(a) is None
+
+
+def test_etag_matches() -> None:
+    """A client's list of tags, or a wildcard, can match."""
+    assert not etag_matches(None, '"a"')
+    assert etag_matches('"b", "a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+
+
+def test_respond(app: StoryApp, renders: list[Any]) -> None:
+    """Pages render once and revalidate with a 304."""
+    status, headers, body = app.respond(HEADING)
+    assert status == HTTPStatus.OK
+    assert b"Default Heading" in body
+    etag = headers["ETag"]
+    status, headers, body = app.respond(HEADING, if_none_match=etag)
+    assert status == HTTPStatus.NOT_MODIFIED
+    assert body == b""
+    assert headers["ETag"] == etag
+    assert len(renders) == 1
+
+
+def test_accepts_gzip() -> None:
+    """Gzip is accepted unless it's missing or has a zero quality."""
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, gzip;q=0.8")
+    assert accepts_gzip("*")
+    assert not accepts_gzip(None)
+    assert not accepts_gzip("br")
+    assert not accepts_gzip("gzip;q=0")
+
+
+def test_respond_gzip(app: StoryApp, renders: list[Any]) -> None:
+    """The page is gzipped once, with its own entity tag."""
+    _status, plain, _body = app.respond(HEADING)
+    status, headers, body = app.respond(HEADING, accept_encoding="gzip")
+    assert status == HTTPStatus.OK
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["Vary"] == "Accept-Encoding"
+    assert headers["ETag"] != plain["ETag"]
+    assert b"Default Heading" in gzip.decompress(body)
+    etag = headers["ETag"]
+    again = app.respond(HEADING, if_none_match=etag, accept_encoding="gzip")
+    assert again[0] == HTTPStatus.NOT_MODIFIED
+    assert len(renders) == 1
+
+
+def test_not_found(app: StoryApp) -> None:
+    """Unknown paths and story indexes are a 404."""
+    assert app.respond("/")[0] == HTTPStatus.NOT_FOUND
+    assert app.respond("/components/heading/story-9.html")[0] == 404
+    assert app.respond("/components/story-0.html")[0] == 404
+
+
+def test_source_change_renders_again(app: StoryApp, renders: list[Any]) -> None:
+    """A new source mtime is a new fingerprint, so a cache miss."""
+    app.respond(HEADING)
+    assert isinstance(app.watcher, Watcher)
+    graph = app.watcher.graph
+    stories_path = graph.root_path / "components" / "heading" / "stories.py"
+    app.watcher.mtimes[stories_path] += 1
+    app.respond(HEADING)
+    assert len(renders) == 2
+
+
+def test_lazy_catalog(renders: list[Any]) -> None:
+    """A lazy catalog is served, with a fingerprint for each mount's sources."""
+    target = "examples.minimal,examples.no_sections"
+    site = make_lazy_site(target)
+    app = StoryApp(watcher=make_watcher(target, site))
+    page = "/examples_minimal" + HEADING
+    status, _headers, body = app.respond(page)
+    assert status == HTTPStatus.OK
+    assert b"Default Heading" in body
+    assert app.respond(page)[0] == HTTPStatus.OK
+    assert len(renders) == 1
+    assert app.watcher.stamps(".examples_minimal.components.heading")
+    assert app.refresh() == []
+
+
+def test_search(app: StoryApp) -> None:
+    """Searching answers with JSON, linking to each page."""
+    status, headers, body = app.respond("/search?q=head")
+    assert status == HTTPStatus.OK
+    assert headers["Content-Type"] == "application/json"
+    (result,) = json.loads(body)
+    assert result["url"] == HEADING
+    assert app.search_index is not None
+    assert app.refresh() == []
+
+
+def test_pool(app: StoryApp) -> None:
+    """Cache misses can be rendered by warm worker processes."""
+    with WorkerPool("examples.minimal", workers=1) as pool:
+        app.pool = pool
+        status, _headers, body = app.respond(HEADING)
+        assert status == HTTPStatus.OK
+        assert b"Default Heading" in body
+        assert app.respond("/components/heading/story-9.html")[0] == 404
+
+
+def test_server(app: StoryApp) -> None:
+    """A real HTTP round trip, including the conditional request."""
+    server = make_server(app, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}{HEADING}"
+    try:
+        with urlopen(url) as response:  # noqa: S310
+            etag = response.headers["ETag"]
+            assert b"Default Heading" in response.read()
+        request = Request(url, headers={"If-None-Match": etag})  # noqa: S310
+        with pytest.raises(HTTPError) as exc_info:
+            urlopen(request)  # noqa: S310
+        assert exc_info.value.code == HTTPStatus.NOT_MODIFIED
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,111 @@
+"""Split a build into shards, then merge them into one site."""
+import os
+from pathlib import Path
+
+import pytest
+
+from storytime import make_site
+from storytime.assets import ASSET_MANIFEST_NAME
+from storytime.search import SEARCH_INDEX_NAME
+from storytime.search import SearchIndex
+from storytime.shard import build_shard
+from storytime.shard import BuildManifest
+from storytime.shard import COSTS_NAME
+from storytime.shard import load_costs
+from storytime.shard import MANIFEST_NAME
+from storytime.shard import merge_shards
+from storytime.shard import parse_shard
+from storytime.shard import plan_digest
+from storytime.shard import plan_shards
+from storytime.synthetic import CatalogShape
+from storytime.synthetic import write_catalog
+
+
+@pytest.fixture
+def catalog(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    """A synthetic catalog with six subjects of two stories each."""
+    name = f"sharded_{tmp_path.name}"
+    write_catalog(tmp_path, name, CatalogShape(sections=2, subjects=3, stories=2))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return name
+
+
+def test_parse_shard() -> None:
+    """Shards count from 1, up to the number of shards."""
+    assert parse_shard("2/4") == (2, 4)
+    for value in ("0/4", "5/4", "2", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_plan_by_story_count(catalog: str) -> None:
+    """Without costs, subjects spread evenly, and the plan is stable."""
+    site = make_site(catalog)
+    plan = plan_shards(site, 3)
+    assert len(plan) == 6
+    assert sorted(plan.values()) == [1, 1, 2, 2, 3, 3]
+    assert plan_digest(plan_shards(make_site(catalog), 3)) == plan_digest(plan)
+
+
+def test_plan_by_cost(catalog: str) -> None:
+    """A slow subject gets a shard to itself."""
+    site = make_site(catalog)
+    costs = {f"section{i}.subject{j}-0": 0.1 for i in (0, 1) for j in (0, 1, 2)}
+    costs["section0.subject0-0"] = 10.0
+    plan = plan_shards(site, 2, costs)
+    slow = plan[".section0.subject0"]
+    assert [path for path, shard in plan.items() if shard == slow] == [
+        ".section0.subject0"
+    ]
+
+
+def test_build_and_merge(catalog: str, tmp_path: Path) -> None:
+    """Shards build their own pages, and merge into the whole site."""
+    shard_dirs = [tmp_path / f"shard{shard}" for shard in (1, 2)]
+    reports = [
+        build_shard(catalog, shard_dir, shard, 2, search_index=True)
+        for shard, shard_dir in enumerate(shard_dirs, start=1)
+    ]
+    assert [report.pages for report in reports] == [6, 6]
+    partial = BuildManifest.load(shard_dirs[0] / MANIFEST_NAME)
+    assert (partial.shard, partial.shards, len(partial.pages)) == (1, 2, 6)
+    (shard_dirs[0] / "style.css").write_text("body {}")
+    (shard_dirs[1] / "style.css").write_text("body {}")
+
+    outdir = tmp_path / "site"
+    report = merge_shards(list(reversed(shard_dirs)), outdir)
+    assert (report.shards, report.pages, report.files) == (2, 12, 13)
+    assert (outdir / "section1" / "subject2" / "story-1.html").exists()
+    merged = BuildManifest.load(outdir / MANIFEST_NAME)
+    assert len(merged.pages) == 12
+    assert merged.tree == partial.tree
+    assert set(load_costs(outdir / COSTS_NAME)) == set(merged.pages)
+    index = SearchIndex.load(outdir / SEARCH_INDEX_NAME)
+    assert len(index.stories) == 12
+
+
+def test_merge_assets_from_other_machines(catalog: str, tmp_path: Path) -> None:
+    """Static files checked out at other times still merge."""
+    style = tmp_path / catalog / "static" / "style.css"
+    style.parent.mkdir()
+    style.write_text("body { color: black; }\n")
+    shard_dirs = [tmp_path / f"shard{shard}" for shard in (1, 2)]
+    for shard, shard_dir in enumerate(shard_dirs, start=1):
+        os.utime(style, ns=(shard, shard))
+        build_shard(catalog, shard_dir, shard, 2, cache_dir=tmp_path / f"c{shard}")
+    report = merge_shards(shard_dirs, tmp_path / "site")
+    assert report.pages == 12
+    assert (tmp_path / "site" / ASSET_MANIFEST_NAME).exists()
+
+
+def test_merge_rejects_bad_shards(catalog: str, tmp_path: Path) -> None:
+    """Missing shards and conflicting assets stop the merge."""
+    one, two = tmp_path / "one", tmp_path / "two"
+    build_shard(catalog, one, 1, 2)
+    with pytest.raises(ValueError, match="expected shards 1 to 2"):
+        merge_shards([one], tmp_path / "site")
+    build_shard(catalog, two, 2, 2)
+    (one / "style.css").write_text("body {}")
+    (two / "style.css").write_text("p {}")
+    with pytest.raises(ValueError, match="style.css differs"):
+        merge_shards([one, two], tmp_path / "site")
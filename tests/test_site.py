@@ -1,14 +1,30 @@
 """The ``Site`` is the top of the Storytime catalog."""
+import asyncio
+import sys
+from importlib import import_module
+from importlib.resources import files
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Awaitable
+from typing import Callable
 
 import pytest
+from viewdom.render import html
+from viewdom.render import VDOM
 
 from storytime import get_certain_callable
+from storytime import get_tree_paths
 from storytime import import_stories
+from storytime import link_site
+from storytime import make_catalog
 from storytime import make_site
+from storytime import parse_mounts
+from storytime import scan_tree_nodes
 from storytime import Section
 from storytime import Site
+from storytime import Subject
 from storytime import TreeNode
+from storytime.story import Story
 
 
 @pytest.fixture(scope="session")
@@ -65,6 +81,7 @@ def test_make_site(minimal_site: Site) -> None:
         assert found_components.title == "Components"
 
     heading = components.items["heading"]
+    assert isinstance(heading, Subject)
     assert heading.parent is components
     assert heading.name == "heading"
     assert heading.package_path == ".components.heading"
@@ -77,6 +94,7 @@ def test_make_site(minimal_site: Site) -> None:
 def test_stories(minimal_site: Site) -> None:
     """Grab a subject and get its list of stories."""
     heading = minimal_site.items["components"].items["heading"]
+    assert isinstance(heading, Subject)
     stories = heading.stories
     first_story = stories[0]
     assert first_story.title == "Default Heading"
@@ -89,6 +107,9 @@ def test_import_stories_success() -> None:
     stories_path = Path(stories.__file__)
     module = import_stories(stories_path)
     assert module.__name__ == "stories.py"
+    assert module is not stories
+    name = "examples.minimal.components.stories"
+    assert import_stories(stories_path, name) is stories
 
 
 def test_get_certain_callable() -> None:
@@ -106,3 +127,264 @@ def test_no_callable() -> None:
 
     section = get_certain_callable(stories)
     assert section is None
+
+
+def test_make_site_parallel(minimal_site: Site) -> None:
+    """Discovering stories with a thread pool gives the same tree."""
+    parallel_site = make_site("examples.minimal", workers=4)
+    assert parallel_site.title == minimal_site.title
+    assert list(parallel_site.items) == list(minimal_site.items)
+    components = parallel_site.items["components"]
+    assert components.parent is parallel_site
+    assert components.registry is parallel_site.registry
+    assert list(components.items) == ["heading"]
+    heading = components.items["heading"]
+    assert isinstance(heading, Subject)
+    assert heading.parent is components
+    assert heading.package_path == ".components.heading"
+    assert heading.stories[0].title == "Default Heading"
+
+
+def test_parser_inherited() -> None:
+    """A site's parser choice reaches the stories without their own."""
+    site = Site(parser="lxml")
+    site.package_path = "."
+    section = Section()
+    section.name = "components"
+    section.package_path = ".components"
+    section.parent = site
+    section.parser = site.parser
+    own = Story(title="Own", parser="html.parser")
+    subject = Subject(stories=[Story(title="Default"), own])
+    tree_node = SimpleNamespace(name="heading", package_path=".components.heading")
+    subject.post_update(parent=section, tree_node=tree_node)  # type: ignore
+    assert subject.parser == "lxml"
+    assert subject.stories[0].parser == "lxml"
+    assert subject.stories[1] is own
+
+
+def test_path_index(minimal_site: Site) -> None:
+    """Every linked node is indexed by its package path."""
+    assert list(minimal_site.index) == [".", ".components", ".components.heading"]
+    assert minimal_site.find_path(".") is minimal_site
+    assert minimal_site.find_path(".nowhere") is None
+
+
+def test_reverse_lookups(minimal_site: Site) -> None:
+    """Nodes can be found by title, by kind, and stories by index."""
+    heading = minimal_site.find_path(".components.heading")
+    assert minimal_site.find_title("Heading") == [heading]
+    assert minimal_site.find_title("Nope") == []
+    assert minimal_site.find_kind(Subject) == [heading]
+    assert minimal_site.find_kind(Site) == [minimal_site]
+    story = minimal_site.find_story(".components.heading", 0)
+    assert story is not None
+    assert story.title == "Default Heading"
+    assert minimal_site.find_story(".components.heading", 1) is None
+    assert minimal_site.find_story(".components", 0) is None
+
+
+def test_register_retitled() -> None:
+    """A node retitled before registering again is only under its new title."""
+    site = make_site("examples.minimal")
+    heading = site.find_path(".components.heading")
+    assert isinstance(heading, Subject)
+    heading.title = "Renamed"
+    site.register(heading)
+    assert site.find_title("Heading") == []
+    assert site.find_title("Renamed") == [heading]
+    site.unregister(".components.heading")
+    assert site.find_title("Renamed") == []
+
+
+def test_unregister() -> None:
+    """Dropping a node also drops everything below it."""
+    site = make_site("examples.minimal")
+    site.unregister(".components")
+    assert list(site.index) == ["."]
+    assert site.find_kind(Subject) == []
+    assert site.find_title("Components") == []
+
+
+def test_parse_mounts() -> None:
+    """Each package is mounted at its given name, or its dotted name."""
+    mounts = parse_mounts("examples.minimal, nos=examples.no_sections")
+    assert mounts == [
+        ("examples_minimal", "examples.minimal"),
+        ("nos", "examples.no_sections"),
+    ]
+    with pytest.raises(ValueError, match="Two packages"):
+        parse_mounts("a=examples.minimal,a=examples.no_sections")
+    with pytest.raises(ValueError, match="Can't mount"):
+        parse_mounts("a.b=examples.minimal")
+
+
+def test_make_catalog() -> None:
+    """Several packages share one tree and one path index."""
+    site = make_site("a=examples.minimal,b=examples.minimal")
+    assert list(site.index) == [
+        ".",
+        ".a",
+        ".a.components",
+        ".a.components.heading",
+        ".b",
+        ".b.components",
+        ".b.components.heading",
+    ]
+    mounted = site.find_path(".b")
+    assert isinstance(mounted, Section)
+    assert mounted.title == "Minimal Site"
+    assert mounted.parent is site
+    story = site.find_story(".b.components.heading", 0)
+    assert story is not None
+    assert story.title == "Default Heading"
+
+
+def test_make_catalog_registry() -> None:
+    """Each package keeps its own registry, unless they share the site's."""
+    own = make_catalog([("a", "examples.minimal")])
+    mounted = own.find_path(".a")
+    assert mounted is not None
+    assert mounted.registry is not own.registry
+    assert mounted.registry is not None
+    shared = make_catalog([("a", "examples.minimal")], share_registry=True)
+    heading = shared.find_path(".a.components.heading")
+    assert heading is not None
+    assert heading.registry is shared.registry
+
+
+def test_iter_nodes(minimal_site: Site) -> None:
+    """The tree is walked depth first, from the site down."""
+    paths = [node.package_path for node in minimal_site.iter_nodes()]
+    assert paths == [".", ".components", ".components.heading"]
+
+
+def test_arender_all() -> None:
+    """Async stories render concurrently, up to the limit."""
+    site = make_site("examples.minimal")
+    subject = site.find_path(".components.heading")
+    assert isinstance(subject, Subject)
+    running: list[int] = []
+    peaks: list[int] = []
+
+    def make_template(label: str) -> Callable[[], Awaitable[VDOM]]:
+        async def template() -> VDOM:
+            running.append(1)
+            peaks.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            return html(f"<p>{label}</p>")
+
+        return template
+
+    subject.stories = [
+        Story(title=str(i), template=make_template(str(i))) for i in range(6)
+    ]
+    rendered = asyncio.run(site.arender_all(concurrency=3))
+    assert rendered[(".components.heading", 5)] == "<p>5</p>"
+    assert max(peaks) == 3
+    assert subject.stories[0].rendered == "<p>0</p>"
+
+
+NESTED = {
+    "stories.py": "Site(title='Nested')",
+    "a/stories.py": "Section(title='A')",
+    "a/b/stories.py": "Section(title='B')",
+    "a/b/c/stories.py": "Subject(title='C', stories=[Story(title='Deep')])",
+    "a/b/c/d/stories.py": "Subject(title='Under a subject')",
+    "x/y/stories.py": "Subject(title='No parent')",
+    "z/stories.py": "Subject(title='In the site')",
+}
+
+
+@pytest.fixture
+def nested(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    """A catalog with sections inside sections, and some misplaced nodes."""
+    name = f"nested_{tmp_path.name}"
+    for relative, factory in NESTED.items():
+        stories_path = tmp_path / name / relative
+        kind = factory.partition("(")[0]
+        stories_path.parent.mkdir(parents=True, exist_ok=True)
+        (stories_path.parent / "__init__.py").write_text("")
+        stories_path.write_text(
+            f"from storytime import {kind}\n"
+            "from storytime.story import Story\n\n\n"
+            f"def factory() -> {kind}:\n"
+            f"    return {factory}\n"
+        )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return name
+
+
+def test_nested_tree_paths(nested: str) -> None:
+    """Parent paths are dotted at any depth."""
+    stories_path = Path(str(files(nested))) / "a" / "b" / "c" / "stories.py"
+    assert get_tree_paths(nested, stories_path) == ("c", ".a.b.c", ".a.b")
+
+
+def test_nested_sections(nested: str) -> None:
+    """Sections nest to any depth, and misplaced nodes are left out."""
+    site = make_site(nested)
+    section_b = site.items["a"].items["b"]
+    assert isinstance(section_b, Section)
+    subject = section_b.items["c"]
+    assert isinstance(subject, Subject)
+    assert subject.site is site
+    assert subject.stories[0].title == "Deep"
+    assert site.find_path(".a.b.c") is subject
+    assert [n.package_path for n in site.iter_nodes()] == [
+        ".",
+        ".a",
+        ".a.b",
+        ".a.b.c",
+    ]
+    assert [n.title for n in site.find_kind(Section)] == ["A", "B"]
+
+
+def test_link_site_order(nested: str) -> None:
+    """Linking doesn't depend on the order of the tree nodes."""
+    tree_nodes = scan_tree_nodes(nested)
+    forward = link_site(tree_nodes)
+    backward = link_site(scan_tree_nodes(nested)[::-1])
+    assert list(forward.index) == list(backward.index)
+
+
+@pytest.fixture
+def counted(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    """A catalog whose stories file counts how often it is executed."""
+    name = f"counted_{tmp_path.name}"
+    root = tmp_path / name
+    root.mkdir()
+    (root / "__init__.py").write_text("")
+    (root / "runs.py").write_text("RUNS: list[int] = []\n")
+    (root / "stories.py").write_text(
+        f"from {name}.runs import RUNS\n"
+        "from storytime import Site\n\n"
+        "RUNS.append(1)\n\n\n"
+        "def this_site() -> Site:\n"
+        "    return Site(title='Counted')\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return name
+
+
+def test_import_reuse(counted: str) -> None:
+    """Unchanged stories modules run once, however many sites are built."""
+    make_site(counted)
+    site = make_site(counted)
+    runs = import_module(f"{counted}.runs").RUNS
+    assert len(runs) == 1
+    assert site.title == "Counted"
+    assert f"{counted}.stories" in sys.modules
+
+
+def test_import_reload(counted: str) -> None:
+    """A changed file, or an explicit reload, runs the module again."""
+    make_site(counted)
+    runs = import_module(f"{counted}.runs").RUNS
+    stories_path = Path(str(files(counted))) / "stories.py"
+    import_stories(stories_path, f"{counted}.stories", reload=True)
+    assert len(runs) == 2
+    stories_path.write_text(stories_path.read_text().replace("'Counted'", "'New'"))
+    assert make_site(counted).title == "New"
+    assert len(runs) == 3
@@ -0,0 +1,72 @@
+"""Compare rendered stories with stored snapshots."""
+from pathlib import Path
+
+from storytime.snapshot import check_snapshots
+from storytime.snapshot import normalize
+from storytime.snapshot import Snapshot
+from storytime.snapshot import snapshot_catalog
+from storytime.snapshot import SnapshotStore
+from storytime.snapshot import structural_diff
+
+
+def test_normalize() -> None:
+    """Whitespace between tags and repeated whitespace don't matter."""
+    markup = "<div>\n  <p>Hello   world</p>\n</div>\n"
+    assert normalize(markup) == "<div><p>Hello world</p></div>"
+    assert Snapshot.of(markup) == Snapshot.of("<div><p>Hello world</p></div>")
+
+
+def test_structural_diff() -> None:
+    """A mismatch is shown element by element."""
+    diff = structural_diff("<div><p>Hello</p></div>", "<div><p>Bye</p></div>")
+    assert "-  Hello" in diff
+    assert "+  Bye" in diff
+
+
+def test_store_round_trip(tmp_path: Path) -> None:
+    """Snapshots persist in shards, and only changed shards are written."""
+    store = SnapshotStore(tmp_path)
+    assert store.put("components.heading-0", Snapshot.of("<h1>Hi</h1>"))
+    assert not store.put("components.heading-0", Snapshot.of("<h1>Hi</h1>"))
+    store.save()
+    (shard,) = tmp_path.glob("*.json")
+    assert shard.stem == SnapshotStore.shard_of("components.heading-0")
+    again = SnapshotStore(tmp_path)
+    assert again.get("components.heading-0") == Snapshot.of("<h1>Hi</h1>")
+    assert again.keys() == {"components.heading-0"}
+    again.remove("components.heading-0")
+    again.save()
+    assert list(tmp_path.glob("*.json")) == []
+
+
+def test_check_snapshots(tmp_path: Path) -> None:
+    """Missing snapshots fail, updating stores them, then they match."""
+    store = SnapshotStore(tmp_path)
+    report = check_snapshots("examples.minimal", store)
+    assert report.missing == ["components.heading-0"]
+    assert not report.ok
+    updated = check_snapshots("examples.minimal", store, update=True)
+    assert updated.updated == 1
+    report = check_snapshots("examples.minimal", SnapshotStore(tmp_path))
+    assert report.ok
+    assert report.matched == 1
+
+
+def test_check_snapshots_changed(tmp_path: Path) -> None:
+    """A changed rendering gets a diff, and an unknown story is stale."""
+    store = SnapshotStore(tmp_path)
+    store.put("components.heading-0", Snapshot.of("<div>Before</div>"))
+    store.put("components.gone-0", Snapshot.of("<div>Gone</div>"))
+    store.save()
+    report = check_snapshots("examples.minimal", SnapshotStore(tmp_path))
+    assert "Before" in report.changed["components.heading-0"]
+    assert report.stale == ["components.gone-0"]
+    check_snapshots("examples.minimal", SnapshotStore(tmp_path), update=True)
+    assert SnapshotStore(tmp_path).keys() == {"components.heading-0"}
+
+
+def test_snapshot_catalog_workers() -> None:
+    """Worker processes take the same snapshots as the main one."""
+    serial = snapshot_catalog("examples.minimal")
+    assert snapshot_catalog("examples.minimal", workers=2) == serial
+    assert list(serial) == ["components.heading-0"]
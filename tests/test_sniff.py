@@ -0,0 +1,75 @@
+"""Read the catalog tree without importing the stories."""
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from storytime import Section
+from storytime import Subject
+from storytime.sniff import make_skeleton
+from storytime.sniff import sniff_source
+from storytime.sniff import sniff_stories
+
+
+def test_sniff_section() -> None:
+    """The factory and its literal title are found."""
+    from examples.minimal.components import stories
+
+    sniffed = sniff_stories(Path(stories.__file__))
+    assert sniffed is not None
+    assert sniffed.factory == "this_section"
+    assert sniffed.kind == "Section"
+    assert sniffed.title == "Components"
+
+
+def test_sniff_subject_stories() -> None:
+    """Literal story titles are found too."""
+    from examples.minimal.components.heading import stories
+
+    sniffed = sniff_stories(Path(stories.__file__))
+    assert sniffed is not None
+    assert sniffed.title == "Heading"
+    assert sniffed.story_titles == ["Default Heading"]
+
+
+def test_sniff_no_factory() -> None:
+    """A stories file without a typed factory is skipped."""
+    from examples.no_sections.components import stories
+
+    assert sniff_stories(Path(stories.__file__)) is None
+
+
+def test_sniff_computed_title() -> None:
+    """Only literal titles are picked up."""
+    source = """\
+import storytime
+
+def b_section() -> "storytime.Section":
+    return storytime.Section(title=make_title())
+
+def a_helper() -> str:
+    return "x"
+"""
+    sniffed = sniff_source(source)
+    assert sniffed is not None
+    assert sniffed.factory == "b_section"
+    assert sniffed.kind == "Section"
+    assert sniffed.title is None
+
+
+def test_make_skeleton(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The skeleton has the tree and titles, and imports nothing."""
+
+    def no_imports(stories_path: Path, *args: Any, **kwargs: Any) -> None:
+        raise AssertionError(f"Imported {stories_path}")
+
+    monkeypatch.setattr("storytime.import_stories", no_imports)
+    site = make_skeleton("examples.minimal", workers=2)
+    assert site.title == "Minimal Site"
+    components = site.find_path(".components")
+    assert isinstance(components, Section)
+    assert components.title == "Components"
+    heading = site.find_path(".components.heading")
+    assert isinstance(heading, Subject)
+    assert heading.parent is components
+    assert [story.title for story in heading.stories] == ["Default Heading"]
@@ -1,6 +1,14 @@
 """Ensure all variations of a ``Story`` obey policies."""
+import asyncio
+
+import pytest
+from bs4 import BeautifulSoup
 from viewdom.render import html
+from viewdom.render import render
+from viewdom.render import VDOM
 
+from storytime.story import best_parser
+from storytime.story import DEFAULT_PARSER
 from storytime.story import Story
 
 
@@ -16,3 +24,77 @@ def test_template() -> None:
     story = Story(title="Template", template=template)
     assert story.template == template
     assert str(story.html) == "<div>Hello</div>"
+
+
+def test_rendered_without_parsing(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Markup is rendered once, and the DOM isn't parsed unless asked."""
+    calls = []
+
+    def counting_render(template: VDOM) -> str:
+        calls.append(template)
+        return render(template)
+
+    monkeypatch.setattr("storytime.story.render", counting_render)
+    monkeypatch.setattr("storytime.story.BeautifulSoup", None)
+    story = Story(title="Template", template=html("<div>Hello</div>"))
+    assert story.rendered == "<div>Hello</div>"
+    assert story.rendered == "<div>Hello</div>"
+    assert len(calls) == 1
+
+
+def test_html_cached() -> None:
+    """The DOM is parsed once per story."""
+    story = Story(title="Template", template=html("<div>Hello</div>"))
+    assert story.html is story.html
+
+
+def test_empty_html() -> None:
+    """A story without a template has empty markup."""
+    story = Story(title="Empty")
+    assert story.rendered == ""
+    assert str(story.html) == ""
+
+
+def test_parser() -> None:
+    """The parser can be chosen per story."""
+    story = Story(title="T", template=html("<p>Hi</p>"), parser="html.parser")
+    assert story.html.get_text() == "Hi"
+    assert best_parser() in ("lxml", DEFAULT_PARSER)
+
+
+def test_default_parser(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Without a parser of its own, a story uses Python's own parser."""
+    parsers: list[str] = []
+
+    def recording_soup(markup: str, features: str) -> BeautifulSoup:
+        parsers.append(features)
+        return BeautifulSoup(markup, DEFAULT_PARSER)
+
+    monkeypatch.setattr("storytime.story.BeautifulSoup", recording_soup)
+    assert Story(title="T", template=html("<p>Hi</p>")).html.get_text() == "Hi"
+    assert parsers == [DEFAULT_PARSER]
+    parsers.clear()
+    Story(title="T", template=html("<p>Hi</p>"), parser=best_parser()).html
+    assert parsers == [best_parser()]
+
+
+def test_async_template() -> None:
+    """An async template is awaited, and a plain function is called."""
+
+    async def fetch() -> VDOM:
+        await asyncio.sleep(0)
+        return html("<p>Fetched</p>")
+
+    story = Story(title="Async", template=fetch)
+    assert asyncio.run(story.arender()) == "<p>Fetched</p>"
+    assert story.rendered == "<p>Fetched</p>"
+    assert Story(title="Async", template=fetch).rendered == "<p>Fetched</p>"
+    made = Story(title="Made", template=lambda: html("<p>Made</p>"))
+    assert made.rendered == "<p>Made</p>"
+
+
+def test_arender_sync_template() -> None:
+    """Synchronous templates render the same way through ``arender``."""
+    story = Story(title="Template", template=html("<div>Hello</div>"))
+    assert asyncio.run(story.arender()) == "<div>Hello</div>"
+    assert asyncio.run(Story(title="Empty").arender()) == ""
@@ -0,0 +1,30 @@
+"""Generate synthetic catalogs for benchmarks and tests."""
+from pathlib import Path
+
+import pytest
+
+from storytime import make_site
+from storytime import Section
+from storytime import Subject
+from storytime.build import iter_stories
+from storytime.synthetic import CatalogShape
+from storytime.synthetic import write_catalog
+
+
+def test_write_catalog(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The generated package builds into a site of the requested shape."""
+    shape = CatalogShape(sections=2, subjects=3, stories=4, template_size=2)
+    write_catalog(tmp_path, "synthetic_shape", shape)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    site = make_site("synthetic_shape")
+    assert site.title == "Synthetic Site"
+    assert len(site.find_kind(Section)) == shape.sections
+    subjects = site.find_kind(Subject)
+    assert len(subjects) == shape.subject_count == 6
+    assert len(list(iter_stories(site))) == shape.story_count == 24
+    subject = site.find_path(".section1.subject2")
+    assert subject is not None
+    assert subject.title == "Subject 1.2"
+    story = site.find_story(".section1.subject2", 3)
+    assert story is not None
+    assert story.rendered.count("<p>") == 2
@@ -0,0 +1,199 @@
+"""Patch a built site as its stories and components change."""
+import os
+from pathlib import Path
+from textwrap import dedent
+from typing import Any
+
+import pytest
+
+import storytime.watch
+from storytime import make_site
+from storytime import Section
+from storytime import Subject
+from storytime.watch import CatalogWatcher
+from storytime.watch import DependencyGraph
+from storytime.watch import make_watcher
+from storytime.watch import Watcher
+
+SITE = """\
+from storytime import Site
+
+
+def this_site() -> Site:
+    return Site(title="Watched")
+"""
+
+SECTION = """\
+from storytime import Section
+
+
+def this_section() -> Section:
+    return Section(title="Components")
+"""
+
+SUBJECT = """\
+from storytime import Subject
+from storytime.story import Story
+from {package}.components.button.labels import LABEL
+
+
+def this_subject() -> Subject:
+    return Subject(title=LABEL, stories=[Story(title=LABEL + " Story")])
+"""
+
+
+def write(path: Path, content: str) -> None:
+    """Write a file and make sure its mtime moves forward."""
+    mtime_ns = path.stat().st_mtime_ns if path.exists() else 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(dedent(content))
+    stat = path.stat()
+    if stat.st_mtime_ns <= mtime_ns:
+        bumped = mtime_ns + 1_000_000
+        os.utime(path, ns=(bumped, bumped))
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Write a small catalog package to a temporary directory."""
+    name = f"watched_{tmp_path.name}"
+    root = tmp_path / name
+    write(root / "__init__.py", "")
+    write(root / "stories.py", SITE)
+    write(root / "components" / "__init__.py", "")
+    write(root / "components" / "stories.py", SECTION)
+    button = root / "components" / "button"
+    write(button / "__init__.py", "")
+    write(button / "labels.py", 'LABEL = "Button"\n')
+    write(button / "stories.py", SUBJECT.format(package=name))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return name
+
+
+def test_dependency_graph(package: str) -> None:
+    """A subject's stories depend on the component modules they import."""
+    graph = DependencyGraph(package).build()
+    labels = graph.root_path / "components" / "button" / "labels.py"
+    button = graph.root_path / "components" / "button" / "stories.py"
+    assert labels in graph.depends[button]
+    assert graph.affected({labels}) == {button}
+
+
+def test_graph_update(package: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A change reads the imports of only the changed and added files."""
+    watcher = Watcher(package, make_site(package))
+    parsed: list[str] = []
+    real_module_imports = storytime.watch.module_imports
+
+    def recording_module_imports(module_path: Path, *args: Any) -> set[Path]:
+        parsed.append(module_path.relative_to(watcher.graph.root_path).as_posix())
+        return real_module_imports(module_path, *args)
+
+    monkeypatch.setattr("storytime.watch.module_imports", recording_module_imports)
+    root_path = watcher.graph.root_path
+    write(root_path / "components/button/labels.py", 'LABEL = "Big"\n')
+    assert watcher.poll() == [".components.button"]
+    assert parsed == ["components/button/labels.py"]
+    parsed.clear()
+    write(root_path / "components" / "link" / "__init__.py", "")
+    write(
+        root_path / "components/link/stories.py", SECTION.replace("Section", "Subject")
+    )
+    assert watcher.poll() == [".components.link"]
+    assert parsed == ["components/link/stories.py"]
+    assert watcher.graph.depends == DependencyGraph(package).build().depends
+
+
+def test_no_changes(package: str) -> None:
+    """Polling an unchanged catalog does nothing."""
+    watcher = Watcher(package, make_site(package))
+    assert watcher.poll() == []
+
+
+def test_component_change(package: str) -> None:
+    """Editing a component module re-imports only its subject."""
+    site = make_site(package)
+    section = site.items["components"]
+    watcher = Watcher(package, site)
+    write(watcher.graph.root_path / "components/button/labels.py", 'LABEL = "Big"\n')
+    assert watcher.poll() == [".components.button"]
+    assert site.items["components"] is section
+    button = section.items["button"]
+    assert isinstance(button, Subject)
+    assert button.title == "Big"
+    assert button.parent is section
+    assert button.stories[0].title == "Big Story"
+
+
+def test_section_change(package: str) -> None:
+    """A replaced Section keeps its Subjects."""
+    site = make_site(package)
+    watcher = Watcher(package, site)
+    section_path = watcher.graph.root_path / "components/stories.py"
+    write(section_path, SECTION.replace("Components", "Parts"))
+    assert watcher.poll() == [".components", ".components.button"]
+    section = site.items["components"]
+    assert section.title == "Parts"
+    assert section.items["button"].parent is section
+
+
+def test_added_and_removed(package: str) -> None:
+    """New stories files join the tree and deleted ones leave it."""
+    site = make_site(package)
+    watcher = Watcher(package, site)
+    link = watcher.graph.root_path / "components" / "link"
+    write(link / "__init__.py", "")
+    write(link / "stories.py", SECTION.replace("Section", "Subject"))
+    assert watcher.poll() == [".components.link"]
+    assert isinstance(site.find_path(".components.link"), Subject)
+    (link / "stories.py").unlink()
+    assert watcher.poll() == [".components.link"]
+    assert site.find_path(".components.link") is None
+    assert isinstance(site.find_path(".components"), Section)
+
+
+def test_index_follows_patches(package: str) -> None:
+    """The site's path index tracks patched and removed nodes."""
+    site = make_site(package)
+    watcher = Watcher(package, site)
+    button = watcher.graph.root_path / "components" / "button"
+    write(button / "labels.py", 'LABEL = "Big"\n')
+    watcher.poll()
+    assert site.find_title("Big") == [site.items["components"].items["button"]]
+    assert site.find_title("Button") == []
+    (button / "stories.py").unlink()
+    watcher.poll()
+    assert ".components.button" not in site.index
+
+
+def test_catalog_change(package: str) -> None:
+    """Each package of a catalog is watched below its mount."""
+    target = f"parts={package},examples.minimal"
+    site = make_site(target)
+    watcher = make_watcher(target, site)
+    assert isinstance(watcher, CatalogWatcher)
+    assert list(watcher.watchers) == ["parts", "examples_minimal"]
+    root_path = watcher.watchers["parts"].graph.root_path
+    write(root_path / "components/button/labels.py", 'LABEL = "Big"\n')
+    assert watcher.poll() == [".parts.components.button"]
+    assert site.find_title("Big") == [site.find_path(".parts.components.button")]
+    (root_path / "components" / "button" / "stories.py").unlink()
+    assert watcher.poll() == [".parts.components.button"]
+    assert ".parts.components.button" not in site.index
+    assert isinstance(site.find_path(".examples_minimal.components"), Section)
+
+
+def test_catalog_root_change(package: str) -> None:
+    """A package's own Site stays a Section of the catalog when edited."""
+    target = f"parts={package}"
+    site = make_site(target, share_registry=True)
+    watcher = make_watcher(target, site, share_registry=True)
+    assert isinstance(watcher, CatalogWatcher)
+    root_path = watcher.watchers["parts"].graph.root_path
+    write(root_path / "stories.py", SITE.replace("Watched", "Edited"))
+    assert watcher.poll() == [".parts", ".parts.components", ".parts.components.button"]
+    section = site.find_path(".parts")
+    assert isinstance(section, Section)
+    assert section.title == "Edited"
+    assert section.registry is site.registry
+    assert section.items["components"].parent is section